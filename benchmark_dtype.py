@@ -0,0 +1,56 @@
+"""
+Compare WEAT results in float32 with float64 precision on one embedding.
+
+Runs the same tests in both precisions and prints the time and the deviation of the effect size and the
+p-value of float32 from float64. Each precision is run once with a single permutation before it is timed, so
+that building the embedding cache and index and filling the page cache do not count against float64, e.g.
+
+python benchmark_dtype.py --embeddings wiki.de.vec --lang de --test_ids weat_migrant_pleasant_unpleasant_1 \
+    weat_gender_career_family_1 --permutation_number 100000 --seed 0
+"""
+import argparse
+import contextlib
+import io
+from time import time
+
+import numpy as np
+
+from weat import run_weat_suite
+
+
+def run(tests, embeddings, permutation_number, lang, seed, dtype):
+    start = time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run_weat_suite(tests, embeddings, permutation_number=permutation_number, lang=lang, seed=seed,
+                                 dtype=dtype)
+    return results, time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark float32 against float64 WEAT results')
+    parser.add_argument('--embeddings', type=str, help='Embeddings in vec format', required=True)
+    parser.add_argument('--test_ids', type=str, nargs='+', help='IDs of the weat tests to run', required=True)
+    parser.add_argument('--permutation_number', type=int, default=100000, help='Number of permutations')
+    parser.add_argument('--lang', type=str, default='de', help='Language to test')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random streams used to sample permutations')
+    args = parser.parse_args()
+
+    tests = [(test_id, 'both') for test_id in args.test_ids]
+    for dtype in ('float64', 'float32'):
+        run(tests, args.embeddings, 1, args.lang, args.seed, dtype)
+    results_64, time_64 = run(tests, args.embeddings, args.permutation_number, args.lang, args.seed, 'float64')
+    results_32, time_32 = run(tests, args.embeddings, args.permutation_number, args.lang, args.seed, 'float32')
+    print(f'Duration float64: {time_64:.2f}s, float32: {time_32:.2f}s')
+    print('test_id\teffect-size float64\teffect-size float32\tdeviation\tp-value float64\tp-value float32\tdeviation')
+    for result_64, result_32 in zip(results_64, results_32):
+        print(f"{result_64['test_id']}\t{result_64['effect-size']:.6f}\t{result_32['effect-size']:.6f}\t"
+              f"{abs(result_64['effect-size'] - result_32['effect-size']):.2e}\t{result_64['p-value']:.6f}\t"
+              f"{result_32['p-value']:.6f}\t{abs(result_64['p-value'] - result_32['p-value']):.2e}")
+    deviations = [abs(r64['effect-size'] - r32['effect-size']) for r64, r32 in zip(results_64, results_32)]
+    print(f'Max effect-size deviation: {np.max(deviations):.2e}')
+    deviations = [abs(r64['p-value'] - r32['p-value']) for r64, r32 in zip(results_64, results_32)]
+    print(f'Max p-value deviation: {np.max(deviations):.2e}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Streaming reads of plain or compressed (.gz, .bz2, .xz) embedding files and corpora.
+
+The codec is chosen by the magic bytes at the start of the file, not by its name. Compressed files are decompressed
+in a background thread into a bounded buffer, so parsing the lines overlaps with the decompression (which releases
+the GIL) and the memory stays bounded by the buffer.
+"""
+import bz2
+import gzip
+import io
+import lzma
+import queue
+import threading
+
+CHUNK_SIZE = 2 ** 20
+BUFFERED_CHUNKS = 16
+CODECS = {
+    b'\x1f\x8b': gzip,
+    b'BZh': bz2,
+    b'\xfd7zXZ\x00': lzma,
+}
+
+
+def codec(path):
+    """Module (gzip, bz2 or lzma) that decompresses the file at path, None if it is not compressed."""
+    with open(path, 'rb') as f:
+        start = f.read(max(len(magic) for magic in CODECS))
+    for magic, module in CODECS.items():
+        if start.startswith(magic):
+            return module
+    return None
+
+
+def is_compressed(path):
+    return codec(path) is not None
+
+
+class _BackgroundReader(io.RawIOBase):
+    """Raw binary stream of the chunks a background thread reads from another stream into a bounded queue."""
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE, buffered_chunks=BUFFERED_CHUNKS):
+        super().__init__()
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._queue = queue.Queue(buffered_chunks)
+        self._stop = threading.Event()
+        self._pending = memoryview(b'')
+        self._eof = False
+        self._error = None
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fill(self):
+        try:
+            while True:
+                chunk = self._stream.read(self._chunk_size)
+                if not self._put(chunk) or not chunk:
+                    return
+        except Exception as e:
+            self._put(e)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self._pending:
+            # the worker has stopped after the end or an error, the queue stays empty from then on
+            if self._error is not None:
+                raise self._error
+            if self._eof:
+                return 0
+            item = self._queue.get()
+            if isinstance(item, Exception):
+                self._error = item
+                raise item
+            if not item:
+                self._eof = True
+                return 0
+            self._pending = memoryview(item)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._stream.close()
+        super().close()
+
+
+def open_stream(path, mode='rt', encoding='utf8', errors='strict', buffered_chunks=BUFFERED_CHUNKS):
+    """Open the (possibly compressed) file at path for reading.
+
+    Args:
+        path: plain, gzip, bz2 or xz file
+        mode: 'rt' for text or 'rb' for bytes
+        encoding: encoding of the text
+        errors: how encoding errors of the text are handled, as in open
+        buffered_chunks: number of decompressed chunks of CHUNK_SIZE bytes the background thread may read ahead
+    Returns:
+        file object, which does not support seeking if the file is compressed
+    """
+    if mode not in ('rt', 'rb'):
+        raise ValueError(f'Unsupported mode {mode}')
+    module = codec(path)
+    if module is None:
+        if mode == 'rb':
+            return open(path, 'rb')
+        return open(path, 'r', encoding=encoding, errors=errors)
+    stream = io.BufferedReader(_BackgroundReader(module.open(path, 'rb'), buffered_chunks=buffered_chunks),
+                               buffer_size=CHUNK_SIZE)
+    if mode == 'rb':
+        return stream
+    return io.TextIOWrapper(stream, encoding=encoding, errors=errors)
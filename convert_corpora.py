@@ -1,16 +1,19 @@
 import os
 import csv
 
+import compressed
+
 
 def get_num_tokens(path_in):
     i = 0
-    for _ in open(path_in):
-        i += 1
+    with compressed.open_stream(path_in) as fin:
+        for _ in fin:
+            i += 1
     return i
 
 
 def convert(path_in, path_out, num_tokens):
-    with open(path_in, 'r', encoding='utf8') as fin, open(path_out, 'w', encoding='utf8') as fout:
+    with compressed.open_stream(path_in) as fin, open(path_out, 'w', encoding='utf8') as fout:
         reader = csv.reader(fin, delimiter='\t')
         next(reader)
         cur_sent = []
@@ -35,7 +38,7 @@ def convert(path_in, path_out, num_tokens):
 def main():
     dir_path = '/home/janis/Dropbox/UZH/10._Semester/NLP_in_Context_of_AI/Paper/WEAT_Experiments/data'
     for fname_in in os.listdir(dir_path):
-        if not fname_in.endswith('.tsv'):
+        if not fname_in.endswith(('.tsv', '.tsv.gz', '.tsv.bz2', '.tsv.xz')):
             continue
         fname_out = fname_in.split('.')[0] + '_ospl.txt'
         path_in = os.path.join(dir_path, fname_in)
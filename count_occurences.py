@@ -1,6 +1,8 @@
 import argparse
 from collections import defaultdict
 
+import compressed
+
 
 paths = {
     'sde': ('/mnt/storage/harlie/users/jgoldz/bias_germ_embeddings/data/sde_wac_ospl.txt',
@@ -16,7 +18,7 @@ def count_occurrences():
     for corpus_name, (fcorpus, fcount) in paths.items():
         print(f'Processing corpus {corpus_name}...')
         voc = defaultdict(int)  # {word: count}
-        with open(fcorpus) as fin:
+        with compressed.open_stream(fcorpus) as fin:
             for line in fin:
                 line = line.lower().strip('\n')
                 tokens = line.split(' ')
@@ -0,0 +1,840 @@
+"""
+Loading of word embeddings in text format (.vec, glove .txt) or binary format (word2vec, fastText .bin) into one
+contiguous matrix.
+
+Parsing the text of large embedding files takes minutes, so the parsed matrix is cached in binary format next to
+the source file and memory-mapped on later loads. To load only a few words, an index of the line offsets of all
+words is kept next to the file instead. Embeddings given as a pickled vocab and .npy vectors are converted into
+one memory-mapped bundle file. Loaded embeddings are an EmbeddingStore, the matrix and an index from words to its
+rows.
+"""
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+from collections.abc import Mapping
+from multiprocessing import Pool
+from multiprocessing import RawArray
+
+import numpy as np
+
+import compressed
+
+READ_BLOCK_SIZE = 2 ** 26
+GATHER_BLOCK_SIZE = 2 ** 12
+FASTTEXT_MAGIC = 793712314
+FASTTEXT_VERSION = 12
+FASTTEXT_EOS = b'</s>'
+BUNDLE_MAGIC = b'XWEATBDL'
+BUNDLE_ALIGNMENT = 64
+# bytes of the vectors of embedding files in text format, see binary_format
+TEXT_BYTES = frozenset(b'0123456789.-+eE \t\r\n')
+
+
+class EmbeddingStore(Mapping):
+    """Embeddings as one matrix and an index from words to its rows.
+
+    It is a read-only mapping from words to their vectors (rows of the matrix, no copies), so it can be used like
+    the dicts of utils.load_embeddings, and the vectors of many words are gathered from the matrix at once.
+    """
+
+    def __init__(self, matrix, index):
+        """
+        Args:
+            matrix: array of shape (rows, dimension), e.g. memory-mapped
+            index: dict from words to their row in matrix
+        """
+        self.matrix = matrix
+        self.index = index
+
+    @classmethod
+    def from_words(cls, words, matrix):
+        """Store of the words of the rows of matrix, rows of words that occur more than once are overwritten by
+        later ones, as in utils.load_embeddings."""
+        return cls(matrix, {word: row for row, word in enumerate(words)})
+
+    @classmethod
+    def from_dict(cls, embd_dict, dtype=np.float64):
+        """Store of the vectors of a dict from words to vectors (copied into one matrix)."""
+        matrix = np.array(list(embd_dict.values()), dtype=dtype)
+        return cls.from_words(embd_dict, matrix.reshape(len(embd_dict), -1 if embd_dict else 0))
+
+    def __getitem__(self, word):
+        return self.matrix[self.index[word]]
+
+    def __contains__(self, word):
+        return word in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def lookup(self, words):
+        """Rows of words in the matrix.
+
+        Returns:
+            (array of the rows of the words in the store, list of the words that are not)
+        """
+        words = list(words)
+        rows = [self.index.get(word) for word in words]
+        oov = [word for word, row in zip(words, rows) if row is None]
+        return np.array([row for row in rows if row is not None], dtype=np.intp), oov
+
+    def gather(self, rows, dtype=None):
+        """Sub-matrix of the given rows, a view of the matrix if they are consecutive and one copy otherwise."""
+        rows = np.asarray(rows, dtype=np.intp)
+        if len(rows) > 0 and np.all(np.diff(rows) == 1):
+            sub_matrix = self.matrix[rows[0]:rows[-1] + 1]
+        else:
+            sub_matrix = self.matrix.take(rows, axis=0)
+        return sub_matrix if dtype is None else sub_matrix.astype(dtype, copy=False)
+
+    def vectors(self, words, dtype=None):
+        """Matrix of the vectors of words, which all have to be in the store."""
+        rows, oov = self.lookup(words)
+        if oov:
+            raise KeyError(oov[0])
+        return self.gather(rows, dtype)
+
+    def neighbourhood(self):
+        """Matrix of the vectors of all words, without the rows that no word (anymore) refers to."""
+        if len(self.index) == len(self.matrix):
+            return self.matrix
+        return self.gather(np.sort(np.fromiter(self.index.values(), dtype=np.intp, count=len(self.index))))
+
+    def rename(self, function):
+        """Store of the same matrix with the words mapped by function."""
+        return EmbeddingStore(self.matrix, {function(word): row for word, row in self.index.items()})
+
+
+class SortedIndex(Mapping):
+    """Index from words to rows that is a sorted array of the UTF-8 encoded words (e.g. memory-mapped), the row of
+    a word is its position, which is found by binary search."""
+
+    def __init__(self, words):
+        self.words = words
+
+    def get(self, word, default=None):
+        encoded = word.encode('utf8')
+        if len(encoded) > self.words.itemsize:
+            return default
+        row = int(np.searchsorted(self.words, encoded))
+        if row < len(self.words) and self.words[row] == encoded:
+            return row
+        return default
+
+    def __getitem__(self, word):
+        row = self.get(word)
+        if row is None:
+            raise KeyError(word)
+        return row
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+    def __iter__(self):
+        return (word.decode('utf8') for word in self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def values(self):
+        return range(len(self.words))
+
+    def items(self):
+        return zip(self, range(len(self.words)))
+
+
+def _source_stamp(path):
+    return [os.path.getsize(path), os.path.getmtime(path)]
+
+
+def _write_replacing(path, write):
+    """Call write with a binary file object of a temporary file next to path and rename that to path.
+
+    Readers and concurrent writers thus only ever see complete files, and an interrupted write leaves no file behind.
+    """
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temporary_path, 'wb') as f:
+            write(f)
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
+def parse_vec(path, dtype=np.float64):
+    """Words and vectors of an embedding file in text format, one word and its vector per line.
+
+    As in utils.load_embeddings, words are lowercased and lines that are not a vector of the embedding size (like the
+    header line of .vec files) are skipped. The file may be compressed (see compressed.open_stream).
+
+    Returns:
+        (list of words, array of shape (len(words), dimension))
+    """
+    words = []
+    rows = []
+    dimension = None
+    with compressed.open_stream(path, errors='ignore') as f:
+        for line in f:
+            parts = line.split()
+            if dimension is None and len(parts) > 2:
+                dimension = len(parts) - 1
+            if len(parts) - 1 != dimension:
+                logging.info('Skipping line of %s: %s', path, line[:50])
+                continue
+            try:
+                rows.append(np.array(parts[1:], dtype=dtype))
+            except ValueError:
+                logging.info('Skipping line of %s: %s', path, line[:50])
+                continue
+            words.append(parts[0].lower())
+    return words, np.array(rows, dtype=dtype).reshape(len(rows), dimension or 0)
+
+
+def _header_size(path):
+    """Size in bytes of the 'words dimension' header line of a .vec file, 0 if there is none."""
+    with open(path, 'rb') as f:
+        line = f.readline()
+    parts = line.split()
+    return len(line) if len(parts) == 2 and all(part.isdigit() for part in parts) else 0
+
+
+def _line_ranges(path, parts):
+    """Up to parts byte ranges (start, stop) of the lines of path after the header, each starting at a line."""
+    size = os.path.getsize(path)
+    start = _header_size(path)
+    boundaries = [start]
+    with open(path, 'rb') as f:
+        for i in range(1, parts):
+            # the line the split point falls into belongs to the previous range
+            f.seek(max(start + (size - start) * i // parts - 1, boundaries[-1]))
+            f.readline()
+            boundaries.append(max(f.tell(), boundaries[-1]))
+    boundaries.append(size)
+    return [(a, b) for a, b in zip(boundaries, boundaries[1:]) if a < b]
+
+
+def _read_lines(path, start, stop, block_size=READ_BLOCK_SIZE):
+    """Lines (bytes, without the newline) of path in the byte range [start, stop), read block_size bytes at a time."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        rest = b''
+        while start < stop:
+            block = rest + f.read(min(block_size, stop - start))
+            start += block_size
+            if start < stop:
+                if b'\n' not in block:
+                    rest = block
+                    continue
+                block, _, rest = block.rpartition(b'\n')
+            elif block.endswith(b'\n'):
+                block = block[:-1]
+            yield block.split(b'\n')
+
+
+def _count_lines(path, start, stop):
+    return sum(len(lines) for lines in _read_lines(path, start, stop))
+
+
+_shared_matrix = None
+
+
+def _init_shared_matrix(buffer, shape, dtype):
+    global _shared_matrix
+    _shared_matrix = np.frombuffer(buffer, dtype=dtype, count=shape[0] * shape[1]).reshape(shape)
+
+
+def _starmap(function, jobs, workers, initializer=None, initargs=()):
+    if workers == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        return [function(*job) for job in jobs]
+    with Pool(workers, initializer, initargs) as pool:
+        return pool.starmap(function, jobs)
+
+
+def _parse_range(path, start, stop, row):
+    """Parse the lines in a byte range into the rows of the shared matrix from row on.
+
+    Returns:
+        (words of the lines, None for lines that are no vector of the embedding size)
+    """
+    matrix = _shared_matrix
+    shape = matrix.shape
+    dtype = matrix.dtype
+    words = []
+    for lines in _read_lines(path, start, stop):
+        heads = [line.partition(b' ') for line in lines]
+        # the total size alone would accept a line with a value too few next to one with a value too many, so every
+        # line must also have the embedding size in values, else (or with unusual spacing) it is parsed line by line
+        values = None
+        if all(head[2].strip().count(b' ') == shape[1] - 1 for head in heads):
+            try:
+                values = np.fromstring(b' '.join(head[2] for head in heads), dtype=dtype, sep=' ')
+            except ValueError:
+                pass
+        if values is not None and values.size == len(lines) * shape[1]:
+            matrix[row:row + len(lines)] = values.reshape(len(lines), shape[1])
+            words.extend(head[0].decode('utf8', errors='ignore').lower() for head in heads)
+        else:
+            # some line is malformed, find it by parsing line by line
+            for i, (word, _, vector) in enumerate(heads):
+                try:
+                    vector = np.array(vector.split(), dtype=dtype)
+                except ValueError:
+                    vector = None
+                if vector is None or len(vector) != shape[1]:
+                    logging.info('Skipping line of %s: %s', path, lines[i][:50])
+                    words.append(None)
+                    continue
+                matrix[row + i] = vector
+                words.append(word.decode('utf8', errors='ignore').lower())
+        row += len(lines)
+    return words
+
+
+def parse_vec_parallel(path, dtype=np.float64, workers=1):
+    """Words and vectors of an embedding file in text format like parse_vec, parsed in worker processes.
+
+    The file is split into newline-aligned byte ranges. Their lines are counted first, so that every worker
+    knows the rows of its range, then each worker converts its lines with one NumPy call per block and writes
+    them directly into a matrix in shared memory.
+
+    Args:
+        path: embedding file in text format
+        dtype: dtype of the vectors
+        workers: number of processes
+    Returns:
+        (list of words, array of shape (len(words), dimension))
+    """
+    if compressed.is_compressed(path):
+        logging.info('Parsing %s in one process, compressed files cannot be split into byte ranges', path)
+        return parse_vec(path, dtype)
+    dtype = np.dtype(dtype)
+    ranges = _line_ranges(path, 4 * workers)
+    if not ranges:
+        return [], np.empty((0, 0), dtype=dtype)
+    with open(path, 'rb') as f:
+        f.seek(ranges[0][0])
+        dimension = len(f.readline().split()) - 1
+    counts = _starmap(_count_lines, [(path, start, stop) for start, stop in ranges], workers)
+    shape = (sum(counts), dimension)
+    buffer = RawArray('b', max(shape[0] * shape[1] * dtype.itemsize, 1))
+    rows = np.cumsum([0] + counts[:-1]).tolist()
+    results = _starmap(_parse_range, [(path, start, stop, row) for (start, stop), row in zip(ranges, rows)], workers,
+                       _init_shared_matrix, (buffer, shape, dtype))
+    words = [word for range_words in results for word in range_words]
+    valid = np.array([word is not None for word in words], dtype=bool)
+    matrix = np.frombuffer(buffer, dtype=dtype, count=shape[0] * shape[1]).reshape(shape)
+    if not valid.all():
+        matrix = matrix[valid]
+    return [word for word in words if word is not None], matrix
+
+
+def cache_paths(path, dtype=np.float64):
+    """Paths of the cached matrix (.npy), vocabulary (.vocab.json) and stamp (.stamp.json) of the embedding file."""
+    prefix = f'{path}.{np.dtype(dtype).name}'
+    return prefix + '.npy', prefix + '.vocab.json', prefix + '.stamp.json'
+
+
+def _cache_stamp(path, *files):
+    return {'source': _source_stamp(path), 'cache': [_source_stamp(file) for file in files]}
+
+
+def is_cached(path, dtype=np.float64):
+    """Whether the embedding file at path has an up to date binary cache, only its small stamp file is read."""
+    matrix_path, vocab_path, stamp_path = cache_paths(path, dtype)
+    if not all(os.path.exists(p) for p in (matrix_path, vocab_path, stamp_path)):
+        return False
+    with open(stamp_path) as f:
+        stamp = json.load(f)
+    if stamp != _cache_stamp(path, matrix_path, vocab_path):
+        logging.info('Embedding cache of %s is outdated', path)
+        return False
+    return True
+
+
+def load_vec_cached(path, dtype=np.float64, workers=1):
+    """Words and vectors of an embedding file in text format, read from its binary cache if that is up to date.
+
+    The cache is created next to the file on the first load. It is a .npy matrix, which is memory-mapped read-only,
+    a JSON list of the words of its rows and a stamp with the size and modification time of the source file and of
+    the two cache files, so it is rebuilt when the source changes. Every file is written to a temporary file and
+    renamed, the stamp last, so an interrupted or concurrent run never leaves a cache that passes as up to date.
+    With more than one worker, the file is parsed by parse_vec_parallel.
+
+    Returns:
+        (list of words, array of shape (len(words), dimension))
+    """
+    matrix_path, vocab_path, stamp_path = cache_paths(path, dtype)
+    if is_cached(path, dtype):
+        with open(vocab_path) as f:
+            words = json.load(f)['words']
+        return words, np.load(matrix_path, mmap_mode='r')
+    words, matrix = parse_vec(path, dtype) if workers == 1 else parse_vec_parallel(path, dtype, workers)
+    try:
+        _write_replacing(matrix_path, lambda f: np.save(f, matrix))
+        _write_replacing(vocab_path, lambda f: f.write(json.dumps({'words': words}).encode()))
+        stamp = _cache_stamp(path, matrix_path, vocab_path)
+        _write_replacing(stamp_path, lambda f: f.write(json.dumps(stamp).encode()))
+    except OSError as e:
+        logging.warning('Could not write the embedding cache of %s: %s', path, e)
+    return words, matrix
+
+
+def load_vec_selected(path, words, dtype=np.float64):
+    """Vectors of only the given words, streamed from an embedding file in text format.
+
+    Only the first token of each line is split off and compared with the (lowercased) words, the vector is only
+    parsed for the lines of these words, so the memory stays at the size of their vectors. As in parse_vec, lines
+    that are not a vector of the embedding size (given by the header line, or else by the first vector) are skipped.
+
+    Args:
+        path: embedding file in text format
+        words: words to load, words in the file are lowercased before the comparison as in utils.load_embeddings
+        dtype: dtype of the vectors
+    Returns:
+        (list of the words found, array of shape (len(words found), dimension))
+    """
+    needed = set(words)
+    found = {}
+    dimension = None
+    with compressed.open_stream(path, errors='ignore') as f:
+        for i, line in enumerate(f):
+            word, _, vector = line.partition(' ')
+            if i == 0:
+                header = line.split()
+                if len(header) == 2 and all(part.isdigit() for part in header):
+                    dimension = int(header[1])
+                    continue
+            word = word.lower()
+            if word not in needed:
+                continue
+            try:
+                row = np.array(vector.split(), dtype=dtype)
+            except ValueError:
+                row = None
+            if row is not None and dimension is None and len(row) > 1:
+                dimension = len(row)
+            if row is None or len(row) != dimension:
+                logging.info('Skipping line of %s: %s', path, line[:50])
+                continue
+            found[word] = row
+    logging.info('Found %d of %d words in %s', len(found), len(needed), path)
+    return list(found), np.array(list(found.values()), dtype=dtype).reshape(len(found), dimension or 0)
+
+
+def index_paths(path):
+    """Paths of the word index (.index.npy) and its metadata (.index.json) of the embedding file at path."""
+    return f'{path}.index.npy', f'{path}.index.json'
+
+
+def _index_range(path, start, stop):
+    """Lowercased words, line offsets and word lengths in bytes of the lines in a byte range."""
+    words, offsets, lengths = [], [], []
+    for lines in _read_lines(path, start, stop):
+        for line in lines:
+            word = line.partition(b' ')[0]
+            if word:
+                words.append(word.decode('utf8', errors='ignore').lower())
+                offsets.append(start)
+                lengths.append(len(word))
+            start += len(line) + 1
+    return words, offsets, lengths
+
+
+def build_index(path, workers=1):
+    """Write the word index of the embedding file at path, the offset of the line of every word sorted by word.
+
+    The index is an int64 array of shape (words, 2) with the byte offset of a line and the length of its word,
+    sorted by the lowercased word, so it can be memory-mapped and searched with the words read from the embedding
+    file itself. Only the first token of each line is read, in workers processes over byte ranges of the file. Of
+    words that occur more than once, the last line is indexed, as in utils.load_embeddings.
+    """
+    ranges = _line_ranges(path, 4 * workers)
+    results = _starmap(_index_range, [(path, start, stop) for start, stop in ranges], workers)
+    words = [word for range_words, _, _ in results for word in range_words]
+    table = np.array([(offset, length) for _, offsets, lengths in results for offset, length in zip(offsets, lengths)],
+                     dtype=np.int64).reshape(len(words), 2)
+    # stable, so the last of equal words is the last line
+    order = sorted(range(len(words)), key=words.__getitem__)
+    last = [i for i, j in zip(order, order[1:] + [None]) if j is None or words[i] != words[j]]
+    dimension = 0
+    if ranges:
+        with open(path, 'rb') as f:
+            f.seek(ranges[0][0])
+            dimension = len(f.readline().split()) - 1
+    index_path, meta_path = index_paths(path)
+    # the metadata is written last and stamps the index as well, so a partial index is never taken as up to date
+    _write_replacing(index_path, lambda f: np.save(f, table[last]))
+    meta = {'source': _source_stamp(path), 'index': _source_stamp(index_path), 'dimension': dimension}
+    _write_replacing(meta_path, lambda f: f.write(json.dumps(meta).encode()))
+    logging.info('Indexed %d words of %s', len(last), path)
+
+
+def _read_index(path):
+    index_path, meta_path = index_paths(path)
+    if not (os.path.exists(index_path) and os.path.exists(meta_path)):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta['source'] != _source_stamp(path) or meta.get('index') != _source_stamp(index_path):
+        logging.info('Word index of %s is outdated', path)
+        return None
+    return np.load(index_path, mmap_mode='r'), meta['dimension']
+
+
+def _search_index(table, source, word):
+    """Offset of the line of word in source (the embedding file as bytes) by binary search of table, or None."""
+    low, high = 0, len(table)
+    while low < high:
+        middle = (low + high) // 2
+        offset, length = table[middle]
+        if source[offset:offset + length].decode('utf8', errors='ignore').lower() < word:
+            low = middle + 1
+        else:
+            high = middle
+    if low < len(table):
+        offset, length = table[low]
+        if source[offset:offset + length].decode('utf8', errors='ignore').lower() == word:
+            return int(offset)
+    return None
+
+
+def load_vec_indexed(path, words, dtype=np.float64, workers=1):
+    """Vectors of only the given words, read from the lines the word index of the embedding file points to.
+
+    The index is built first if there is none or the file changed since (see build_index), afterwards only the
+    lines of the words are read. Compressed files cannot be read at offsets, their lines are streamed instead (see
+    load_vec_selected).
+
+    Args:
+        path: embedding file in text format
+        words: words to load, words in the file are lowercased before the comparison as in utils.load_embeddings
+        dtype: dtype of the vectors
+        workers: number of processes to build the index with
+    Returns:
+        (list of the words found, array of shape (len(words found), dimension))
+    """
+    if compressed.is_compressed(path):
+        return load_vec_selected(path, words, dtype)
+    index = _read_index(path)
+    if index is None:
+        build_index(path, workers)
+        index = _read_index(path)
+    table, dimension = index
+    found = {}
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source:
+        offsets = {word: _search_index(table, source, word) for word in dict.fromkeys(words)}
+        for word, offset in sorted(((w, o) for w, o in offsets.items() if o is not None), key=lambda item: item[1]):
+            end = source.find(b'\n', offset)
+            line = source[offset:end if end >= 0 else len(source)]
+            try:
+                row = np.array(line.split()[1:], dtype=dtype)
+            except ValueError:
+                row = None
+            if row is None or len(row) != dimension:
+                logging.info('Skipping line of %s: %s', path, line[:50])
+                continue
+            found[word] = row
+    logging.info('Found %d of %d words in %s', len(found), len(offsets), path)
+    return list(found), np.array(list(found.values()), dtype=dtype).reshape(len(found), dimension)
+
+
+def binary_format(path):
+    """Format of the embedding file at path, 'fasttext' (.bin model), 'word2vec' (binary) or None (text).
+
+    Binary word2vec files start with the same header line as .vec files, so the bytes after the first word are
+    checked, which are the digits of the vector in text format.
+    """
+    if compressed.is_compressed(path):
+        return None
+    with open(path, 'rb') as f:
+        start = f.read(8)
+        if len(start) == 8 and struct.unpack('<i', start[:4])[0] == FASTTEXT_MAGIC:
+            return 'fasttext'
+        f.seek(0)
+        header = f.readline().split()
+        if len(header) != 2 or not all(part.isdigit() for part in header):
+            return None
+        vector = f.read(READ_BLOCK_SIZE // 2 ** 10).lstrip(b'\n').partition(b' ')[2][:4 * int(header[1])]
+    line = vector.partition(b'\n')[0]
+    return None if line and set(line) <= TEXT_BYTES else 'word2vec'
+
+
+def _map(path):
+    # the mapping stays open as long as arrays from np.frombuffer refer to it
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _decode(word):
+    return word.decode('utf8', errors='ignore').lower()
+
+
+def parse_word2vec_bin(path, dtype=None, words=None):
+    """Words and vectors of an embedding file in binary word2vec format.
+
+    The file is a header line 'words dimension' followed by every word, a space and its vector as float32, then
+    optionally a newline. The offsets of the vectors are found by one pass over the words, then the vectors are
+    gathered from the memory-mapped file GATHER_BLOCK_SIZE rows at a time.
+
+    Args:
+        path: embedding file in binary word2vec format
+        dtype: dtype of the vectors, float32 as stored if None
+        words: only these words are loaded if not None, words in the file are lowercased as in parse_vec
+    Returns:
+        (list of words, array of shape (len(words), dimension))
+    """
+    source = _map(path)
+    header_end = source.find(b'\n') + 1
+    count, dimension = (int(part) for part in source[:header_end].split())
+    needed = None if words is None else set(words)
+    found, offsets = [], []
+    position = header_end
+    for _ in range(count):
+        while source[position:position + 1] == b'\n':
+            position += 1
+        end = source.find(b' ', position)
+        word = _decode(source[position:end])
+        position = end + 1 + 4 * dimension
+        if needed is None or word in needed:
+            found.append(word)
+            offsets.append(end + 1)
+    data = np.frombuffer(source, dtype=np.uint8)
+    matrix = np.empty((len(found), dimension), dtype=np.float32)
+    columns = np.arange(4 * dimension)
+    for start in range(0, len(found), GATHER_BLOCK_SIZE):
+        block = np.asarray(offsets[start:start + GATHER_BLOCK_SIZE], dtype=np.intp)
+        matrix[start:start + len(block)] = data[block[:, None] + columns].view('<f4')
+    del data
+    logging.info('Loaded %d of %d words of %s', len(found), count, path)
+    return found, matrix if dtype is None else matrix.astype(dtype, copy=False)
+
+
+def _fasttext_ngrams(words, minn, maxn):
+    """Character ngrams of words (bytes with the '<' and '>' boundaries) as in fastText, in its order per word.
+
+    The ngrams of all words are found together, one NumPy operation per ngram length, and hashed with the FNV-1a
+    hash of fastText (whose bytes are signed chars), one NumPy operation per byte position.
+
+    Returns:
+        (index of the word of every ngram, hash of every ngram)
+    """
+    data = np.frombuffer(b''.join(words), dtype=np.uint8)
+    word_starts = np.cumsum([0] + [len(word) for word in words])
+    # UTF-8 continuation bytes do not start a char, every word starts with '<'
+    char_starts = np.flatnonzero(data & 0xC0 != 0x80)
+    char_words = np.searchsorted(word_starts, char_starts, side='right') - 1
+    char_counts = np.bincount(char_words, minlength=len(words))
+    char_indices = np.arange(len(char_starts)) - (np.cumsum(char_counts) - char_counts)[char_words]
+    char_ends = np.append(char_starts, len(data))
+    remaining = char_counts[char_words] - char_indices
+    owners, starts, ends, lengths = [], [], [], []
+    for n in range(max(minn, 1), maxn + 1):
+        valid = remaining >= n
+        if n == 1:
+            # the boundaries alone are no ngrams
+            valid &= (char_indices != 0) & (remaining != 1)
+        chars = np.flatnonzero(valid)
+        owners.append(char_words[chars])
+        starts.append(char_starts[chars])
+        ends.append(char_ends[chars + n])
+        lengths.append(np.full(len(chars), n))
+    owners, starts, ends, lengths = (np.concatenate(parts) for parts in (owners, starts, ends, lengths))
+    signed = data.astype(np.uint64)
+    signed[data >= 128] |= np.uint64(0xFFFFFF00)
+    hashes = np.full(len(starts), 2166136261, dtype=np.uint64)
+    sizes = ends - starts
+    for offset in range(sizes.max() if len(sizes) else 0):
+        active = np.flatnonzero(sizes > offset)
+        hashes[active] = ((hashes[active] ^ signed[starts[active] + offset]) * np.uint64(16777619)) \
+            & np.uint64(0xFFFFFFFF)
+    order = np.lexsort((lengths, starts, owners))
+    return owners[order], hashes[order]
+
+
+def parse_fasttext_bin(path, dtype=None, words=None):
+    """Words and vectors of a fastText model (.bin), the vectors are the mean of their word and ngram vectors.
+
+    The input matrix of the model is one block of float32 that is memory-mapped with np.frombuffer, only the
+    dictionary before it is read entry by entry. The ngrams are hashed only for the loaded words, GATHER_BLOCK_SIZE
+    words at a time with NumPy (see _fasttext_ngrams). Quantized models (.ftz) are not supported.
+
+    Args:
+        path: fastText model
+        dtype: dtype of the vectors, float32 as stored if None
+        words: only these words are loaded if not None, words of the model are lowercased as in parse_vec
+    Returns:
+        (list of words, array of shape (len(words), dimension))
+    """
+    source = _map(path)
+    magic, version = struct.unpack_from('<2i', source, 0)
+    if magic != FASTTEXT_MAGIC or version != FASTTEXT_VERSION:
+        raise ValueError(f'{path} is no fastText model of version {FASTTEXT_VERSION}')
+    args = struct.unpack_from('<12id', source, 8)
+    bucket, minn, maxn = args[8:11]
+    position = 8 + struct.calcsize('<12id')
+    size, nwords, _, _, pruneidx_size = struct.unpack_from('<3i2q', source, position)
+    position += struct.calcsize('<3i2q')
+    entries = []
+    for _ in range(size):
+        end = source.find(b'\0', position)
+        entry_type = source[end + 9]
+        if entry_type == 0:
+            entries.append(source[position:end])
+        position = end + 10
+    pruneidx = {}
+    for _ in range(max(pruneidx_size, 0)):
+        key, value = struct.unpack_from('<2i', source, position)
+        pruneidx[key] = value
+        position += 8
+    if source[position]:
+        raise ValueError(f'Quantized fastText models like {path} are not supported')
+    rows, dimension = struct.unpack_from('<2q', source, position + 1)
+    matrix = np.frombuffer(source, dtype='<f4', count=rows * dimension, offset=position + 17).reshape(rows, dimension)
+
+    needed = None if words is None else set(words)
+    found, ids = [], []
+    for i, word in enumerate(entries):
+        decoded = _decode(word)
+        if needed is None or decoded in needed:
+            found.append(decoded)
+            ids.append(i)
+    pruned_keys = np.array(sorted(pruneidx), dtype=np.uint64)
+    pruned_rows = np.array([pruneidx[key] for key in sorted(pruneidx)], dtype=np.int64)
+    vectors = np.empty((len(found), dimension), dtype=np.float32)
+    for start in range(0, len(found), GATHER_BLOCK_SIZE):
+        block = np.array(ids[start:start + GATHER_BLOCK_SIZE], dtype=np.int64)
+        owners = np.arange(len(block))
+        rows = block
+        if maxn > 0 and pruneidx_size != 0:
+            # fastText gives the end of sentence token no subwords
+            subworded = np.flatnonzero([entries[i] != FASTTEXT_EOS for i in block])
+            ngram_owners, hashes = _fasttext_ngrams(
+                [b'<' + entries[i] + b'>' for i in block[subworded]], minn, maxn)
+            ngram_owners = subworded[ngram_owners]
+            hashes %= np.uint64(bucket)
+            if pruneidx_size > 0:
+                slots = np.minimum(np.searchsorted(pruned_keys, hashes), len(pruned_keys) - 1)
+                kept = np.flatnonzero(pruned_keys[slots] == hashes)
+                ngram_owners, hashes = ngram_owners[kept], pruned_rows[slots[kept]]
+            # the word row first, then its ngrams in the order of fastText, which the float32 sums depend on
+            order = np.argsort(np.concatenate([owners, ngram_owners]), kind='stable')
+            owners = np.concatenate([owners, ngram_owners])[order]
+            rows = np.concatenate([block, nwords + hashes.astype(np.int64)])[order]
+        counts = np.bincount(owners, minlength=len(block))
+        sums = np.add.reduceat(matrix[rows], np.cumsum(counts) - counts, axis=0)
+        vectors[start:start + len(block)] = sums / counts[:, None]
+    logging.info('Loaded %d of %d words of %s', len(found), len(entries), path)
+    return found, vectors if dtype is None else vectors.astype(dtype, copy=False)
+
+
+def load_binary(path, dtype=None, words=None):
+    """EmbeddingStore of an embedding file in binary word2vec or fastText .bin format (see binary_format)."""
+    if binary_format(path) == 'fasttext':
+        return EmbeddingStore.from_words(*parse_fasttext_bin(path, dtype, words))
+    return EmbeddingStore.from_words(*parse_word2vec_bin(path, dtype, words))
+
+
+def _aligned(offset):
+    return -(-offset // BUNDLE_ALIGNMENT) * BUNDLE_ALIGNMENT
+
+
+def write_bundle(path, index, matrix, source_paths=()):
+    """Write embeddings as one bundle file that can be memory-mapped (see load_bundle).
+
+    The file is the magic bytes, the lengths of the header and offsets of the two blocks after it as uint64, a JSON
+    header, the words as a sorted array of fixed-width UTF-8 bytes and the vectors in the order of the words.
+
+    Args:
+        path: path of the bundle, written to a temporary file first and then renamed, so that concurrent readers
+              only see complete bundles
+        index: dict from words to their row in matrix
+        matrix: array of shape (rows, dimension), e.g. memory-mapped
+        source_paths: files the embeddings were read from, a bundle is outdated if any of them changed
+    """
+    encoded = sorted((word.encode('utf8'), row) for word, row in index.items())
+    width = max((len(word) for word, _ in encoded), default=1)
+    header = json.dumps({'count': len(encoded), 'dimension': matrix.shape[1], 'width': width,
+                         'dtype': matrix.dtype.str, 'source': [_source_stamp(p) for p in source_paths]}).encode()
+    words_offset = _aligned(len(BUNDLE_MAGIC) + 24 + len(header))
+    vectors_offset = _aligned(words_offset + len(encoded) * width)
+    rows = np.array([row for _, row in encoded], dtype=np.intp)
+
+    def write(f):
+        f.write(BUNDLE_MAGIC + struct.pack('<3Q', len(header), words_offset, vectors_offset) + header)
+        f.write(b'\0' * (words_offset - f.tell()))
+        f.write(np.array([word for word, _ in encoded], dtype=f'S{width}').tobytes())
+        f.write(b'\0' * (vectors_offset - f.tell()))
+        for start in range(0, len(rows), GATHER_BLOCK_SIZE):
+            f.write(np.ascontiguousarray(matrix[rows[start:start + GATHER_BLOCK_SIZE]]).tobytes())
+
+    _write_replacing(path, write)
+
+
+def _read_bundle_header(path):
+    with open(path, 'rb') as f:
+        if f.read(len(BUNDLE_MAGIC)) != BUNDLE_MAGIC:
+            raise ValueError(f'{path} is no embedding bundle')
+        header_length, words_offset, vectors_offset = struct.unpack('<3Q', f.read(24))
+        header = json.loads(f.read(header_length))
+    header['words_offset'] = words_offset
+    header['vectors_offset'] = vectors_offset
+    return header
+
+
+def load_bundle(path, header=None):
+    """EmbeddingStore of a bundle (see write_bundle), whose words and vectors are memory-mapped read-only, so
+    processes loading the same bundle share it through the page cache."""
+    header = _read_bundle_header(path) if header is None else header
+    if header['count'] == 0:
+        return EmbeddingStore(np.empty((0, header['dimension']), dtype=header['dtype']), {})
+    words = np.memmap(path, dtype=f"S{header['width']}", mode='r', offset=header['words_offset'],
+                      shape=(header['count'],))
+    matrix = np.memmap(path, dtype=header['dtype'], mode='r', offset=header['vectors_offset'],
+                       shape=(header['count'], header['dimension']))
+    return EmbeddingStore(matrix, SortedIndex(words))
+
+
+def bundle_path(vector_path):
+    return f'{vector_path}.bundle'
+
+
+def load_vocab_vectors(vocab_path, vector_path):
+    """EmbeddingStore of a pickled vocab (dict from words to rows) and .npy vectors, through their bundle.
+
+    The bundle is written next to the vectors on the first load and rewritten when the vocab or the vectors
+    change.
+    """
+    path = bundle_path(vector_path)
+    source = [_source_stamp(vocab_path), _source_stamp(vector_path)]
+    if os.path.exists(path):
+        header = _read_bundle_header(path)
+        if header['source'] == source:
+            return load_bundle(path, header)
+        logging.info('Embedding bundle %s is outdated', path)
+    with open(vocab_path, 'rb') as f:
+        vocab = pickle.load(f)
+    vectors = np.load(vector_path, mmap_mode='r')
+    try:
+        write_bundle(path, vocab, vectors, (vocab_path, vector_path))
+    except OSError as e:
+        logging.warning('Could not write the embedding bundle %s: %s', path, e)
+        return EmbeddingStore(vectors, vocab)
+    return load_bundle(path)
+
+
+def load_embedding_dict_cached(path, dtype=None, workers=1):
+    """EmbeddingStore of every word of the embedding file at path, backed by the (memory-mapped) cached matrix.
+
+    Rows of words that occur more than once are overwritten by later ones, as in utils.load_embeddings.
+    """
+    return EmbeddingStore.from_words(*load_vec_cached(path, np.float64 if dtype is None else dtype, workers))
@@ -0,0 +1,136 @@
+"""
+Similarities of embedding vectors that take the whole embedding vocabulary into account, computed in blocks.
+
+The vocabulary is only ever held block by block, so the memory does not grow with its size.
+"""
+import json
+import logging
+import os
+from itertools import islice
+
+import numpy as np
+
+BLOCK_SIZE = 4096
+CSLS_K = 10
+
+
+def normalize(matrix):
+    """Rows of matrix scaled to unit length."""
+    matrix = np.asarray(matrix)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def _blocks(vectors, block_size):
+    if isinstance(vectors, np.ndarray):
+        for start in range(0, len(vectors), block_size):
+            yield vectors[start:start + block_size]
+        return
+    vectors = iter(vectors)
+    while True:
+        block = list(islice(vectors, block_size))
+        if not block:
+            return
+        yield block
+
+
+def csls_penalties(queries, neighbourhood, k=CSLS_K, exclude_self=False, block_size=BLOCK_SIZE):
+    """Mean cosine similarity of every query to its k nearest neighbours in the neighbourhood, r(x) of CSLS.
+
+    The neighbourhood is read in blocks, and after every block only the k largest similarities of each query are
+    kept (found with argpartition), so the memory is bounded by len(queries) * (block_size + k).
+
+    Args:
+        queries: array of shape (q, d) of normalized vectors
+        neighbourhood: array of shape (n, d) or iterable of vectors of size d
+        k: number of nearest neighbours
+        exclude_self: whether the queries are part of the neighbourhood, their largest similarity (to
+                      themselves) is skipped then
+        block_size: number of neighbourhood vectors compared per matrix product
+    Returns:
+        array of shape (q,)
+    """
+    size = k + int(exclude_self)
+    best = np.full((len(queries), size), -np.inf, dtype=queries.dtype)
+    for block in _blocks(neighbourhood, block_size):
+        # zero vectors normalize to NaN, which argpartition and sort would rank above every similarity
+        with np.errstate(invalid='ignore', divide='ignore'):
+            similarities = queries @ normalize(np.asarray(block, dtype=queries.dtype)).T
+        similarities[~np.isfinite(similarities)] = -np.inf
+        candidates = np.concatenate([best, similarities], axis=1)
+        best = np.take_along_axis(candidates, np.argpartition(candidates, -size, axis=1)[:, -size:], axis=1)
+    best = np.sort(best, axis=1)
+    if exclude_self:
+        best = best[:, :-1]
+    # fewer than k neighbours leave some of the initial -inf
+    best = np.where(np.isfinite(best), best, np.nan)
+    return np.nanmean(best, axis=1)
+
+
+def _source_stamp(paths):
+    return [[os.path.getsize(path), os.path.getmtime(path)] for path in paths]
+
+
+def cached_csls_penalties(words, embd_dict, neighbourhood_dict, k=CSLS_K, exclude_self=False, cache_path=None,
+                          source_paths=(), block_size=BLOCK_SIZE, dtype=np.float64):
+    """CSLS penalties of words, reusing and extending the penalties cached at cache_path.
+
+    The cache is a JSON file that maps words to their penalty, together with k, exclude_self, dtype and the size and
+    modification time of source_paths (the embedding files), and is discarded if any of these changed.
+
+    Args:
+        words: words to compute the penalties for, all in embd_dict
+        embd_dict: EmbeddingStore with the vectors of words
+        neighbourhood_dict: EmbeddingStore of the whole vocabulary the nearest neighbours are taken from
+        k: number of nearest neighbours
+        exclude_self: whether embd_dict and neighbourhood_dict are the same embedding space
+        cache_path: path of the cache, nothing is cached if None
+        source_paths: files the cached penalties are derived from
+        block_size: number of neighbourhood vectors compared per matrix product
+        dtype: precision of the similarities
+    Returns:
+        array of shape (len(words),)
+    """
+    config = {'k': k, 'exclude_self': exclude_self, 'dtype': np.dtype(dtype).name,
+              'source': _source_stamp(source_paths)}
+    penalties = {}
+    if cache_path is not None and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cache = json.load(f)
+        if cache['config'] == config:
+            penalties = cache['penalties']
+        else:
+            logging.info('Discarding outdated CSLS penalties in %s', cache_path)
+    missing = [word for word in dict.fromkeys(words) if word not in penalties]
+    if missing:
+        logging.info('Computing CSLS penalties of %d words over %d words', len(missing), len(neighbourhood_dict))
+        queries = normalize(embd_dict.vectors(missing, dtype))
+        values = csls_penalties(queries, neighbourhood_dict.neighbourhood(), k, exclude_self, block_size)
+        penalties.update(zip(missing, values.tolist()))
+        if cache_path is not None:
+            with open(cache_path, 'w') as f:
+                json.dump({'config': config, 'penalties': penalties}, f)
+    return np.array([penalties[word] for word in words], dtype=dtype)
+
+
+def euclidean(norm_a, norm_b, block_size=BLOCK_SIZE):
+    """Similarity 1 / (1 + ||a - b||) of normalized row vectors.
+
+    For unit vectors ||a - b||^2 = 2 - 2 a.b, so the distances are derived in place from the dot products of
+    block_size rows of norm_a at a time, and the memory besides the result is bounded by one block.
+    """
+    result = np.empty((len(norm_a), len(norm_b)), dtype=np.result_type(norm_a, norm_b))
+    for start in range(0, len(norm_a), block_size):
+        block = norm_a[start:start + block_size] @ norm_b.T
+        block *= -2
+        block += 2
+        # rounding can leave tiny negative squared distances for (nearly) identical vectors
+        np.maximum(block, 0, out=block)
+        np.sqrt(block, out=block)
+        block += 1
+        np.reciprocal(block, out=result[start:start + block_size])
+    return result
+
+
+def csls(norm_a, norm_b, penalties_a, penalties_b):
+    """CSLS(x, y) = 2 cos(x, y) - r(x) - r(y) for normalized row vectors and their penalties."""
+    return 2 * norm_a @ norm_b.T - penalties_a[:, None] - penalties_b[None, :]
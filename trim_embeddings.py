@@ -2,6 +2,8 @@ import os
 import pickle
 import argparse
 
+import compressed
+
 
 def get_terms():
     """Fetch all terms used in weat."""
@@ -27,7 +29,7 @@ def get_terms():
 def load_filter_embeddings(fpath, terms):
     terms = [term.lower() for term in terms]
     embeddings = {}
-    with open(fpath) as f:
+    with compressed.open_stream(fpath) as f:
         for line in f:
             fields = line.strip('\n').split(' ')
             word = fields[0].lower()
@@ -50,7 +52,8 @@ def write_filtered_embs_to_file(filtered_embs, fpath):
 
 def trim_embeddings():
     parser = argparse.ArgumentParser()
-    parser.add_argument('--input', required=True, help='Path to input file containing embeddings.')
+    parser.add_argument('--input', required=True,
+                        help='Path to input file containing embeddings, optionally compressed (gz, bz2, xz).')
     parser.add_argument('--output', required=True, help='Path to output file where embeddings are written to.')
     args = parser.parse_args()
     print('Loading terms...')
@@ -8,8 +8,9 @@ from nltk.stem import WordNetLemmatizer
 from sklearn.feature_extraction.text import TfidfVectorizer
 from collections import defaultdict
 import nltk
-import codecs
 import gensim
+import compressed
+import embeddings
 from nltk.stem import WordNetLemmatizer
 from nltk.stem import PorterStemmer
 import regex
@@ -73,31 +74,36 @@ class LemmaTokenizer(object):
 
 
 # returns a dictionary of embeddings
-def load_embeddings(path, word2vec=False, rdf2vec=False):
+def load_embeddings(path, word2vec=False, rdf2vec=False, dtype=None):
     """
     >>> load_embeddings("/work/anlausch/glove_twitter/glove.twitter.27B.200d.txt")
     :param path:
     :param word2vec:
     :param rdf2vec:
+    :param dtype: numpy dtype of the vectors (e.g. np.float32), lists of floats if None
     :return:
     """
     embbedding_dict = {}
     if word2vec == False and rdf2vec == False:
-        with codecs.open(path, "r", "utf8", "ignore") as infile:
+        # the file may be compressed with gzip, bz2 or xz
+        with compressed.open_stream(path, "rt", "utf8", "ignore") as infile:
             for line in infile:
                 try:
                     parts = line.split()
                     word = parts[0].lower()
-                    nums = [float(p) for p in parts[1:]]
+                    if dtype is None:
+                        nums = [float(p) for p in parts[1:]]
+                    else:
+                        nums = np.array(parts[1:], dtype=dtype)
                     embbedding_dict[word] = nums
                 except Exception as e:
                     print(line)
                     continue
         return embbedding_dict
     elif word2vec == True:
-        #Load Google's pre-trained Word2Vec model.
+        #Load Google's pre-trained Word2Vec model, as a mapping from (lowercased) words to vectors.
         # if os.name != 'nt':
-        model = gensim.models.KeyedVectors.load_word2vec_format(path, binary=True)
+        model = embeddings.load_binary(path, dtype)
         # else:
         # model = gensim.models.Word2Vec.load_word2vec_format(path, binary=True)
         return model
@@ -1,18 +1,19 @@
 import numpy as np
-import random
-from itertools import filterfalse
-from itertools import combinations
 import codecs
-import utils
+import weat_stats
+import similarities
+import embeddings
+import weat_tests
 import os
 import pickle
 import logging
 import argparse
 import time
 from collections import OrderedDict
-import math
+from functools import lru_cache
 from time import time
-from sklearn.metrics.pairwise import euclidean_distances
+
+WORD_LIST_DIR = '/mnt/storage/harlie/users/jgoldz/bias_germ_embeddings/data/word_lists'
 
 
 class XWEAT(object):
@@ -21,15 +22,28 @@ class XWEAT(object):
     Follows from Caliskan et al 2017 (10.1126/science.aal4230).
 
     Credits: Basic implementation based on https://gist.github.com/SandyRogers/e5c2e938502a75dcae25216e4fae2da5
+
+    The names of the word lists are shuffled with shuffle_seed, or with the global random state if it is None.
     """
 
-    def __init__(self, gender, word_list_dir):
+    # word list files of all instances by path: ((size, mtime), lines, {read function: words})
+    word_lists = {}
+
+    def __init__(self, gender, word_list_dir, dtype=np.float64, shuffle_seed=None):
         self.gender = gender
+        self.dtype = dtype
+        self.shuffle_seed = shuffle_seed
         self.word_list_dir = word_list_dir
         self.wl_paths = self.get_paths(word_list_dir)
         self.embd_dict = None
-        self.vocab = None
-        self.embedding_matrix = None
+        self.embeddings_path = None
+        self.vocab_path = None
+        self.targets_vocab = None
+        self.attributes_vocab = None
+        self.targets_embedding_matrix = None
+        self.attributes_embedding_matrix = None
+        self.permutations_used = None
+        self.null_distribution = None
         if self.gender == 'both':
             self.loading_func = self.load_names
         elif self.gender == 'female':
@@ -38,6 +52,14 @@ class XWEAT(object):
             self.loading_func = self.load_male_names
         else:
             raise Exception('Gender option not known.')
+        # loaders of the sources of weat_tests by name, 'gender_names' follow the gender setting
+        self.loaders = {
+            'names': self.load_names,
+            'gender_names': self.loading_func,
+            'male_names': self.load_male_names,
+            'female_names': self.load_female_names,
+            'word_list': self.load_word_list,
+        }
 
     def get_paths(self, word_list_dir):
         """Create paths for all word list files."""
@@ -47,59 +69,80 @@ class XWEAT(object):
             wl_paths[key] = os.path.join(word_list_dir, fname)
         return wl_paths
 
-    def set_embd_dict(self, embd_dict):
-        self.embd_dict = embd_dict
+    def set_embd_dict(self, embd_dict, embeddings_path=None, vocab_path=None):
+        """Set the embeddings, embeddings_path is the file they were loaded from (the vectors if their vocabulary is
+        in vocab_path), used to cache csls_full penalties, which are outdated when either file changes.
 
-    def _build_vocab_dict(self, vocab):
-        self.vocab = OrderedDict()
-        vocab = set(vocab)
-        index = 0
-        for term in vocab:
-            if term in self.embd_dict:
-                self.vocab[term] = index
-                index += 1
-            else:
-                print('Not in vocab %s', term)
-
-    def convert_by_vocab(self, items):
-        """Converts a sequence of [tokens|ids] using the vocab."""
-        output = []
-        for item in items:
-            if item in self.vocab:
-                output.append(self.vocab[item])
-            else:
-                continue
-        return output
+        embd_dict is an embeddings.EmbeddingStore, dicts from words to vectors are copied into one.
+        """
+        if not isinstance(embd_dict, embeddings.EmbeddingStore):
+            embd_dict = embeddings.EmbeddingStore.from_dict(embd_dict, self.dtype)
+        self.embd_dict = embd_dict
+        self.embeddings_path = embeddings_path
+        self.vocab_path = vocab_path
+
+    def _build_vocab_dicts(self, targets_vocab, attributes_vocab):
+        self.targets_vocab = OrderedDict()
+        self.attributes_vocab = OrderedDict()
+        for vocab_dict, vocab in ((self.targets_vocab, targets_vocab), (self.attributes_vocab, attributes_vocab)):
+            index = 0
+            for term in set(vocab):
+                if term in self.embd_dict:
+                    vocab_dict[term] = index
+                    index += 1
+                else:
+                    print('Not in vocab %s', term)
+
+    def convert_by_vocab(self, items, type='targets'):
+        """Converts a sequence of [tokens|ids] using the targets or attributes vocab."""
+        if type == 'targets':
+            vocab = self.targets_vocab
+        elif type == 'attributes':
+            vocab = self.attributes_vocab
+        else:
+            raise NotImplementedError()
+        return [vocab[item] for item in items if item in vocab]
 
-    def _build_embedding_matrix(self):
-        self.embedding_matrix = []
-        for term, index in self.vocab.items():
-            if term in self.embd_dict:
-                self.embedding_matrix.append(self.embd_dict[term])
-            else:
-                raise AssertionError('This should not happen.')
+    def _build_embedding_matrix(self, similarity_type=None):
+        if similarity_type == 'csls_full':
+            self._build_csls_penalties()
+        self.targets_embedding_matrix = self.embd_dict.vectors(self.targets_vocab, self.dtype)
+        self.attributes_embedding_matrix = self.embd_dict.vectors(self.attributes_vocab, self.dtype)
         self.embd_dict = None
 
+    def _build_csls_penalties(self, k=similarities.CSLS_K):
+        """CSLS penalties of the targets and attributes over the whole embedding vocabulary."""
+        cache_path, source_paths = None, ()
+        if self.embeddings_path is not None:
+            cache_path = f'{self.embeddings_path}.csls{k}.json'
+            source_paths = (self.embeddings_path,)
+            if self.vocab_path is not None:
+                source_paths = (self.vocab_path,) + source_paths
+        words = list(self.targets_vocab) + list(self.attributes_vocab)
+        penalties = similarities.cached_csls_penalties(words, self.embd_dict, self.embd_dict, k, exclude_self=True,
+                                                       cache_path=cache_path, source_paths=source_paths,
+                                                       dtype=self.dtype)
+        self.targets_penalties = penalties[:len(self.targets_vocab)]
+        self.attributes_penalties = penalties[len(self.targets_vocab):]
+
     @staticmethod
     def mat_normalize(mat, norm_order=2, axis=1):
         return mat / np.transpose([np.linalg.norm(mat, norm_order, axis)])
 
-    def cosine(self, a, b):
-        norm_a = self.mat_normalize(a)
-        norm_b = self.mat_normalize(b)
+    def cosine(self, a, b, normalize=True):
+        norm_a = self.mat_normalize(a) if normalize else a
+        norm_b = self.mat_normalize(b) if normalize else b
         cos = np.dot(norm_a, np.transpose(norm_b))
         return cos
 
-    def euclidean(self, a, b):
-        norm_a = self.mat_normalize(a)
-        norm_b = self.mat_normalize(b)
-        distances = euclidean_distances(norm_a, norm_b)
-        eucl = 1 / (1+distances)
-        return eucl
+    def euclidean(self, a, b, normalize=True, block_size=similarities.BLOCK_SIZE):
+        norm_a = self.mat_normalize(a) if normalize else a
+        norm_b = self.mat_normalize(b) if normalize else b
+        return similarities.euclidean(norm_a, norm_b, block_size)
 
-    def csls(self, a, b, k=10):
-        norm_a = self.mat_normalize(a)
-        norm_b = self.mat_normalize(b)
+    def csls(self, a, b, k=10, normalize=True):
+        norm_a = self.mat_normalize(a) if normalize else a
+        norm_b = self.mat_normalize(b) if normalize else b
         sims_local_a = np.dot(norm_a, np.transpose(norm_a))
         sims_local_b = np.dot(norm_b, np.transpose(norm_b))
 
@@ -111,250 +154,98 @@ class XWEAT(object):
         return 2 * np.dot(norm_a, np.transpose(norm_b)) - loc_sims
 
     def _init_similarities(self, similarity_type):
+        """Similarities of every target (rows) to every attribute (columns), each matrix is normalized once."""
         if similarity_type == 'cosine':
-            self.similarities = self.cosine(self.embedding_matrix, self.embedding_matrix)
+            similarity = self.cosine
         elif similarity_type == 'csls':
-            self.similarities = self.csls(self.embedding_matrix, self.embedding_matrix)
+            similarity = self.csls
         elif similarity_type == 'euclidean':
-            self.similarities = self.euclidean(self.embedding_matrix, self.embedding_matrix)
+            similarity = self.euclidean
+        elif similarity_type == 'csls_full':
+            self.similarities = similarities.csls(self.mat_normalize(self.targets_embedding_matrix),
+                                                  self.mat_normalize(self.attributes_embedding_matrix),
+                                                  self.targets_penalties, self.attributes_penalties)
+            return
         else:
             raise NotImplementedError()
+        self.similarities = similarity(self.mat_normalize(self.targets_embedding_matrix),
+                                       self.mat_normalize(self.attributes_embedding_matrix), normalize=False)
 
     @staticmethod
-    def weat_1():
-        """
-        WEAT 1 (universally accepted): Targets 1=Flowers, Targets 2=Insects, Attributes 1=pleasant,
-        Attributes 2=unpleasant
-        :return: targets_1, targets_2, attributes_1, attributes_2
-        """
-        targets_1 = [
-            'aster', 'clover', 'hyacinth', 'marigold', 'poppy', 'azalea', 'crocus', 'iris', 'orchid', 'rose',
-            'blue-bell', 'daffodil', 'lilac', 'pansy', 'tulip', 'buttercup', 'daisy', 'lily', 'peony', 'violet',
-            'carnation', 'gladiola', 'magnolia', 'petunia', 'zinnia'
-        ]
-        targets_2 = [
-            'ant', 'caterpillar', 'flea', 'locust', 'spider', 'bedbug', 'centipede', 'fly', 'maggot', 'tarantula',
-            'bee', 'cockroach', 'gnat', 'mosquito', 'termite', 'beetle', 'cricket', 'hornet', 'moth', 'wasp',
-            'blackfly', 'dragonfly', 'horsefly', 'roach', 'weevil'
-        ]
-        attributes_1 = [
-            'caress', 'freedom', 'health', 'love', 'peace', 'cheer', 'friend', 'heaven', 'loyal', 'pleasure',
-            'diamond', 'gentle', 'honest', 'lucky', 'rainbow', 'diploma', 'gift', 'honor', 'miracle', 'sunrise',
-            'family', 'happy', 'laughter', 'paradise', 'vacation'
-        ]
-        attributes_2 = [
-            'abuse', 'crash', 'filth', 'murder', 'sickness', 'accident', 'death', 'grief', 'poison', 'stink',
-            'assault', 'disaster', 'hatred', 'pollute', 'tragedy', 'divorce', 'jail', 'poverty', 'ugly', 'cancer',
-            'kill', 'rotten', 'vomit', 'agony', 'prison'
-        ]
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # WEAT 2: Target 1=Musical instruments, Target 2= Weapons, Attributes 1: pleasant, Attributes 2=unpleasant
-    @staticmethod
-    def weat_2():
-        targets_1 = [
-            'bagpipe', 'cello', 'guitar', 'lute', 'trombone', 'banjo', 'clarinet', 'harmonica', 'mandolin',
-            'trumpet', 'bassoon', 'drum', 'harp', 'oboe', 'tuba', 'bell', 'fiddle', 'harpsichord', 'piano',
-            'viola', 'bongo', 'flute', 'horn', 'saxophone', 'violin']
-        targets_2 = [
-            'arrow', 'club', 'gun', 'missile', 'spear', 'axe', 'dagger', 'harpoon', 'pistol', 'sword', 'blade',
-            'dynamite', 'hatchet', 'rifle', 'tank', 'bomb', 'firearm', 'knife', 'shotgun', 'teargas', 'cannon',
-            'grenade', 'mace', 'slingshot', 'whip']
-        attributes_1 = [
-            'caress', 'freedom', 'health', 'love', 'peace', 'cheer', 'friend', 'heaven', 'loyal', 'pleasure',
-            'diamond', 'gentle', 'honest', 'lucky', 'rainbow', 'diploma', 'gift', 'honor', 'miracle', 'sunrise',
-            'family', 'happy', 'laughter', 'paradise', 'vacation'
-        ]
-        attributes_2 = [
-            'abuse', 'crash', 'filth', 'murder', 'sickness', 'accident', 'death', 'grief', 'poison', 'stink',
-            'assault', 'disaster', 'hatred', 'pollute', 'tragedy', 'divorce', 'jail', 'poverty', 'ugly', 'cancer',
-            'kill', 'rotten', 'vomit', 'agony', 'prison'
-        ]
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # Here they deleted the infrequent african american names, and the same
-    # number randomly choosen from the european american names
-    def weat_3(self):
-        # excluded in the original paper: Chip, Ian, Fred, Jed, Todd, Brandon, Wilbur, Sara, Amber,
-        # Crystal, Meredith, Shannon, Donna,
-        # Bobbie-Sue, Peggy, Sue-Ellen, Wendy
-        # targets_1 = [
-        #     'Adam', 'Harry', 'Josh', 'Roger', 'Alan', 'Frank', 'Justin', 'Ryan', 'Andrew', 'Jack', 'Matthew', 'Stephen',
-        #     'Brad', 'Greg', 'Paul', 'Hank', 'Jonathan', 'Peter', 'Amanda', 'Courtney', 'Heather', 'Melanie', 'Katie',
-        #     'Betsy', 'Kristin', 'Nancy', 'Stephanie', 'Ellen', 'Lauren',    'Colleen', 'Emily', 'Megan', 'Rachel',
-        #     'Chip', 'Ian', 'Fred', 'Jed', 'Todd', 'Brandon', 'Wilbur', 'Sara', 'Amber', 'Crystal', 'Meredith',
-        #     'Shannon', 'Donna', 'Bobbie-Sue', 'Peggy', 'Sue-Ellen', 'Wendy'
-        # ]
-        # excluded: Lerone, Percell, Rasaan, Rashaun, Everol, Terryl, Aiesha, Lashelle, Temeka, Tameisha, Teretha,
-        # Latonya, Shanise,
-        # Sharise, Tashika, Lashandra, Shavonn, Tawanda,
-        targets_1 = self.load_names(self.wl_paths['german_names']) + \
-                    self.load_names(self.wl_paths['swiss_names']) + \
-                    self.load_names(self.wl_paths['austrian_names'])
-        targets_2 = self.load_names(self.wl_paths['african_names_in_german_corpora'])
-        # targets_2 = [
-        #     'Alonzo', 'Jamel', 'Theo', 'Alphonse', 'Jerome', 'Leroy', 'Torrance', 'Darnell', 'Lamar', 'Lionel',
-        #     'Tyree', 'Deion', 'Lamont', 'Malik', 'Terrence', 'Tyrone', 'Lavon', 'Marcellus', 'Wardell', 'Nichelle',
-        #     'Shereen', 'Ebony', 'Latisha', 'Shaniqua', 'Jasmine', 'Tanisha', 'Tia', 'Lakisha', 'Latoya', 'Yolanda',
-        #     'Malika', 'Yvette', 'Lerone', 'Percell', 'Rasaan', 'Rashaun', 'Everol', 'Terryl', 'Aiesha', 'Lashelle',
-        #     'Temeka', 'Tameisha', 'Teretha', 'Latonya', 'Shanise', 'Sharise', 'Tashika', 'Lashandra', 'Shavonn',
-        #     'Tawanda'
-        # ]
-        attributes_1 = [
-            'caress', 'freedom', 'health', 'love', 'peace', 'cheer', 'friend', 'heaven', 'loyal', 'pleasure',
-            'diamond', 'gentle', 'honest', 'lucky', 'rainbow', 'diploma', 'gift', 'honor', 'miracle', 'sunrise',
-            'family', 'happy', 'laughter', 'paradise', 'vacation'
-        ]
-        # same as before but agony and prison are replaced with bomb and evil
-        attributes_2 = [
-            'abuse', 'crash', 'filth', 'murder', 'sickness', 'accident', 'death', 'grief', 'poison', 'stink',
-            'assault', 'disaster', 'hatred', 'pollute', 'tragedy', 'divorce', 'jail', 'poverty', 'ugly', 'cancer',
-            'kill', 'rotten', 'vomit', 'bomb', 'evil'
-        ]
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # again: african american names vs. european american names and pleasant vs unpleasant but with different names
-    def weat_4(self):
-        # excluded as in the original paper: Jay, Kristen, (here only excluded in the glove experiments)
-        # targets_1 = [
-        #     'Brad', 'Brendan', 'Geoffrey', 'Greg', 'Brett', 'Matthew', 'Neil', 'Todd', 'Allison', 'Anne',
-        #     'Carrie', 'Emily', 'Jill', 'Laurie',    'Meredith', 'Sarah', 'Jay', 'Kristen'
-        # ]
-        targets_1 = self.load_names(self.wl_paths['german_names']) + \
-                    self.load_names(self.wl_paths['swiss_names']) + \
-                    self.load_names(self.wl_paths['austrian_names'])
-        # excluded in GloVe experiments:    Tremayne, Latonya,
-        targets_2 = self.load_names(self.wl_paths['african_names_in_german_corpora'])
-        attributes_1 = [
-            'caress', 'freedom', 'health', 'love', 'peace', 'cheer', 'friend', 'heaven', 'loyal', 'pleasure',
-            'diamond', 'gentle', 'honest', 'lucky', 'rainbow', 'diploma', 'gift', 'honor', 'miracle', 'sunrise',
-            'family', 'happy', 'laughter', 'paradise', 'vacation'
-        ]
-        # same as before but agony and prison are replaced with bomb and evil
-        attributes_2 = [
-            'abuse', 'crash', 'filth', 'murder', 'sickness', 'accident', 'death', 'grief', 'poison', 'stink',
-            'assault', 'disaster', 'hatred', 'pollute', 'tragedy', 'divorce', 'jail', 'poverty', 'ugly', 'cancer',
-            'kill', 'rotten', 'vomit', 'bomb', 'evil'
-        ]
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # again african american vs european american names, but with different attributes
-    def weat_5(self):
-        # excluded as in the original paper: Jay, Kristen, (here only excluded in the glove experiments)
-        # targets_1 = [
-        #     'Brad', 'Brendan', 'Geoffrey', 'Greg', 'Brett', 'Matthew', 'Neil', 'Todd', 'Allison', 'Anne',
-        #     'Carrie', 'Emily', 'Jill', 'Laurie',    'Meredith', 'Sarah', 'Jay', 'Kristen'
-        # ]
-        targets_1 = self.load_names(self.wl_paths['german_names']) + \
-                    self.load_names(self.wl_paths['swiss_names']) + \
-                    self.load_names(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        # excluded in GloVe experiments:    Tremayne, Latonya,
-        targets_2 = [
-            'Darnell', 'Hakim', 'Jermaine', 'Kareem', 'Jamal', 'Leroy', 'Rasheed', 'Tyrone', 'Aisha', 'Ebony',
-            'Keisha', 'Kenya', 'Lakisha', 'Latoya', 'Tamika', 'Tanisha', 'Tremayne', 'Latonya'
-        ]
-        attributes_1 = ['joy', 'love', 'peace', 'wonderful', 'pleasure', 'friend', 'laughter', 'happy']
-        attributes_2 = ['agony', 'terrible', 'horrible', 'nasty', 'evil', 'war', 'awful', 'failure']
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # sex- career
-    @staticmethod
-    def weat_6():
-        targets_1 = ['John', 'Paul', 'Mike', 'Kevin', 'Steve', 'Greg', 'Jeff', 'Bill']
-        targets_2 = ['Amy', 'Joan', 'Lisa', 'Sarah', 'Diana', 'Kate', 'Ann', 'Donna']
-        attributes_1 = ['executive', 'management', 'professional', 'corporation', 'salary', 'office', 'business',
-                        'career']
-        attributes_2 = ['home', 'parents', 'children', 'family', 'cousins', 'marriage', 'wedding', 'relatives']
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # sex - math
-    @staticmethod
-    def weat_7():
-        targets_1 = ['math', 'algebra', 'geometry', 'calculus', 'equations', 'computation', 'numbers', 'addition']
-        targets_2 = ['poetry', 'art', 'dance', 'literature', 'novel', 'symphony', 'drama', 'sculpture']
-        attributes_1 = ['male', 'man', 'boy', 'brother', 'he', 'him', 'his', 'son']
-        attributes_2 = ['female', 'woman', 'girl', 'sister', 'she', 'her', 'hers', 'daughter']
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # sex - science
-    @staticmethod
-    def weat_8():
-        targets_1 = ['science', 'technology', 'physics', 'chemistry', 'Einstein', 'NASA', 'experiment', 'astronomy']
-        targets_2 = ['poetry', 'art', 'Shakespeare', 'dance', 'literature', 'novel', 'symphony', 'drama']
-        attributes_1 = ['brother', 'father', 'uncle', 'grandfather', 'son', 'he', 'his', 'him']
-        attributes_2 = ['sister', 'mother', 'aunt', 'grandmother', 'daughter', 'she', 'hers', 'her']
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # desease - uncontrollability
-    @staticmethod
-    def weat_9():
-        targets_1 = ['sad', 'hopeless', 'gloomy', 'tearful', 'miserable', 'depressed']
-        targets_2 = ['sick', 'illness', 'influenza', 'disease', 'virus', 'cancer']
-        # in w2v experiments, the've replaced short-term with short
-        attributes_1 = ['impermanent', 'unstable', 'variable', 'fleeting', 'short-term', 'brief', 'occasional']
-        attributes_2 = ['stable', 'always', 'constant', 'persistent', 'chronic', 'prolonged', 'forever']
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # old - pleasant
-    @staticmethod
-    def weat_10():
-        targets_1 = ['Tiffany', 'Michelle', 'Cindy', 'Kristy', 'Brad', 'Eric', 'Joey', 'Billy']
-        targets_2 = ['Ethel', 'Bernice', 'Gertrude', 'Agnes', 'Cecil', 'Wilbert', 'Mortimer', 'Edgar']
-        attributes_1 = ['joy', 'love', 'peace', 'wonderful', 'pleasure', 'friend', 'laughter', 'happy']
-        attributes_2 = ['agony', 'terrible', 'horrible', 'nasty', 'evil', 'war', 'awful', 'failure']
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # missing from the original IAT: arab-muslim
-    @staticmethod
-    def load_names(fpath, shuffle=True):
+    def _read_names(lines):
         title_lines = ['Male:', 'Female:']
         names = []
-        with open(fpath) as f:
-            for line in f:
-                line = line.strip('\n')
-                if line.startswith('source'):
-                    continue
-                if line in title_lines:
-                    continue
-                if not line:
-                    continue
-                names.append(line.lower())
-        if shuffle:
-            random.shuffle(names)
+        for line in lines:
+            if line.startswith('source'):
+                continue
+            if line in title_lines:
+                continue
+            if not line:
+                continue
+            names.append(line.lower())
         return names
 
     @staticmethod
-    def load_female_names(fpath, shuffle=True):
+    def _read_female_names(lines):
         names = []
         in_fem_names = False
-        with open(fpath) as f:
-            for line in f:
-                line = line.strip('\n')
-                if line == 'Female:':
-                    in_fem_names = True
-                    continue
-                if in_fem_names and line:
-                    names.append(line.lower())
-            if shuffle:
-                random.shuffle(names)
-            return names
+        for line in lines:
+            if line == 'Female:':
+                in_fem_names = True
+                continue
+            if in_fem_names and line:
+                names.append(line.lower())
+        return names
 
     @staticmethod
-    def load_male_names(fpath, shuffle=True):
+    def _read_male_names(lines):
         names = []
-        with open(fpath) as f:
-            for line in f:
-                line = line.strip('\n')
-                if line.startswith('source:') or line == 'Male:':
-                    continue
-                if line == 'Female:':
-                    if shuffle:
-                        random.shuffle(names)
-                    return names
-                if not line:
-                    continue
-                names.append(line.lower())
+        for line in lines:
+            if line.startswith('source:') or line == 'Male:':
+                continue
+            if line == 'Female:':
+                break
+            if not line:
+                continue
+            names.append(line.lower())
+        return names
+
+    @staticmethod
+    def _read_word_list(lines):
+        return [line.lower() for line in lines if line]
+
+    @classmethod
+    def cached_word_list(cls, read, fpath):
+        """Words read(lines) takes from the lines of the word list file at fpath, as a tuple.
+
+        The file is read once per process and again only after its size or modification time changed, and the
+        words of every read function are kept with its lines, shared by all instances.
+        """
+        stat = os.stat(fpath)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        cached = cls.word_lists.get(fpath)
+        if cached is None or cached[0] != stamp:
+            with open(fpath) as f:
+                cached = cls.word_lists[fpath] = (stamp, f.read().split('\n'), {})
+        _, lines, words = cached
+        if read not in words:
+            words[read] = tuple(read(lines))
+        return words[read]
+
+    @staticmethod
+    def load_names(fpath, shuffle=True, seed=None):
+        words = XWEAT.cached_word_list(XWEAT._read_names, fpath)
+        return weat_tests.shuffled(words, seed) if shuffle else words
+
+    @staticmethod
+    def load_female_names(fpath, shuffle=True, seed=None):
+        words = XWEAT.cached_word_list(XWEAT._read_female_names, fpath)
+        return weat_tests.shuffled(words, seed) if shuffle else words
+
+    @staticmethod
+    def load_male_names(fpath, shuffle=True, seed=None):
+        words = XWEAT.cached_word_list(XWEAT._read_male_names, fpath)
+        return weat_tests.shuffled(words, seed) if shuffle else words
 
     def load_random_subset_of_names(self, fpath):
         raise NotImplementedError
@@ -366,670 +257,63 @@ class XWEAT(object):
         raise NotImplementedError
 
     @staticmethod
-    def load_word_list(fpath):
-        with open(fpath) as f:
-            return [line.strip('\n').lower() for line in f if line.strip('\n')]
-
-    # test anti-migrant bias
-    # pleasant vs unpleasant
-    # german names vs arabic names and pleasant vs unpleasant
-    def weat_migrant_pleasant_unpleasant_1(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['arabic_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # german names vs french names and pleasant vs unpleasant
-    def weat_migrant_pleasant_unpleasant_2(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['french_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # german names vs hebrew names and pleasant vs unpleasant
-    def weat_migrant_pleasant_unpleasant_3(self):
-        targets_1 = self.load_names(self.wl_paths['german_lastnames'])
-        targets_2 = self.load_names(self.wl_paths['hebrew_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # german names vs kosovo names and pleasant vs unpleasant
-    def weat_migrant_pleasant_unpleasant_4(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['kosovo_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # german names vs macedonian names and pleasant vs unpleasant
-    def weat_migrant_pleasant_unpleasant_5(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['macedonian_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # german names vs polish names and pleasant vs unpleasant
-    def weat_migrant_pleasant_unpleasant_6(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['polish_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # german names vs portuguese names and pleasant vs unpleasant
-    def weat_migrant_pleasant_unpleasant_7(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['portuguese_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # german names vs romanian names and pleasant vs unpleasant
-    def weat_migrant_pleasant_unpleasant_8(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['romanian_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # german names vs serbish names and pleasant vs unpleasant
-    def weat_migrant_pleasant_unpleasant_9(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['serbish_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # german names vs spanish names and pleasant vs unpleasant
-    def weat_migrant_pleasant_unpleasant_10(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['spanish_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # german names vs swiss names and pleasant vs unpleasant
-    def weat_migrant_pleasant_unpleasant_11(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names'])
-        targets_2 = self.loading_func(self.wl_paths['swiss_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # swiss names vs austrian names and pleasant vs unpleasant
-    def weat_migrant_pleasant_unpleasant_12(self):
-        targets_1 = self.loading_func(self.wl_paths['swiss_names'])
-        targets_2 = self.loading_func(self.wl_paths['austrian_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # austrian names vs german names and pleasant vs unpleasant
-    def weat_migrant_pleasant_unpleasant_13(self):
-        targets_1 = self.loading_func(self.wl_paths['austrian_names'])
-        targets_2 = self.loading_func(self.wl_paths['german_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # german names vs turkish names and pleasant vs unpleasant
-    def weat_migrant_pleasant_unpleasant_14(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['turkish_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # west_european_pleasant_unpleasant
-    def weat_migrant_pleasant_unpleasant_15(self):
-        german = self.loading_func(self.wl_paths['german_names'])
-        swiss = self.loading_func(self.wl_paths['swiss_names'])
-        austrian = self.loading_func(self.wl_paths['austrian_names'])
-        targets_1 = german + swiss + austrian
-        random.shuffle(targets_1)
-        french = self.loading_func(self.wl_paths['french_names'])
-        italian = self.loading_func(self.wl_paths['italian_names'])
-        portuguese = self.loading_func(self.wl_paths['portuguese_names'])
-        spanish = self.loading_func(self.wl_paths['spanish_names'])
-        targets_2 = french + italian + portuguese + spanish
-        random.shuffle(targets_2)
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_pleasant_unpleasant_16(self):
-        # weat_east_european_pleasant_unpleasant
-        german = self.loading_func(self.wl_paths['german_names'])
-        swiss = self.loading_func(self.wl_paths['swiss_names'])
-        austrian = self.loading_func(self.wl_paths['austrian_names'])
-        targets_1 = german + swiss + austrian
-        random.shuffle(targets_1)
-        serbish = self.loading_func(self.wl_paths['serbish_names'])
-        romanian = self.loading_func(self.wl_paths['romanian_names'])
-        polish = self.loading_func(self.wl_paths['polish_names'])
-        macedonian = self.loading_func(self.wl_paths['macedonian_names'])
-        kosovo = self.loading_func(self.wl_paths['kosovo_names'])
-        bosnian = self.loading_func(self.wl_paths['bosnian_names'])
-        croatian = self.loading_func(self.wl_paths['croatian_names'])
-        hungarian = self.loading_func(self.wl_paths['hungarian_names'])
-        slovak = self.loading_func(self.wl_paths['slovak_names'])
-        targets_2 = serbish + romanian + polish + macedonian + kosovo + bosnian + croatian + hungarian + slovak
-        random.shuffle(targets_2)
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_pleasant_unpleasant_17(self):
-        # weat_middle_eastern_pleasant_unpleasant
-        german = self.loading_func(self.wl_paths['german_names'])
-        swiss = self.loading_func(self.wl_paths['swiss_names'])
-        austrian = self.loading_func(self.wl_paths['austrian_names'])
-        targets_1 = german + swiss + austrian
-        random.shuffle(targets_1)
-        afghani = self.loading_func(self.wl_paths['afghani_names'])
-        syrian = self.loading_func(self.wl_paths['syrian_names'])
-        turkish = self.loading_func(self.wl_paths['turkish_names'])
-        # arabic = self.loading_func(self.wl_paths['arabic_names'])
-        targets_2 = afghani + syrian + turkish
-        random.shuffle(targets_2)
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # career vs crime
-    # german names vs union of various eastern names and career vs crime
-    def weat_migrant_career_crime_1(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['turkish_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_career_crime_2(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['serbish_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_career_crime_3(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['romanian_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_career_crime_4(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['polish_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_career_crime_5(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['macedonian_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_career_crime_6(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['kosovo_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_career_crime_7(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['arabic_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_career_crime_8(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['french_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_career_crime_9(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['spanish_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_career_crime_10(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = self.loading_func(self.wl_paths['portuguese_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_career_crime_11(self):
-        # weat_east_european_career_crime
-        german = self.loading_func(self.wl_paths['german_names'])
-        swiss = self.loading_func(self.wl_paths['swiss_names'])
-        austrian = self.loading_func(self.wl_paths['austrian_names'])
-        targets_1 = german + swiss + austrian
-        random.shuffle(targets_1)
-        serbish = self.loading_func(self.wl_paths['serbish_names'])
-        romanian = self.loading_func(self.wl_paths['romanian_names'])
-        polish = self.loading_func(self.wl_paths['polish_names'])
-        macedonian = self.loading_func(self.wl_paths['macedonian_names'])
-        kosovo = self.loading_func(self.wl_paths['kosovo_names'])
-        bosnian = self.loading_func(self.wl_paths['bosnian_names'])
-        croatian = self.loading_func(self.wl_paths['croatian_names'])
-        hungarian = self.loading_func(self.wl_paths['hungarian_names'])
-        slovak = self.loading_func(self.wl_paths['slovak_names'])
-        targets_2 = serbish + romanian + polish + macedonian + kosovo + bosnian + croatian + hungarian + slovak
-        random.shuffle(targets_2)
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_career_crime_12(self):
-        # weat_middle_eastern_career_crime
-        german = self.loading_func(self.wl_paths['german_names'])
-        swiss = self.loading_func(self.wl_paths['swiss_names'])
-        austrian = self.loading_func(self.wl_paths['austrian_names'])
-        targets_1 = german + swiss + austrian
-        random.shuffle(targets_1)
-        afghani = self.loading_func(self.wl_paths['afghani_names'])
-        syrian = self.loading_func(self.wl_paths['syrian_names'])
-        turkish = self.loading_func(self.wl_paths['turkish_names'])
-        # arabic = self.loading_func(self.wl_paths['arabic_names'])
-        targets_2 = afghani + syrian + turkish
-        random.shuffle(targets_2)
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_career_crime_13(self):
-        targets_1 = self.load_names(self.wl_paths['german_lastnames'])
-        targets_2 = self.load_names(self.wl_paths['hebrew_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # german names vs swiss names and career vs crime
-    def weat_migrant_career_crime_14(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names'])
-        targets_2 = self.loading_func(self.wl_paths['swiss_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # swiss names vs austrian names and career vs crime
-    def weat_migrant_career_crime_15(self):
-        targets_1 = self.loading_func(self.wl_paths['swiss_names'])
-        targets_2 = self.loading_func(self.wl_paths['austrian_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # austrian names vs german names and career vs crime
-    def weat_migrant_career_crime_16(self):
-        targets_1 = self.loading_func(self.wl_paths['austrian_names'])
-        targets_2 = self.loading_func(self.wl_paths['german_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_migrant_career_crime_17(self):
-        german = self.loading_func(self.wl_paths['german_names'])
-        swiss = self.loading_func(self.wl_paths['swiss_names'])
-        austrian = self.loading_func(self.wl_paths['austrian_names'])
-        targets_1 = german + swiss + austrian
-        random.shuffle(targets_1)
-        french = self.loading_func(self.wl_paths['french_names'])
-        italian = self.loading_func(self.wl_paths['italian_names'])
-        portuguese = self.loading_func(self.wl_paths['portuguese_names'])
-        spanish = self.loading_func(self.wl_paths['spanish_names'])
-        targets_2 = french + italian + portuguese + spanish
-        random.shuffle(targets_2)
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # --- gender tests ---
-    # germanic - career vs family
-    def weat_gender_career_family_1(self):
-        # weat_male_german_female_german_career_family
-        targets_1 = self.load_male_names(self.wl_paths['german_names'])
-        targets_2 = self.load_female_names(self.wl_paths['german_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['family'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_gender_career_family_2(self):
-        # weat_male_swiss_female_swiss_career_family
-        targets_1 = self.load_male_names(self.wl_paths['swiss_names'])
-        targets_2 = self.load_female_names(self.wl_paths['swiss_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['family'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_gender_career_family_3(self):
-        # weat_male_austrian_female_austrian_career_family
-        targets_1 = self.load_male_names(self.wl_paths['austrian_names'])
-        targets_2 = self.load_female_names(self.wl_paths['austrian_names'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['family'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_gender_career_family_4(self):
-        # weat_male_germanic_female_germanic_career_family
-        mgerman = self.load_male_names(self.wl_paths['german_names'])
-        mswiss = self.load_male_names(self.wl_paths['swiss_names'])
-        maustrian = self.load_male_names(self.wl_paths['austrian_names'])
-        targets_1 = mgerman + mswiss + maustrian
-        random.shuffle(targets_1)
-        fgerman = self.loading_func(self.wl_paths['german_names'])
-        fswiss = self.load_female_names(self.wl_paths['swiss_names'])
-        faustrian = self.load_female_names(self.wl_paths['austrian_names'])
-        targets_2 = fgerman + fswiss + faustrian
-        random.shuffle(targets_2)
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['family'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # gender tests for eastern european names
-    def weat_gender_career_family_5(self):
-        # weat_male_eastern_eu_female_eastern_eu_career_family
-        mserbish = self.load_male_names(self.wl_paths['serbish_names'])
-        mromanian = self.load_male_names(self.wl_paths['romanian_names'])
-        mpolish = self.load_male_names(self.wl_paths['polish_names'])
-        mmacedonian = self.load_male_names(self.wl_paths['macedonian_names'])
-        mkosovo = self.load_male_names(self.wl_paths['kosovo_names'])
-        mbosnian = self.load_male_names(self.wl_paths['bosnian_names'])
-        mcroatian = self.load_male_names(self.wl_paths['croatian_names'])
-        mhungarian = self.load_male_names(self.wl_paths['hungarian_names'])
-        mslovak = self.load_male_names(self.wl_paths['slovak_names'])
-        targets_1 = mserbish + mromanian + mpolish + mmacedonian + mkosovo + mbosnian + mcroatian + mcroatian + \
-                    mhungarian + mslovak
-        random.shuffle(targets_1)
-        fserbish = self.load_female_names(self.wl_paths['serbish_names'])
-        fromanian = self.load_female_names(self.wl_paths['romanian_names'])
-        fpolish = self.load_female_names(self.wl_paths['polish_names'])
-        fmacedonian = self.load_female_names(self.wl_paths['macedonian_names'])
-        fkosovo = self.load_female_names(self.wl_paths['kosovo_names'])
-        fbosnian = self.load_female_names(self.wl_paths['bosnian_names'])
-        fcroatian = self.load_female_names(self.wl_paths['croatian_names'])
-        fhungarian = self.load_female_names(self.wl_paths['hungarian_names'])
-        fslovak = self.load_female_names(self.wl_paths['slovak_names'])
-        targets_2 = fserbish + fromanian + fpolish + fmacedonian + fkosovo + fbosnian + fcroatian + fhungarian + fslovak
-        random.shuffle(targets_2)
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['family'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # gender tests for western european names
-    def weat_gender_career_family_6(self):
-        # weat_male_west_european_female_western_european_career_family
-        mfrench = self.load_male_names(self.wl_paths['french_names'])
-        mitalian = self.load_male_names(self.wl_paths['italian_names'])
-        mportuguese = self.load_male_names(self.wl_paths['portuguese_names'])
-        mspanish = self.load_male_names(self.wl_paths['spanish_names'])
-        targets_1 = mfrench + mitalian + mportuguese + mspanish
-        random.shuffle(targets_1)
-        ffrench = self.load_male_names(self.wl_paths['french_names'])
-        fitalian = self.load_male_names(self.wl_paths['italian_names'])
-        fportuguese = self.load_male_names(self.wl_paths['portuguese_names'])
-        fspanish = self.load_male_names(self.wl_paths['spanish_names'])
-        targets_2 = ffrench + fitalian + fportuguese + fspanish
-        random.shuffle(targets_2)
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['family'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # gender tests for middle eastern names
-    def weat_gender_career_family_7(self):
-        # weat_male_middle_eastern_female_middle_eastern_career_family
-        mafghani = self.load_male_names(self.wl_paths['afghani_names'])
-        msyrian = self.load_male_names(self.wl_paths['syrian_names'])
-        mturkish = self.load_male_names(self.wl_paths['turkish_names'])
-        targets_1 = mafghani + msyrian + mturkish
-        random.shuffle(targets_1)
-        fafghani = self.load_female_names(self.wl_paths['afghani_names'])
-        fsyrian = self.load_female_names(self.wl_paths['syrian_names'])
-        fturkish = self.load_female_names(self.wl_paths['turkish_names'])
-        targets_2 = fafghani + fsyrian + fturkish
-        random.shuffle(targets_2)
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['family'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # tests for anti-semitism
-    def weat_jewish_pleasant_unpleasant_1(self):
-        # weat_german_jewish_pleasant_unpleasant
-        targets_1 = self.load_names(self.wl_paths['german_lastnames'])
-        targets_2 = self.load_names(self.wl_paths['jewish_lastnames_in_all_voc'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_jewish_career_crime_1(self):
-        # weat_german_jewish_career_crime
-        targets_1 = self.load_names(self.wl_paths['german_lastnames'])
-        targets_2 = self.load_names(self.wl_paths['jewish_lastnames_in_all_voc'])
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # greedy vs virtuous
-    def weat_jewish_virtuous_greed_1(self):
-        # weat_german_jewish_greed_stereotype
-        targets_1 = self.load_names(self.wl_paths['german_lastnames'])
-        targets_2 = self.load_names(self.wl_paths['jewish_lastnames_in_all_voc'])
-        attributes_1 = self.load_word_list(self.wl_paths['virtuous'])
-        attributes_2 = self.load_word_list(self.wl_paths['greed'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # germanic reference names vs english reference names
-    def weat_germanic_english_pleasant_unpleasant(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = [
-            'Adam', 'Harry', 'Josh', 'Roger', 'Alan', 'Frank', 'Justin', 'Ryan', 'Andrew', 'Jack', 'Matthew', 'Stephen',
-            'Brad', 'Greg', 'Paul', 'Hank', 'Jonathan', 'Peter', 'Amanda', 'Courtney', 'Heather', 'Melanie', 'Katie',
-            'Betsy', 'Kristin', 'Nancy', 'Stephanie', 'Ellen', 'Lauren', 'Colleen', 'Emily', 'Megan', 'Rachel',
-            'Chip', 'Ian', 'Fred', 'Jed', 'Todd', 'Brandon', 'Wilbur', 'Sara', 'Amber', 'Crystal', 'Meredith',
-            'Shannon', 'Donna', 'Bobbie-Sue', 'Peggy', 'Sue-Ellen', 'Wendy'
-        ]
-        random.shuffle(targets_2)
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_germanic_english_career_crime(self):
-        targets_1 = self.loading_func(self.wl_paths['german_names']) + \
-                    self.loading_func(self.wl_paths['swiss_names']) + \
-                    self.loading_func(self.wl_paths['austrian_names'])
-        random.shuffle(targets_1)
-        targets_2 = [
-            'Adam', 'Harry', 'Josh', 'Roger', 'Alan', 'Frank', 'Justin', 'Ryan', 'Andrew', 'Jack', 'Matthew', 'Stephen',
-            'Brad', 'Greg', 'Paul', 'Hank', 'Jonathan', 'Peter', 'Amanda', 'Courtney', 'Heather', 'Melanie', 'Katie',
-            'Betsy', 'Kristin', 'Nancy', 'Stephanie', 'Ellen', 'Lauren', 'Colleen', 'Emily', 'Megan', 'Rachel',
-            'Chip', 'Ian', 'Fred', 'Jed', 'Todd', 'Brandon', 'Wilbur', 'Sara', 'Amber', 'Crystal', 'Meredith',
-            'Shannon', 'Donna', 'Bobbie-Sue', 'Peggy', 'Sue-Ellen', 'Wendy'
-        ]
-        random.shuffle(targets_2)
-        attributes_1 = self.load_word_list(self.wl_paths['career'])
-        attributes_2 = self.load_word_list(self.wl_paths['crime_german'])
-        return targets_1, targets_2, attributes_1, attributes_2
-    
-    # religious bias tests
-    # pleasant - unpleasant
-    def weat_christianity_islam_pleasant_unpleasant(self):
-        targets_1 = self.load_names(self.wl_paths['christianity'])
-        targets_2 = self.load_names(self.wl_paths['islam'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_christianity_judaism_pleasant_unpleasant(self):
-        targets_1 = self.load_names(self.wl_paths['christianity'])
-        targets_2 = self.load_names(self.wl_paths['judaism'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    def weat_islam_judaism_pleasant_unpleasant(self):
-        targets_1 = self.load_names(self.wl_paths['islam'])
-        targets_2 = self.load_names(self.wl_paths['judaism'])
-        attributes_1 = self.load_word_list(self.wl_paths['pleasant'])
-        attributes_2 = self.load_word_list(self.wl_paths['unpleasant'])
-        return targets_1, targets_2, attributes_1, attributes_2
-
-    # occupations
-    def wefat_1(self):
-        # occupations derived from th bureau of labor statistics
-        targets = [
-            'technician', 'accountant', 'supervisor', 'engineer', 'worker', 'educator', 'clerk', 'counselor',
-            'inspector', 'mechanic', 'manager', 'therapist', 'administrator', 'salesperson', 'receptionist',
-            'librarian', 'advisor', 'pharmacist', 'janitor', 'psychologist', 'physician', 'carpenter', 'nurse',
-            'investigator', 'bartender', 'specialist', 'electrician', 'officer', 'pathologist', 'teacher', 'lawyer',
-            'planner', 'practitioner', 'plumber', 'instructor', 'surgeon', 'veterinarian', 'paramedic', 'examiner',
-            'chemist', 'machinist', 'appraiser', 'nutritionist', 'architect', 'hairdresser', 'baker', 'programmer',
-            'paralegal', 'hygienist', 'scientist'
-        ]
-        attributes_1 = ['male', 'man', 'boy', 'brother', 'he', 'him', 'his', 'son']
-        attributes_2 = ['female', 'woman', 'girl', 'sister', 'she', 'her', 'hers', 'daughter']
-        return targets, attributes_1, attributes_2
-
-    # androgynous names
-    def wefat_2(self):
-        targets = [
-            'Kelly', 'Tracy', 'Jamie', 'Jackie', 'Jesse', 'Courtney', 'Lynn', 'Taylor', 'Leslie', 'Shannon',
-            'Stacey', 'Jessie', 'Shawn', 'Stacy', 'Casey', 'Bobby', 'Terry', 'Lee', 'Ashley', 'Eddie', 'Chris', 'Jody',
-            'Pat', 'Carey', 'Willie', 'Morgan', 'Robbie', 'Joan', 'Alexis', 'Kris', 'Frankie', 'Bobbie', 'Dale',
-            'Robin', 'Billie', 'Adrian', 'Kim', 'Jaime', 'Jean', 'Francis', 'Marion', 'Dana', 'Rene', 'Johnnie',
-            'Jordan', 'Carmen', 'Ollie', 'Dominique', 'Jimmie', 'Shelby'
-        ]
-        attributes_1 = ['male', 'man', 'boy', 'brother', 'he', 'him', 'his', 'son']
-        attributes_2 = ['female', 'woman', 'girl', 'sister', 'she', 'her', 'hers', 'daughter']
-        return targets, attributes_1, attributes_2
+    def load_word_list(fpath, shuffle=False, seed=None):
+        words = XWEAT.cached_word_list(XWEAT._read_word_list, fpath)
+        return weat_tests.shuffled(words, seed) if shuffle else words
+
+    def load_source(self, source, seed=None):
+        """Words of a weat_tests.Source, inline or read from its word list file by the loader it names.
+
+        Names are shuffled with seed, see weat_tests.shuffled.
+        """
+        if source.loader == 'words':
+            return weat_tests.load_words(source)
+        return self.loaders[source.loader](self.wl_paths[source.key], seed=seed)
+
+    def test_words(self, test_id):
+        """Word lists of the test test_id, shuffled with shuffle_seed, see weat_tests.resolve."""
+        return weat_tests.resolve(get_test(test_id), self.load_source, self.shuffle_seed)
 
     def similarity_precomputed_sims(self, w1, w2, type='cosine'):
         return self.similarities[w1, w2]
 
     def word_association_with_attribute_precomputed_sims(self, w, A, B):
-        return np.mean([self.similarity_precomputed_sims(w, a) for a in A]) - np.mean([self.similarity_precomputed_sims(w, b) for b in B])
-
+        return weat_stats.word_associations(self.similarities, [w], A, B)[0]
 
-    def differential_association_precomputed_sims(self, T1, T2, A1, A2):
-        return np.sum([self.word_association_with_attribute_precomputed_sims(t1, A1, A2) for t1 in T1]) \
-                     - np.sum([self.word_association_with_attribute_precomputed_sims(t2, A1, A2) for t2 in T2])
+    def word_associations_precomputed_sims(self, T, A, B):
+        return weat_stats.word_associations(self.similarities, T, A, B)
 
-    def weat_effect_size_precomputed_sims(self, T1, T2, A1, A2):
-        return (
-                         np.mean([self.word_association_with_attribute_precomputed_sims(t1, A1, A2) for t1 in T1]) -
-                         np.mean([self.word_association_with_attribute_precomputed_sims(t2, A1, A2) for t2 in T2])
-                     ) / np.std([self.word_association_with_attribute_precomputed_sims(w, A1, A2) for w in T1 + T2])
+    def differential_association_precomputed_sims(self, T1, T2, A1, A2, associations=None):
+        if associations is None:
+            associations = self.word_associations_precomputed_sims(T1 + T2, A1, A2)
+        return weat_stats.observed_statistic(associations, len(T1))
 
-    def _random_permutation(self, iterable, r=None):
-        pool = tuple(iterable)
-        r = len(pool) if r is None else r
-        return tuple(random.sample(pool, r))
+    def weat_effect_size_precomputed_sims(self, T1, T2, A1, A2, associations=None):
+        if associations is None:
+            associations = self.word_associations_precomputed_sims(T1 + T2, A1, A2)
+        return weat_stats.effect_size(associations, len(T1))
 
-    def weat_p_value_precomputed_sims(self, T1, T2, A1, A2, sample):
+    def weat_p_value_precomputed_sims(self, T1, T2, A1, A2, sample, method='permutations', workers=1, seed=None,
+                                      significance_levels=weat_stats.SIGNIFICANCE_LEVELS, dedup=False, shard=None,
+                                      associations=None):
         print('Calculating p value ... ')
         size_of_permutation = min(len(T1), len(T2))
-        T1_T2 = T1 + T2
-        observed_test_stats_over_permutations = []
-        total_possible_permutations = math.factorial(len(T1_T2)) / math.factorial(size_of_permutation) / \
-                                      math.factorial((len(T1_T2)-size_of_permutation))
-        print('Number of possible permutations: %d', total_possible_permutations)
-        if not sample or sample >= total_possible_permutations:
-            permutations = combinations(T1_T2, size_of_permutation)
-        else:
-            print('Computing randomly first %d permutations', sample)
-            permutations = set()
-            while len(permutations) < sample:
-                permutations.add(tuple(sorted(self._random_permutation(T1_T2, size_of_permutation))))
-
-        for Xi in permutations:
-            Yi = filterfalse(lambda w: w in Xi, T1_T2)
-            observed_test_stats_over_permutations.append(self.differential_association_precomputed_sims(Xi, Yi, A1, A2))
-            if len(observed_test_stats_over_permutations) % 100000 == 0:
-                print('Iteration %s finished', str(len(observed_test_stats_over_permutations)))
-        unperturbed = self.differential_association_precomputed_sims(T1, T2, A1, A2)
-        is_over = np.array([o > unperturbed for o in observed_test_stats_over_permutations])
-        return is_over.sum() / is_over.size
-
-    def weat_stats_precomputed_sims(self, T1, T2, A1, A2, sample_p=None):
-        test_statistic = self.differential_association_precomputed_sims(T1, T2, A1, A2)
-        effect_size = self.weat_effect_size_precomputed_sims(T1, T2, A1, A2)
-        p = self.weat_p_value_precomputed_sims(T1, T2, A1, A2, sample=sample_p)
+        if associations is None:
+            associations = self.word_associations_precomputed_sims(T1 + T2, A1, A2)
+        p, self.permutations_used, self.null_distribution = weat_stats.p_value(
+            associations, size_of_permutation, sample, method=method, workers=workers, seed=seed,
+            significance_levels=significance_levels, dedup=dedup, shard=shard)
+        return p
+
+    def weat_stats_precomputed_sims(self, T1, T2, A1, A2, sample_p=None, p_value_method='permutations', workers=1,
+                                    seed=None, significance_levels=weat_stats.SIGNIFICANCE_LEVELS, dedup=False,
+                                    shard=None):
+        associations = self.word_associations_precomputed_sims(T1 + T2, A1, A2)
+        test_statistic = self.differential_association_precomputed_sims(T1, T2, A1, A2, associations)
+        effect_size = self.weat_effect_size_precomputed_sims(T1, T2, A1, A2, associations)
+        p = self.weat_p_value_precomputed_sims(T1, T2, A1, A2, sample=sample_p, method=p_value_method, workers=workers,
+                                               seed=seed, significance_levels=significance_levels, dedup=dedup,
+                                               shard=shard, associations=associations)
         return test_statistic, effect_size, p
 
     def _create_vocab(self):
@@ -1038,12 +322,9 @@ class XWEAT(object):
         :return: all
         """
         all_sets = []
-        for i in range(1, 10):
-            t1, t2, a1, a2 = getattr(self, 'weat_' + str(i))()
-            all_sets = all_sets + t1 + t2 + a1 + a2
-        for i in range(1, 2):
-            t1, a1, a2 = getattr(self, 'wefat_' + str(i))()
-            all_sets = all_sets + t1 + a1 + a2
+        for test_id in ['weat_' + str(i) for i in range(1, 10)] + ['wefat_1']:
+            for word_list in self.test_words(test_id):
+                all_sets = all_sets + word_list
         all_sets = set(all_sets)
         return all_sets
 
@@ -1059,7 +340,8 @@ class XWEAT(object):
             f.close()
 
     def run_test_precomputed_sims(self, target_1, target_2, attributes_1, attributes_2, sample_p=None,
-                                  similarity_type='cosine'):
+                                  similarity_type='cosine', p_value_method='permutations', workers=1, seed=None,
+                                  significance_levels=weat_stats.SIGNIFICANCE_LEVELS, dedup=False, shard=None):
         """Run the WEAT test for differential association between two
         sets of target words and two sets of attributes.
 
@@ -1068,17 +350,32 @@ class XWEAT(object):
                 e is the effect size, and p is the one-sided p-value measuring the
                 (un)likeliness of the null hypothesis (which is that there is no
                 difference in association between the two target word sets and
-                the attributes).
+                the attributes). With shard=(index, shards), p only covers
+                this shard of all permutations and the shards are combined
+                with weat_stats.merge_shards.
 
                 If e is large and p small, then differences in the model between
                 the attribute word sets match differences between the targets.
         """
-        vocab = target_1 + target_2 + attributes_1 + attributes_2
-        self._build_vocab_dict(vocab)
-        T1 = self.convert_by_vocab(target_1)
-        T2 = self.convert_by_vocab(target_2)
-        A1 = self.convert_by_vocab(attributes_1)
-        A2 = self.convert_by_vocab(attributes_2)
+        self._build_vocab_dicts(targets_vocab=target_1 + target_2, attributes_vocab=attributes_1 + attributes_2)
+        T1, T2, A1, A2, warning = self.convert_test(target_1, target_2, attributes_1, attributes_2)
+        self._build_embedding_matrix(similarity_type)
+        self._init_similarities(similarity_type)
+        return self.weat_stats_precomputed_sims(T1, T2, A1, A2, sample_p, p_value_method, workers, seed,
+                                                significance_levels, dedup, shard), warning
+
+    def convert_test(self, target_1, target_2, attributes_1, attributes_2):
+        """Convert the word lists of a test to ids of the vocab, dropping words so
+        that both targets and both attributes have the same size.
+
+        RETURNS:
+                (T1, T2, A1, A2, warning), where warning is set if fewer than
+                5 target words per set are left.
+        """
+        T1 = self.convert_by_vocab(target_1, type='targets')
+        T2 = self.convert_by_vocab(target_2, type='targets')
+        A1 = self.convert_by_vocab(attributes_1, type='attributes')
+        A2 = self.convert_by_vocab(attributes_2, type='attributes')
         while len(T1) < len(T2):
             print('Popped T2 %d', T2[-1])
             T2.pop(-1)
@@ -1098,9 +395,35 @@ class XWEAT(object):
         print(f'A1: {A1}')
         print(f'A2: {A2}')
         warning = 'Warning' if len(T1) < 5 else None
-        self._build_embedding_matrix()
+        return T1, T2, A1, A2, warning
+
+    def run_wefat_precomputed_sims(self, targets, attributes_1, attributes_2, sample_p=None,
+                                   similarity_type='cosine', seed=None):
+        """Run the WEFAT test for the association of every target word
+        with two sets of attributes.
+
+        RETURNS:
+                A list of (word, s, p) rows, one per target word in the vocab,
+                where s is the normalized association s(w, A, B) and p is the
+                one-sided p-value of s over the permutations of the attributes.
+        """
+        self._build_vocab_dicts(targets_vocab=targets, attributes_vocab=attributes_1 + attributes_2)
+        words = [t for t in targets if t in self.targets_vocab]
+        T = self.convert_by_vocab(words, type='targets')
+        A1 = self.convert_by_vocab(attributes_1, type='attributes')
+        A2 = self.convert_by_vocab(attributes_2, type='attributes')
+        while len(A1) < len(A2):
+            print('Popped A2 %d', A2[-1])
+            A2.pop(-1)
+        while len(A2) < len(A1):
+            print('Popped A1 %d', A1[-1])
+            A1.pop(-1)
+        assert len(A1) == len(A2)
+        self._build_embedding_matrix(similarity_type)
         self._init_similarities(similarity_type)
-        return self.weat_stats_precomputed_sims(T1, T2, A1, A2, sample_p), warning
+        associations = weat_stats.wefat_associations(self.similarities, T, A1, A2)
+        p_values, self.permutations_used = weat_stats.wefat_p_values(self.similarities, T, A1, A2, sample_p, seed)
+        return list(zip(words, associations.tolist(), p_values.tolist()))
 
     def _parse_translations(self, path='./data/vocab_en_de.csv', new_path='./data/vocab_dict_en_de.p',
                             is_russian=False):
@@ -1138,45 +461,68 @@ def load_vocab_goran(path):
     return pickle.load(open(path, 'rb'))
 
 
-def load_vectors_goran(path):
-    return np.load(path)
+@lru_cache(maxsize=None)
+def load_translation_dict(lang):
+    """Translations of the english words of the tests to lang, read once per process."""
+    return load_vocab_goran('./data/vocab_dict_en_' + lang + '.p')
+
+
+def load_text_embeddings(path, dtype=None, cache=True, words=None, workers=1):
+    """Embeddings in text format, through the binary cache next to the file (see embeddings.load_vec_cached).
 
+    If words are given and there is no cache, only their lines are read from the file through the word index
+    next to it (see embeddings.load_vec_indexed), or streamed if cache is False (see embeddings.load_vec_selected).
+    Otherwise the whole file is parsed, by workers processes (see embeddings.parse_vec_parallel).
 
-def load_embedding_dict(vocab_path='', vector_path='', embeddings_path='', glove=False, postspec=False):
+    Returns:
+        embeddings.EmbeddingStore
+    """
+    dtype = np.float64 if dtype is None else dtype
+    if words is not None and not cache:
+        return embeddings.EmbeddingStore.from_words(*embeddings.load_vec_selected(path, words, dtype))
+    if words is not None and not embeddings.is_cached(path, dtype):
+        return embeddings.EmbeddingStore.from_words(*embeddings.load_vec_indexed(path, words, dtype, workers))
+    if cache:
+        return embeddings.load_embedding_dict_cached(path, dtype, workers)
+    return embeddings.EmbeddingStore.from_words(*embeddings.parse_vec_parallel(path, dtype, workers))
+
+
+def load_embedding_dict(vocab_path='', vector_path='', embeddings_path='', glove=False, postspec=False,
+                        dtype=None, cache=True, words=None, workers=1):
     """
     >>> _load_embedding_dict()
-    :param vocab_path:
-    :param vector_path:
-    :return: embd_dict
+    :param vocab_path: pickled vocab, read with vector_path through their bundle (see embeddings.load_vocab_vectors)
+    :param vector_path: vectors in .npy format
+    :param embeddings_path: embeddings in text (vec) or binary word2vec or fastText .bin format
+    :param dtype: numpy dtype of the vectors, as stored if None (the bundle of vocab_path stays as stored)
+    :param cache: whether to cache embeddings in text format in binary format (or their word index) next to them
+    :param words: only these words are needed from embeddings_path, all are loaded if None
+    :param workers: number of processes that parse embeddings in text format
+    :return: embd_dict, an embeddings.EmbeddingStore
     """
     if glove and postspec:
         raise ValueError('Glove and postspec cannot both be true')
     elif glove:
         if os.name == 'nt':
-            embd_dict = utils.load_embeddings('C:/Users/anlausch/workspace/embedding_files/glove.6B/glove.6B.300d.txt',
-                                              word2vec=False)
+            embd_dict = load_text_embeddings('C:/Users/anlausch/workspace/embedding_files/glove.6B/glove.6B.300d.txt',
+                                             dtype, cache, workers=workers)
         else:
-            embd_dict = utils.load_embeddings('/work/anlausch/glove.6B.300d.txt', word2vec=False)
+            embd_dict = load_text_embeddings('/work/anlausch/glove.6B.300d.txt', dtype, cache, workers=workers)
         return embd_dict
     elif postspec:
-        embd_dict_temp = utils.load_embeddings('/work/anlausch/ft_postspec.txt', word2vec=False)
-        embd_dict = {}
-        for key, value in embd_dict_temp.items():
-            embd_dict[key.split('en_')[1]] = value
+        embd_dict_temp = load_text_embeddings('/work/anlausch/ft_postspec.txt', dtype, cache, workers=workers)
+        embd_dict = embd_dict_temp.rename(lambda key: key.split('en_')[1])
         assert('test' in embd_dict)
         assert ('house' in embd_dict)
         return embd_dict
     elif embeddings_path != '':
-        embd_dict = utils.load_embeddings(embeddings_path, word2vec=False)
+        if embeddings.binary_format(embeddings_path) is not None:
+            return embeddings.load_binary(embeddings_path, dtype, words)
+        embd_dict = load_text_embeddings(embeddings_path, dtype, cache, words, workers)
         return embd_dict
     else:
-        embd_dict = {}
-        vocab = load_vocab_goran(vocab_path)
-        vectors = load_vectors_goran(vector_path)
-        for term, index in vocab.items():
-            embd_dict[term] = vectors[index]
-        assert len(embd_dict) == len(vocab)
-        return embd_dict
+        # the memory-mapped bundle stays as stored, the rows of the test words are cast when they are gathered
+        return embeddings.load_vocab_vectors(vocab_path, vector_path)
 
 
 def translate(translation_dict, terms):
@@ -1208,7 +554,8 @@ def compute_oov_percentage():
     with codecs.open('./results/oov_short.txt', 'w', 'utf8') as f:
         for test in range(1,11):
             f.write('Test %d \n' % test)
-            targets_1, targets_2, attributes_1, attributes_2 = XWEAT().__getattribute__('weat_' + str(test))()
+            weat = XWEAT('both', WORD_LIST_DIR)
+            targets_1, targets_2, attributes_1, attributes_2 = weat.test_words('weat_' + str(test))
             vocab = targets_1 + targets_2 + attributes_1 + attributes_2
             vocab = [t.lower() for t in vocab]
             # f.write('English vocab: %s \n' % str(vocab))
@@ -1245,33 +592,28 @@ def compute_oov_percentage():
     f.close()
 
 
-def run_weat_test(test_id, embeddings, permutation_number=100000, do_lower=True,
-                  similarity_type='cosine', lang='de', gender='both'):
-    """Alternativ to main if user want to run tests from other
-    python script instead of calling this from cmd-line.
+def get_test(test_id):
+    """The test test_id of weat_tests.WEAT_TESTS."""
+    try:
+        return weat_tests.WEAT_TESTS[test_id]
+    except KeyError:
+        raise Exception(f'Error. Test-id {test_id} not known.')
 
-    Args:
-        test_id: str, name of method
-        embeddings: path to embedding-file in vec format
-        permutation_number: int
-        lower: bool, true if vocab should be lowercased
-        similarity_type: 'cosine' or 'euclidean'
-        lang: str, language
-        gender: str, 'both', 'female' or 'male'
+
+def load_test_words(weat, test_id, lang='de', do_lower=True):
+    """Word lists of the test test_id, translated from english to lang and lowercased.
+
+    Returns:
+        (targets_1, targets_2, attributes_1, attributes_2), targets_2 is empty for WEFAT tests
     """
-    start = time()
-    logging.basicConfig(level=logging.INFO)
-    print('XWEAT started')
-    word_list_dir = '/mnt/storage/harlie/users/jgoldz/bias_germ_embeddings/data/word_lists'
-    weat = XWEAT(gender=gender, word_list_dir=word_list_dir)
-    try:
-        test_id = getattr(XWEAT, test_id)  # test_id is the method-name
-    except AttributeError:
-        raise Exception(f'Error. Test-id/Method {test_id} not known.')
-    targets_1, targets_2, attributes_1, attributes_2 = test_id(weat)  # test_id is the method-name
+    if get_test(test_id).is_wefat:
+        targets_1, attributes_1, attributes_2 = weat.test_words(test_id)
+        targets_2 = []
+    else:
+        targets_1, targets_2, attributes_1, attributes_2 = weat.test_words(test_id)
     if lang != 'en':
         print('Translating terms from en to %s', lang)
-        translation_dict = load_vocab_goran('./data/vocab_dict_en_' + lang + '.p')
+        translation_dict = load_translation_dict(lang)
         targets_1 = translate(translation_dict, targets_1)
         targets_2 = translate(translation_dict, targets_2)
         attributes_1 = translate(translation_dict, attributes_1)
@@ -1281,92 +623,264 @@ def run_weat_test(test_id, embeddings, permutation_number=100000, do_lower=True,
         targets_2 = [t.lower() for t in targets_2]
         attributes_1 = [a.lower() for a in attributes_1]
         attributes_2 = [a.lower() for a in attributes_2]
+    return targets_1, targets_2, attributes_1, attributes_2
+
+
+def resolve_tests(tests, lang='de', do_lower=True, seed=None):
+    """Word lists of many tests, see load_test_words.
+
+    All test ids are looked up before any word list is read, the word list files are listed once per gender and the
+    translations are read once (the files themselves are cached by XWEAT.cached_word_list).
+
+    Args:
+        tests: list of (test_id, gender) pairs
+        seed: seed to shuffle the names with, see weat_tests.resolve
+    Returns:
+        dict from the (test_id, gender) pairs to their word lists
+    """
+    for test_id, _ in tests:
+        get_test(test_id)
+    weats = {}
+    words = {}
+    for test_id, gender in tests:
+        if gender not in weats:
+            weats[gender] = XWEAT(gender=gender, word_list_dir=WORD_LIST_DIR, shuffle_seed=seed)
+        words[test_id, gender] = load_test_words(weats[gender], test_id, lang, do_lower)
+    return words
+
+
+def needed_words(similarity_type, *word_lists):
+    """Words to load from the embeddings for the given word lists, None (all) if csls_full needs the vocabulary."""
+    if similarity_type == 'csls_full':
+        return None
+    return [word for word_list in word_lists for word in word_list]
+
+
+def run_weat_test(test_id, embeddings, permutation_number=100000, do_lower=True,
+                  similarity_type='cosine', lang='de', gender='both', p_value_method='permutations', workers=1,
+                  seed=None, significance_levels=weat_stats.SIGNIFICANCE_LEVELS, dedup=False, shard=None,
+                  dtype='float64'):
+    """Alternativ to main if user want to run tests from other
+    python script instead of calling this from cmd-line.
+
+    WEFAT tests (test_id 'wefat_1' or 'wefat_2') return a table instead, see run_wefat_precomputed_sims.
+
+    Args:
+        test_id: str, id of the test in weat_tests.WEAT_TESTS
+        embeddings: path to embedding-file in vec format, or binary word2vec or fastText .bin format
+        permutation_number: int
+        lower: bool, true if vocab should be lowercased
+        similarity_type: 'cosine', 'euclidean', 'csls' (penalties within the test words) or 'csls_full' (penalties
+            over the whole embedding vocabulary, cached next to the embeddings)
+        lang: str, language
+        gender: str, 'both', 'female' or 'male'
+        p_value_method: 'permutations', 'subset_sum' (exact null distribution, ignores permutation_number) or
+            'sequential' (stops sampling once p is clearly below or above the significance levels)
+        workers: int, number of processes to sample the permutations in and to parse the embeddings with
+        seed: int, seed of the random streams used to sample permutations and to shuffle the names of the test
+        significance_levels: tuple of floats, levels used by the sequential sampling
+        dedup: bool, true if permutations should be sampled without repetitions
+        shard: (int, int), index and number of shards to only enumerate this range of all permutations
+        dtype: str, 'float64' or 'float32', precision of the embeddings, similarities and statistics
+    """
+    start = time()
+    logging.basicConfig(level=logging.INFO)
+    print('XWEAT started')
+    weat = XWEAT(gender=gender, word_list_dir=WORD_LIST_DIR, dtype=np.dtype(dtype), shuffle_seed=seed)
+    targets_1, targets_2, attributes_1, attributes_2 = load_test_words(weat, test_id, lang, do_lower)
 
     t = time()
-    embd_dict = load_embedding_dict(embeddings_path=embeddings, glove=False)
+    embd_dict = load_embedding_dict(embeddings_path=embeddings, glove=False, dtype=np.dtype(dtype),
+                                    words=needed_words(similarity_type, targets_1, targets_2, attributes_1,
+                                                       attributes_2), workers=workers)
     print(f'Loading of embeddings took {round((time() - t) / 60, 2) }')
-    weat.set_embd_dict(embd_dict)
+    weat.set_embd_dict(embd_dict, embeddings)
     print('Embeddings loaded')
     print('Running test')
+    if get_test(test_id).is_wefat:
+        table = weat.run_wefat_precomputed_sims(targets_1, attributes_1, attributes_2, permutation_number,
+                                                similarity_type, seed)
+        print(f'WEFAT over {len(table)} words, permutations: {weat.permutations_used}')
+        return {'table': table, 'permutations': weat.permutations_used}
     result, warning = weat.run_test_precomputed_sims(targets_1, targets_2, attributes_1, attributes_2,
-                                                     permutation_number, similarity_type)
-    results_repr = f'test-statistic: {result[0]:.3f}, effect-size: {result[1]:.3f}, p-value: {result[2]:.3f}'
-    results_dict = {'test-statistic': result[0], 'effect-size': result[1], 'p-value': result[2], 'warning': warning}
+                                                     permutation_number, similarity_type, p_value_method, workers,
+                                                     seed, significance_levels, dedup, shard)
+    results_repr = f'test-statistic: {result[0]:.3f}, effect-size: {result[1]:.3f}, p-value: {result[2]:.3f}, ' \
+                   f'permutations: {weat.permutations_used}'
+    results_dict = {'test-statistic': result[0], 'effect-size': result[1], 'p-value': result[2], 'warning': warning,
+                    'permutations': weat.permutations_used, 'null-distribution': weat.null_distribution}
     print(results_repr)
     end = time()
     duration_in_hours = ((end - start) / 60) / 60
     print(f'Duration in hours: {duration_in_hours}')
     return results_dict
 
+
+def run_weat_suite(tests, embeddings, permutation_number=100000, do_lower=True, similarity_type='cosine', lang='de',
+                   p_value_method='permutations', workers=1, seed=None,
+                   significance_levels=weat_stats.SIGNIFICANCE_LEVELS, dedup=False, dtype='float64'):
+    """Run many WEAT tests against one embedding, which is loaded only once.
+
+    The similarities are computed once between the union of the targets and the union of the attributes of all
+    tests and every test is evaluated on them. For csls, the neighbourhood penalties are thus taken over these
+    unions instead of the words of each test.
+
+    Args:
+        tests: list of (test_id, gender) pairs, see run_weat_test and weat_tests.GENDERS, WEFAT tests are not
+               supported (run them with run_weat_test)
+        embeddings: path to embedding-file in vec format
+        the other arguments as in run_weat_test
+    Returns:
+        list of the results dicts of run_weat_test, one per test, with the additional keys 'test_id' and 'gender'
+    """
+    wefats = [test_id for test_id, _ in tests if get_test(test_id).is_wefat]
+    if wefats:
+        raise ValueError(f'WEFAT tests cannot be run in a suite, use run_weat_test: {", ".join(wefats)}')
+    start = time()
+    logging.basicConfig(level=logging.INFO)
+    print('XWEAT suite started')
+    words = resolve_tests(tests, lang, do_lower, seed)
+    targets_vocab = [word for word_lists in words.values() for word_list in word_lists[:2] for word in word_list]
+    attributes_vocab = [word for word_lists in words.values() for word_list in word_lists[2:] for word in word_list]
+
+    t = time()
+    embd_dict = load_embedding_dict(embeddings_path=embeddings, glove=False, dtype=np.dtype(dtype),
+                                    words=needed_words(similarity_type, targets_vocab, attributes_vocab),
+                                    workers=workers)
+    print(f'Loading of embeddings took {round((time() - t) / 60, 2) }')
+    weat = XWEAT(gender='both', word_list_dir=WORD_LIST_DIR, dtype=np.dtype(dtype))
+    weat.set_embd_dict(embd_dict, embeddings)
+    weat._build_vocab_dicts(targets_vocab, attributes_vocab)
+    weat._build_embedding_matrix(similarity_type)
+    weat._init_similarities(similarity_type)
+    print('Similarities computed')
+
+    results = []
+    for test_id, gender in tests:
+        print(10 * '- ' + test_id + 10 * ' -')
+        print(f'CONFIG: {gender}')
+        T1, T2, A1, A2, warning = weat.convert_test(*words[test_id, gender])
+        result = weat.weat_stats_precomputed_sims(T1, T2, A1, A2, permutation_number, p_value_method, workers, seed,
+                                                  significance_levels, dedup)
+        print(f'test-statistic: {result[0]:.3f}, effect-size: {result[1]:.3f}, p-value: {result[2]:.3f}, '
+              f'permutations: {weat.permutations_used}')
+        results.append({'test_id': test_id, 'gender': gender, 'test-statistic': result[0], 'effect-size': result[1],
+                        'p-value': result[2], 'warning': warning, 'permutations': weat.permutations_used,
+                        'null-distribution': weat.null_distribution})
+    end = time()
+    duration_in_hours = ((end - start) / 60) / 60
+    print(f'Duration in hours: {duration_in_hours}')
+    return results
+
 def main():
     def boolean_string(s):
         if s not in {'False', 'True', 'false', 'true'}:
             raise ValueError('Not a valid boolean string')
         return s == 'True' or s == 'true'
     parser = argparse.ArgumentParser(description='Running XWEAT')
-    parser.add_argument('--test_id', type=str, help='ID of the weat test to run', required=False)
+    parser.add_argument('--test_id', type=str, help='ID of the weat test to run, wefat_1 and wefat_2 write a table of '
+                                                    'the association of every target word', required=False)
+    parser.add_argument('--list_tests', action='store_true', help='List the ids of the tests and exit')
     parser.add_argument('--permutation_number', type=int, default=None,
-                                            help='Number of permutations (otherwise all will be run)', required=False)
+                                            help='Number of permutations (otherwise all will be run, as they are if '
+                                                 'there are few enough)', required=False)
     parser.add_argument('--output_file', type=str, default=None, help='File to store the results)', required=False)
-    parser.add_argument('--lower', type=boolean_string, default=False, help='Whether to lower the vocab', required=True)
-    parser.add_argument('--similarity_type', type=str, default='cosine', help='Which similarity function to use',
-                                            required=False)
+    parser.add_argument('--lower', type=boolean_string, default=None,
+                        help='Whether to lower the vocab (required unless listing the tests)', required=False)
+    parser.add_argument('--similarity_type', type=str, default='cosine',
+                        help="Which similarity function to use: 'cosine', 'euclidean', 'csls' or 'csls_full' (csls "
+                             "over the whole embedding vocabulary)", required=False)
     parser.add_argument('--embedding_vocab', type=str, help='Vocab of the embeddings')
     parser.add_argument('--embedding_vectors', type=str, help='Vectors of the embeddings')
     parser.add_argument('--use_glove', type=boolean_string, default=False, help='Use glove')
     parser.add_argument('--postspec', type=boolean_string, default=False, help='Use postspecialized fasttext')
     parser.add_argument('--is_vec_format', type=boolean_string, default=False,
-                        help='Whether embeddings are in vec format')
+                        help='Whether embeddings are in vec format (binary word2vec and fastText .bin files are '
+                             'detected and read as well)')
     parser.add_argument('--embeddings', type=str, help='Vectors and vocab of the embeddings')
     parser.add_argument('--lang', type=str, default='en', help='Language to test')
     parser.add_argument('--gender', type=str, default='both', help="Gender settings: 'both', 'female', 'male'")
+    parser.add_argument('--p_value_method', type=str, default='permutations', choices=weat_stats.P_VALUE_METHODS,
+                        help="How to compute the p-value: 'permutations' (sampled or enumerated) or 'subset_sum' "
+                             "(exact null distribution) or 'sequential' (stop sampling early)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes to sample the permutations in, with seeded random streams, and to '
+                             'parse embeddings in vec format with')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed of the random streams used to sample permutations and to shuffle the names')
+    parser.add_argument('--dedup_permutations', type=boolean_string, default=False,
+                        help='Whether to sample permutations without repetitions')
+    parser.add_argument('--significance_levels', type=float, nargs='+', default=weat_stats.SIGNIFICANCE_LEVELS,
+                        help='Levels at which the sequential p-value sampling decides whether to stop')
+    parser.add_argument('--shard', type=int, default=None,
+                        help='Index of the shard of all permutations to enumerate (merge with weat_stats.py)')
+    parser.add_argument('--shards', type=int, default=None, help='Number of shards the permutations are split into')
+    parser.add_argument('--dtype', type=str, default='float64', choices=['float64', 'float32'],
+                        help='Precision of the embeddings, similarities and statistics')
     # parser.add_argument('--word_list_dir', type='str', help='Path to word list files.')
     args = parser.parse_args()
+    if args.list_tests:
+        for test in weat_tests.WEAT_TESTS.values():
+            print(f'{test.name}\t{test.category}\t{",".join(test.genders)}\t{test.lang}\t{test.description}')
+        return
+    if args.test_id is None:
+        parser.error('--test_id is required')
+    if args.lower is None:
+        parser.error('--lower is required')
+    if (args.shard is None) != (args.shards is None):
+        parser.error('--shard and --shards must be given together')
+    shard = None
+    if args.shards is not None:
+        if not 0 <= args.shard < args.shards:
+            parser.error('--shard must be at least 0 and smaller than --shards')
+        shard = (args.shard, args.shards)
 
     start = time()
     logging.basicConfig(level=print)
     print('XWEAT started')
-    word_list_dir = '/mnt/storage/harlie/users/jgoldz/bias_germ_embeddings/data/word_lists'
-    weat = XWEAT(gender=args.gender, word_list_dir=word_list_dir)
-    try:
-        test_id = getattr(XWEAT, args.test_id)  # test_id is the method-name
-    except AttributeError:
-        raise Exception(f'Error. Test-id/Method {args.test_id} not known.')
-    targets_1, targets_2, attributes_1, attributes_2 = test_id(weat)  # test_id is the method-name
-    if args.lang != 'en':
-        print('Translating terms from en to %s', args.lang)
-        translation_dict = load_vocab_goran('./data/vocab_dict_en_' + args.lang + '.p')
-        targets_1 = translate(translation_dict, targets_1)
-        targets_2 = translate(translation_dict, targets_2)
-        attributes_1 = translate(translation_dict, attributes_1)
-        attributes_2 = translate(translation_dict, attributes_2)
-    if args.lower:
-        targets_1 = [t.lower() for t in targets_1]
-        targets_2 = [t.lower() for t in targets_2]
-        attributes_1 = [a.lower() for a in attributes_1]
-        attributes_2 = [a.lower() for a in attributes_2]
+    dtype = np.dtype(args.dtype)
+    weat = XWEAT(gender=args.gender, word_list_dir=WORD_LIST_DIR, dtype=dtype, shuffle_seed=args.seed)
+    is_wefat = get_test(args.test_id).is_wefat
+    targets_1, targets_2, attributes_1, attributes_2 = load_test_words(weat, args.test_id, args.lang, args.lower)
 
     if args.use_glove:
         print('Using glove')
-        embd_dict = load_embedding_dict(glove=True)
+        embd_dict = load_embedding_dict(glove=True, dtype=dtype)
     elif args.postspec:
         print('Using postspecialized embeddings')
-        embd_dict = load_embedding_dict(postspec=True)
+        embd_dict = load_embedding_dict(postspec=True, dtype=dtype)
     elif args.is_vec_format:
         print('Embeddings are in vec format')
         t = time()
-        embd_dict = load_embedding_dict(embeddings_path=args.embeddings, glove=False)
+        embd_dict = load_embedding_dict(embeddings_path=args.embeddings, glove=False, dtype=dtype,
+                                        words=needed_words(args.similarity_type, targets_1, targets_2, attributes_1,
+                                                           attributes_2), workers=args.workers)
         print(f'Loading of embeddings took {round((time() - t) / 60, 2) }')
     else:
         embd_dict = load_embedding_dict(vocab_path=args.embedding_vocab, vector_path=args.embedding_vectors,
-                                        glove=False)
-    weat.set_embd_dict(embd_dict)
+                                        glove=False, dtype=dtype)
+    if args.use_glove or args.postspec:
+        weat.set_embd_dict(embd_dict)
+    elif args.is_vec_format:
+        weat.set_embd_dict(embd_dict, args.embeddings)
+    else:
+        weat.set_embd_dict(embd_dict, args.embedding_vectors, args.embedding_vocab)
 
     print('Embeddings loaded')
     print('Running test')
+    if is_wefat:
+        table = weat.run_wefat_precomputed_sims(targets_1, attributes_1, attributes_2, args.permutation_number,
+                                                args.similarity_type, args.seed)
+        print(f'WEFAT over {len(table)} words, permutations: {weat.permutations_used}')
+        # appended like the WEAT results, every table starts with its own header line
+        weat_stats.write_wefat_table(args.output_file, table, 'a' if os.path.exists(args.output_file) else 'w')
+        return
     result, warning = weat.run_test_precomputed_sims(targets_1, targets_2, attributes_1, attributes_2,
-                                                     args.permutation_number, args.similarity_type)
-    results_repr = f'test-statistic: {result[0]:.3f}, effect-size: {result[1]:.3f}, p-value: {result[2]:.3f}'
+                                                     args.permutation_number, args.similarity_type,
+                                                     args.p_value_method, args.workers, args.seed,
+                                                     args.significance_levels, args.dedup_permutations, shard)
+    results_repr = f'test-statistic: {result[0]:.3f}, effect-size: {result[1]:.3f}, p-value: {result[2]:.3f}, ' \
+                   f'permutations: {weat.permutations_used}'
     print(results_repr)
     print(f'Warning: {warning}')
     mode = 'a' if os.path.exists(args.output_file) else 'w'
@@ -1386,6 +900,9 @@ def main():
         f.write(str(duration_in_hours))
         f.write('\n-----\n')
         f.close()
+    weat_stats.write_null_distribution(args.output_file + '.null.jsonl', weat.null_distribution, mode,
+                                       test_id=args.test_id, lower=args.lower, lang=args.lang, gender=args.gender,
+                                       shard=args.shard, shards=args.shards)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,639 @@
+"""
+Vectorized statistics for the WEAT permutation test, shared by weat.py and xweat.py.
+
+The test statistic of a permutation (X, Y) of the targets only depends on the per-word associations
+s(w, A1, A2), so these are computed once and every permutation becomes a masked reduction over them.
+Permutations are represented as tuples of positions into the concatenated target list T1 + T2.
+"""
+import argparse
+import json
+import logging
+import math
+from functools import lru_cache
+from itertools import combinations
+from itertools import islice
+from multiprocessing import Pool
+
+import numpy as np
+from scipy.stats import beta
+
+BLOCK_SIZE = 10000
+GRAY_CODE_BLOCK_SIZE = 2 ** 16
+# up to this many permutations (C(24, 12) is about 2.7M) enumerating all is cheap enough to replace sampling
+EXACT_PERMUTATION_LIMIT = 2 ** 22
+REVOLVING_DOOR_TABLE_SIZE = 2 ** 14
+FIXED_POINT = 2 ** 40
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+LOG_INTERVAL = 100000
+SUBSET_SUM_CELLS = 2 ** 24
+SEQUENTIAL_BATCH_SIZE = 1000
+SIGNIFICANCE_LEVELS = (0.01, 0.05)
+NULL_DISTRIBUTION_BINS = 1000
+P_VALUE_METHODS = ('permutations', 'subset_sum', 'sequential')
+
+
+class NullDistribution(object):
+    """
+    Fixed-size histogram of the test statistic over the evaluated permutations.
+
+    The bins span the smallest to the largest statistic any permutation can have, so the memory does not depend
+    on the number of permutations and histograms of separate runs (e.g. workers) can be merged by adding counts.
+    """
+
+    def __init__(self, low, high, bins=NULL_DISTRIBUTION_BINS, observed=None):
+        self.low = float(low)
+        self.high = float(high)
+        self.observed = None if observed is None else float(observed)
+        self.counts = np.zeros(bins)
+        self.over = None
+
+    @classmethod
+    def for_associations(cls, associations, size_of_permutation, bins=NULL_DISTRIBUTION_BINS):
+        """Histogram covering all test statistics of permutations of the given associations."""
+        ordered = np.sort(associations)
+        total = ordered.sum()
+        low = 2 * ordered[:size_of_permutation].sum() - total
+        high = 2 * ordered[len(ordered) - size_of_permutation:].sum() - total
+        return cls(low, high, bins, observed_statistic(np.asarray(associations), size_of_permutation))
+
+    def empty_copy(self):
+        return NullDistribution(self.low, self.high, len(self.counts), self.observed)
+
+    @property
+    def edges(self):
+        return np.linspace(self.low, self.high, len(self.counts) + 1)
+
+    @property
+    def centers(self):
+        edges = self.edges
+        return (edges[:-1] + edges[1:]) / 2
+
+    def add(self, stats, weights=None):
+        """Add test statistics, optionally weighted by how many permutations have each of them."""
+        bins = len(self.counts)
+        span = self.high - self.low if self.high > self.low else 1.
+        indices = np.clip(((np.asarray(stats) - self.low) / span * bins).astype(np.int64), 0, bins - 1)
+        self.counts += np.bincount(indices, weights, minlength=bins)
+
+    def merge(self, other):
+        self.counts += other.counts
+        if other.over is not None:
+            self.over = (self.over or 0) + other.over
+
+    def p_value(self, observed=None, two_sided=False):
+        """Approximate p-value for a (new) observed statistic, from the bin centers."""
+        observed = self.observed if observed is None else observed
+        if two_sided:
+            over = np.abs(self.centers) >= abs(observed)
+        else:
+            over = self.centers > observed
+        return self.counts[over].sum() / self.counts.sum()
+
+    def to_dict(self):
+        return {'low': self.low, 'high': self.high, 'observed': self.observed, 'over': self.over,
+                'counts': self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, record):
+        null_distribution = cls(record['low'], record['high'], len(record['counts']), record['observed'])
+        null_distribution.counts = np.array(record['counts'], dtype=np.float64)
+        null_distribution.over = record.get('over')
+        return null_distribution
+
+
+def write_null_distribution(path, null_distribution, mode='a', **config):
+    """Append the null distribution of one test run as a JSON line, together with its config."""
+    record = dict(config)
+    record.update(null_distribution.to_dict())
+    with open(path, mode) as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def merge_shards(paths):
+    """Combine the null distributions written by the shards of one exactly enumerated test.
+
+    Args:
+        paths: JSONL files written by write_null_distribution, which together contain every shard exactly once
+    Returns:
+        (p-value over all shards, number of permutations, merged NullDistribution)
+    """
+    records = []
+    for path in paths:
+        with open(path) as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    if not records:
+        raise ValueError('No shards found in {}'.format(', '.join(paths)))
+    shards = records[0].get('shards')
+    indices = sorted(record.get('shard') for record in records)
+    if shards is None or indices != list(range(shards)) or any(r.get('shards') != shards for r in records):
+        raise ValueError('Expected shards 0 to {} exactly once, got {}'.format(shards, indices))
+    merged = NullDistribution.from_dict(records[0])
+    for record in records[1:]:
+        merged.merge(NullDistribution.from_dict(record))
+    total = int(round(merged.counts.sum()))
+    return merged.over / total, total, merged
+
+
+def test_statistics(associations, masks):
+    """Differential association s(X, Y, A1, A2) for a block of permutations.
+
+    Args:
+        associations: array of shape (n,), s(w, A1, A2) for every word of T1 + T2
+        masks: boolean array of shape (b, n), True for the words that form X in each permutation
+    Returns:
+        array of shape (b,)
+    """
+    return np.where(masks, associations, 0.).sum(axis=1) - np.where(masks, 0., associations).sum(axis=1)
+
+
+def observed_statistic(associations, size_of_permutation):
+    """Test statistic of the unpermuted split, where X is the first size_of_permutation words."""
+    mask = np.zeros((1, len(associations)), dtype=bool)
+    mask[0, :size_of_permutation] = True
+    return test_statistics(associations, mask)[0]
+
+
+def word_associations(similarities, targets, attributes_1, attributes_2):
+    """s(w, A1, A2) for every target word, from one sub-matrix of the similarities per attribute set.
+
+    Args:
+        similarities: array of shape (v, v') indexed by vocab ids
+        targets: ids of the target words, the rows
+        attributes_1: ids of A1, the columns
+        attributes_2: ids of A2, the columns
+    Returns:
+        array of shape (len(targets),)
+    """
+    return (similarities[np.ix_(targets, attributes_1)].mean(axis=1)
+            - similarities[np.ix_(targets, attributes_2)].mean(axis=1))
+
+
+def effect_size(associations, size_of_permutation):
+    """WEAT effect size, the difference of the mean associations of X and Y over the std of all of them."""
+    associations = np.asarray(associations)
+    return ((associations[:size_of_permutation].mean() - associations[size_of_permutation:].mean())
+            / associations.std())
+
+
+def _masks_for_block(block, n):
+    rows = np.array(block)
+    masks = np.zeros((len(block), n), dtype=bool)
+    masks[np.arange(len(block))[:, None], rows] = True
+    return masks
+
+
+def wefat_associations(similarities, targets, attributes_1, attributes_2):
+    """Normalized association s(w, A, B) of WEFAT for every target word, from one sub-matrix of the similarities.
+
+    The difference of the mean similarities to A and B is divided by the std of the similarities to all of A + B.
+    """
+    similarities = similarities[np.ix_(targets, list(attributes_1) + list(attributes_2))]
+    size_of_attributes_1 = len(attributes_1)
+    return ((similarities[:, :size_of_attributes_1].mean(axis=1) - similarities[:, size_of_attributes_1:].mean(axis=1))
+            / similarities.std(axis=1))
+
+
+def wefat_p_values(similarities, targets, attributes_1, attributes_2, sample=None, seed=None, block_size=BLOCK_SIZE):
+    """One-sided permutation p-values of WEFAT for every target word, from one shared set of attribute permutations.
+
+    A permutation splits A + B into two sets of the sizes of A and B. The std normalization of s(w, A, B) is the same
+    for every permutation and the difference of the means grows with the sum of the similarities to the first set, so
+    only these sums are compared, for a whole block of permutations and all words in one matrix product. As in
+    count_exceeding_gray_code, the similarities are converted to fixed point integers so the sums are exact.
+
+    Args:
+        similarities: array of shape (v, v') indexed by vocab ids
+        targets: ids of the target words, the rows
+        attributes_1: ids of A, the columns
+        attributes_2: ids of B, the columns
+        sample: number of random attribute permutations, all permutations are enumerated if None or larger than
+                their number
+        seed: seed of the random permutations
+        block_size: number of permutations evaluated per matrix product
+    Returns:
+        (array of shape (len(targets),) with the fraction of permutations over the observed association of each
+         word, number of permutations this is based on)
+    """
+    similarities = similarities[np.ix_(targets, list(attributes_1) + list(attributes_2))]
+    n = similarities.shape[1]
+    size_of_attributes_1 = len(attributes_1)
+    total_possible_permutations = math.comb(n, size_of_attributes_1)
+    logging.info('Number of possible attribute permutations: %d', total_possible_permutations)
+    scale = np.abs(similarities).max() or 1.
+    fixed = np.rint(similarities / scale * FIXED_POINT).astype(np.int64)
+    observed = fixed[:, :size_of_attributes_1].sum(axis=1)
+    if not sample or sample >= total_possible_permutations:
+        permutations = all_permutations(n, size_of_attributes_1)
+        blocks = (_masks_for_block(block, n) for block in iter(lambda: list(islice(permutations, block_size)), []))
+    else:
+        rng = np.random.default_rng(seed)
+        blocks = (random_masks(rng, n, size_of_attributes_1, min(block_size, sample - start))
+                  for start in range(0, sample, block_size))
+    over = np.zeros(len(targets), dtype=np.int64)
+    total = 0
+    for masks in blocks:
+        sums = fixed @ masks.T.astype(np.int64)
+        over += (sums > observed[:, None]).sum(axis=1)
+        total += len(masks)
+    return over / total, total
+
+
+def write_wefat_table(path, rows, mode='w'):
+    """Write the WEFAT results, one (word, association, p-value) row per target word, as a tab separated table.
+
+    With mode='a', the table with its header line is appended to the file.
+    """
+    with open(path, mode) as f:
+        f.write('word\tassociation\tp-value\n')
+        for word, association, p in rows:
+            f.write('{}\t{:.6f}\t{:.6f}\n'.format(word, association, p))
+
+
+def all_permutations(n, size_of_permutation):
+    """All subsets of size_of_permutation positions out of n, in itertools.combinations order."""
+    return combinations(range(n), size_of_permutation)
+
+
+def _revolving_door_last(m, j):
+    """Last j-subset of range(m) in revolving door order."""
+    if j == 0:
+        return set()
+    if j == m:
+        return set(range(m))
+    return set(range(j - 1)) | {m - 1}
+
+
+def _revolving_door_transition(m, j):
+    """Swap from the j-subsets of range(m - 1) to the ones that contain m - 1, as (out, in)."""
+    previous = _revolving_door_last(m - 1, j)
+    following = _revolving_door_last(m - 1, j - 1) | {m - 1}
+    return (previous - following).pop(), (following - previous).pop()
+
+
+def _revolving_door_parts(m, j, reverse, start, stop):
+    out, into = _revolving_door_transition(m, j)
+    if not reverse:
+        head, swap, tail = (m - 1, j, False), (out, into), (m - 1, j - 1, True)
+    else:
+        head, swap, tail = (m - 1, j - 1, False), (into, out), (m - 1, j, True)
+    head_length = math.comb(head[0], head[1]) - 1
+    yield from revolving_door_swaps(*head, start=start, stop=stop)
+    if start <= head_length < stop:
+        yield np.array([swap[0]], dtype=np.int16), np.array([swap[1]], dtype=np.int16)
+    yield from revolving_door_swaps(*tail, start=max(start - head_length - 1, 0), stop=stop - head_length - 1)
+
+
+@lru_cache(maxsize=None)
+def _revolving_door_table(m, j, reverse):
+    parts = list(_revolving_door_parts(m, j, reverse, 0, math.comb(m, j) - 1))
+    return np.concatenate([outs for outs, _ in parts]), np.concatenate([ins for _, ins in parts])
+
+
+def revolving_door_swaps(m, j, reverse=False, start=0, stop=None):
+    """Walk all j-subsets of range(m) in revolving door order, where consecutive subsets differ in one element.
+
+    The walk starts at {0, ..., j - 1} (or ends there if reverse) and is generated recursively as the j-subsets
+    of range(m - 1) followed by the reversed (j - 1)-subsets of range(m - 1) with m - 1 added. Swap i leads from
+    the subset of rank i to the one of rank i + 1, and only the swaps start to stop - 1 are generated.
+
+    Yields:
+        (outs, ins), int arrays of the elements that leave and enter the subset in each step
+    """
+    length = math.comb(m, j) - 1
+    stop = length if stop is None else min(stop, length)
+    if j == 0 or j == m or start >= stop:
+        return
+    if length < REVOLVING_DOOR_TABLE_SIZE:
+        outs, ins = _revolving_door_table(m, j, reverse)
+        yield outs[start:stop], ins[start:stop]
+    else:
+        yield from _revolving_door_parts(m, j, reverse, start, stop)
+
+
+def revolving_door_unrank(m, j, rank):
+    """The j-subset of range(m) at position rank of the revolving door order, as a sorted list."""
+    subset = []
+    while 0 < j < m:
+        head = math.comb(m - 1, j)
+        if rank >= head:
+            # rank within the reversed (j - 1)-subsets of range(m - 1), turned into a forward rank
+            rank = math.comb(m - 1, j - 1) - 1 - (rank - head)
+            subset.append(m - 1)
+            j -= 1
+        m -= 1
+    if j == m:
+        subset.extend(range(m))
+    return sorted(subset)
+
+
+def shard_range(total, shard, shards):
+    """Contiguous range of ranks [start, stop) of shard out of shards over total permutations."""
+    return total * shard // shards, total * (shard + 1) // shards
+
+
+def count_exceeding_gray_code(associations, size_of_permutation, block_size=GRAY_CODE_BLOCK_SIZE,
+                              null_distribution=None, start=0, stop=None):
+    """Count all permutations whose test statistic is larger than the observed one, in revolving door order.
+
+    Each permutation differs from the previous one by a single swapped word, so its sum of associations is
+    updated in O(1) by a cumulative sum over a block of swaps. Associations are converted to fixed point
+    integers for this, so the running sums do not drift. Only the permutations of rank start to stop - 1 are
+    evaluated if these are given, which splits the enumeration into disjoint shards.
+
+    Args:
+        associations: array of shape (n,), s(w, A1, A2) for every word of T1 + T2
+        size_of_permutation: number of words in T1
+        block_size: number of swaps evaluated per NumPy reduction
+        null_distribution: NullDistribution the test statistics are added to
+        start: rank of the first permutation
+        stop: rank after the last permutation, all permutations from start if None
+    Returns:
+        (number of permutations over the observed statistic, number of permutations evaluated)
+    """
+    associations = np.asarray(associations, dtype=np.float64)
+    n = len(associations)
+    stop = math.comb(n, size_of_permutation) if stop is None else stop
+    if start >= stop:
+        return 0, 0
+    scale = np.abs(associations).max() or 1.
+    fixed = np.rint(associations / scale * FIXED_POINT).astype(np.int64)
+    fixed_total = fixed.sum()
+    observed = fixed[:size_of_permutation].sum()
+    current = fixed[revolving_door_unrank(n, size_of_permutation, start)].sum()
+    over = int(current > observed)
+    total = 1
+    if null_distribution is not None:
+        null_distribution.add([(2 * current - fixed_total) * scale / FIXED_POINT])
+    pending = []
+    swaps = revolving_door_swaps(n, size_of_permutation, start=start, stop=stop - 1)
+    while True:
+        part = next(swaps, None)
+        if part is not None:
+            pending.append(part)
+        if pending and (part is None or sum(len(outs) for outs, _ in pending) >= block_size):
+            outs = np.concatenate([outs for outs, _ in pending])
+            ins = np.concatenate([ins for _, ins in pending])
+            pending = []
+            sums = current + np.cumsum(fixed[ins] - fixed[outs])
+            current = sums[-1]
+            over += int((sums > observed).sum())
+            if null_distribution is not None:
+                null_distribution.add((2 * sums - fixed_total) * scale / FIXED_POINT)
+            if (total + len(sums)) // LOG_INTERVAL > total // LOG_INTERVAL:
+                logging.info('Iteration %d finished', (total + len(sums)) // LOG_INTERVAL * LOG_INTERVAL)
+            total += len(sums)
+        if part is None:
+            break
+    return over, total
+
+
+def random_masks(rng, n, size_of_permutation, number):
+    """Masks of number uniformly random subsets of size_of_permutation positions out of n."""
+    keys = rng.random((number, n))
+    rows = np.argpartition(keys, size_of_permutation - 1, axis=1)[:, :size_of_permutation]
+    masks = np.zeros((number, n), dtype=bool)
+    masks[np.arange(number)[:, None], rows] = True
+    return masks
+
+
+def mask_hashes(masks):
+    """64 bit hashes of permutation masks, which are the masks' bit patterns themselves for up to 64 words."""
+    packed = np.packbits(masks, axis=1, bitorder='little')
+    padding = -packed.shape[1] % 8
+    words = np.pad(packed, ((0, 0), (0, padding))).view(np.uint64)
+    hashes = words[:, 0].copy()
+    for i in range(1, words.shape[1]):
+        hashes = hashes * HASH_MULTIPLIER ^ words[:, i]
+    return hashes
+
+
+def _count_exceeding_sampled(associations, size_of_permutation, observed, sample, seed_sequence, block_size,
+                             dedup=False, null_distribution=None):
+    """Draw sample random permutations from the stream of seed_sequence and count those over observed.
+
+    Permutations are scored block by block as they are drawn, so memory does not grow with sample. With dedup,
+    the hashes of the permutations seen so far are kept in a sorted array (8 bytes per permutation) and repeated
+    permutations are drawn again. Returns the count and null_distribution with the drawn statistics added.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    seen = np.empty(0, dtype=np.uint64)
+    over = 0
+    total = 0
+    while total < sample:
+        masks = random_masks(rng, len(associations), size_of_permutation, min(block_size, sample - total))
+        if dedup:
+            hashes, first = np.unique(mask_hashes(masks), return_index=True)
+            new = ~np.isin(hashes, seen, assume_unique=True)
+            masks = masks[np.sort(first[new])]
+            seen = np.concatenate((seen, hashes[new]))
+            seen.sort()
+        stats = test_statistics(associations, masks)
+        over += int((stats > observed).sum())
+        if null_distribution is not None:
+            null_distribution.add(stats)
+        total += len(masks)
+    return over, null_distribution
+
+
+def count_exceeding_parallel(associations, size_of_permutation, observed, sample, workers=1, seed=None,
+                             block_size=BLOCK_SIZE, dedup=False, null_distribution=None):
+    """Count sampled permutations over the observed statistic, splitting the sample across worker processes.
+
+    Every worker draws its share of the permutations from its own random stream, spawned from seed, so the
+    counts are reproducible given the seed and the number of workers. Permutations are drawn with replacement
+    unless dedup is set, in which case each worker's share is free of duplicates.
+
+    Args:
+        associations: array of shape (n,), s(w, A1, A2) for every word of T1 + T2
+        size_of_permutation: number of words in T1
+        observed: test statistic of the unpermuted split
+        sample: total number of random permutations
+        workers: number of processes, 1 runs in the current process
+        seed: int seed of the random streams, fresh entropy (which is logged) if None
+        block_size: number of permutations evaluated per NumPy reduction
+        dedup: whether to skip permutations a worker has drawn before
+        null_distribution: NullDistribution the test statistics of all workers are added to
+    Returns:
+        (number of permutations over the observed statistic, number of permutations evaluated)
+    """
+    seed_sequence = np.random.SeedSequence(seed)
+    logging.info('Sampling %d permutations in %d workers with seed %d', sample, workers, seed_sequence.entropy)
+    shares = [sample // workers + (1 if i < sample % workers else 0) for i in range(workers)]
+    jobs = [(associations, size_of_permutation, observed, share, child, block_size, dedup,
+             None if null_distribution is None else null_distribution.empty_copy())
+            for share, child in zip(shares, seed_sequence.spawn(workers))]
+    if workers == 1:
+        results = [_count_exceeding_sampled(*jobs[0])]
+    else:
+        with Pool(workers) as pool:
+            results = pool.starmap(_count_exceeding_sampled, jobs)
+    over = 0
+    for count, worker_null_distribution in results:
+        over += count
+        if null_distribution is not None:
+            null_distribution.merge(worker_null_distribution)
+    return over, sample
+
+
+def clopper_pearson(over, total, confidence):
+    """Clopper-Pearson confidence interval of a p-value estimated as over / total."""
+    alpha = 1 - confidence
+    lower = beta.ppf(alpha / 2, over, total - over + 1) if over > 0 else 0.
+    upper = beta.ppf(1 - alpha / 2, over + 1, total - over) if over < total else 1.
+    return lower, upper
+
+
+def count_exceeding_sequential(associations, size_of_permutation, observed, sample,
+                               significance_levels=SIGNIFICANCE_LEVELS, confidence=0.999, seed=None,
+                               batch_size=SEQUENTIAL_BATCH_SIZE, null_distribution=None):
+    """Count sampled permutations over the observed statistic, stopping as soon as the significance is decided.
+
+    Permutations are drawn in batches and after each batch the Clopper-Pearson interval of p is checked; once no
+    significance level lies inside of it, more permutations would not change which levels p is below. The
+    interval is checked repeatedly, hence the high default confidence.
+
+    Args:
+        associations: array of shape (n,), s(w, A1, A2) for every word of T1 + T2
+        size_of_permutation: number of words in T1
+        observed: test statistic of the unpermuted split
+        sample: maximum number of random permutations
+        significance_levels: levels the interval of p must not contain to stop
+        confidence: confidence of the interval
+        seed: int seed of the random stream, fresh entropy (which is logged) if None
+        batch_size: number of permutations drawn between two checks
+        null_distribution: NullDistribution the test statistics are added to
+    Returns:
+        (number of permutations over the observed statistic, number of permutations evaluated)
+    """
+    seed_sequence = np.random.SeedSequence(seed)
+    logging.info('Sampling up to %d permutations with seed %d', sample, seed_sequence.entropy)
+    rng = np.random.default_rng(seed_sequence)
+    over = 0
+    total = 0
+    while total < sample:
+        number = min(batch_size, sample - total)
+        stats = test_statistics(associations, random_masks(rng, len(associations), size_of_permutation, number))
+        over += int((stats > observed).sum())
+        if null_distribution is not None:
+            null_distribution.add(stats)
+        total += number
+        lower, upper = clopper_pearson(over, total, confidence)
+        if not any(lower < level < upper for level in significance_levels):
+            break
+    logging.info('Stopped after %d permutations, p in [%f, %f]', total, lower, upper)
+    return over, total
+
+
+def subset_sum_p_value(associations, size_of_permutation, resolution=None, null_distribution=None):
+    """Exact p-value from the null distribution of the test statistic over all permutations.
+
+    The statistic of X is 2 * sum(s[X]) - sum(s), so it suffices to count the subsets of size_of_permutation
+    words by the sum of their associations. The associations are discretised to resolution levels and the
+    counts are built by dynamic programming over the words, without listing any subset. The result is exact
+    up to the discretisation; the range it can span is logged.
+
+    Args:
+        associations: array of shape (n,), s(w, A1, A2) for every word of T1 + T2 (in this order)
+        size_of_permutation: number of words in T1
+        resolution: number of grid levels between the smallest and the largest association, by default the
+                    finest grid whose count table fits into SUBSET_SUM_CELLS cells
+        null_distribution: NullDistribution the (discretised) distribution of the test statistic is added to
+    Returns:
+        fraction of permutations whose test statistic is larger than the observed one
+    """
+    associations = np.asarray(associations, dtype=np.float64)
+    k = size_of_permutation
+    if resolution is None:
+        resolution = max(1, SUBSET_SUM_CELLS // ((k + 1) * max(k, 1)))
+    low = associations.min()
+    span = associations.max() - low
+    step = span / resolution if span > 0 else 1.
+    levels = np.rint((associations - low) / step).astype(np.int64)
+    max_sum = int(np.sort(levels)[len(levels) - k:].sum())
+    # counts[j, v]: number of subsets of j words whose levels sum to v
+    counts = np.zeros((k + 1, max_sum + 1))
+    counts[0, 0] = 1.
+    for i, level in enumerate(levels):
+        rows = min(i + 1, k)
+        counts[1:rows + 1, level:] += counts[:rows, :max_sum + 1 - level]
+    observed = int(levels[:k].sum())
+    total = counts[k].sum()
+    p = counts[k, observed + 1:].sum() / total
+    # every subset sum is off by at most k / 2 levels, so the comparison with the observed sum is only
+    # ambiguous for sums within k levels of it
+    lower = counts[k, observed + k + 1:].sum() / total
+    upper = counts[k, max(observed - k, 0):].sum() / total
+    logging.info('Subset-sum p-value %f, bounds from discretisation: [%f, %f]', p, lower, upper)
+    if null_distribution is not None:
+        sums = k * low + np.arange(max_sum + 1) * step
+        null_distribution.add(2 * sums - associations.sum(), weights=counts[k])
+    return p
+
+
+def p_value(associations, size_of_permutation, sample=None, block_size=BLOCK_SIZE, method='permutations',
+            workers=1, seed=None, significance_levels=SIGNIFICANCE_LEVELS, dedup=False,
+            null_distribution_bins=NULL_DISTRIBUTION_BINS, shard=None):
+    """One-sided permutation p-value of the WEAT test statistic.
+
+    Args:
+        associations: array of shape (n,), s(w, A1, A2) for every word of T1 + T2 (in this order)
+        size_of_permutation: number of words in T1
+        sample: number of random permutations to evaluate, all permutations are enumerated if None or not smaller
+                than the number of possible permutations, and also for the plain 'permutations' method (one
+                worker, no dedup) if there are at most EXACT_PERMUTATION_LIMIT
+        block_size: number of permutations evaluated per NumPy reduction
+        method: 'permutations' to evaluate the (sampled) permutations one by one, 'subset_sum' for the
+                exact null distribution of subset_sum_p_value (sample is ignored), 'sequential' to stop sampling
+                once p is clearly below or above the significance levels (see count_exceeding_sequential)
+        workers: number of processes the sampled permutations are drawn in (see count_exceeding_parallel)
+        seed: seed of the random streams used to sample permutations
+        significance_levels: levels at which the sequential sampling decides whether to stop
+        dedup: whether to sample permutations without repetitions (not for the sequential sampling)
+        null_distribution_bins: number of bins of the histogram of the test statistic over the permutations
+        shard: (index, number of shards) to only enumerate this disjoint range of all permutations (sample and
+               method are ignored then), the partial results are combined with merge_shards
+    Returns:
+        (fraction of permutations whose test statistic is larger than the observed one,
+         number of permutations this is based on, NullDistribution of the test statistic)
+    """
+    n = len(associations)
+    total_possible_permutations = math.comb(n, size_of_permutation)
+    logging.info('Number of possible permutations: %d', total_possible_permutations)
+    null_distribution = NullDistribution.for_associations(associations, size_of_permutation, null_distribution_bins)
+    if method == 'subset_sum' and shard is None:
+        p = subset_sum_p_value(associations, size_of_permutation, null_distribution=null_distribution)
+        return p, total_possible_permutations, null_distribution
+    elif method not in P_VALUE_METHODS:
+        raise NotImplementedError()
+    observed = null_distribution.observed
+    if shard is not None:
+        start, stop = shard_range(total_possible_permutations, *shard)
+        logging.info('Enumerating permutations %d to %d of shard %d/%d', start, stop, shard[0], shard[1])
+        over, total = count_exceeding_gray_code(associations, size_of_permutation,
+                                                null_distribution=null_distribution, start=start, stop=stop)
+    elif (not sample or sample >= total_possible_permutations
+          or (method == 'permutations' and (workers or 1) == 1 and not dedup
+              and total_possible_permutations <= EXACT_PERMUTATION_LIMIT)):
+        over, total = count_exceeding_gray_code(associations, size_of_permutation, null_distribution=null_distribution)
+    elif method == 'sequential':
+        over, total = count_exceeding_sequential(np.asarray(associations), size_of_permutation, observed, sample,
+                                                 significance_levels, seed=seed, null_distribution=null_distribution)
+    else:
+        over, total = count_exceeding_parallel(np.asarray(associations), size_of_permutation, observed, sample,
+                                               workers or 1, seed, block_size, dedup, null_distribution)
+    null_distribution.over = over
+    return over / total if total else float('nan'), total, null_distribution
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge the null distributions of sharded WEAT runs')
+    parser.add_argument('paths', nargs='+', help='Null distribution files (.null.jsonl) of all shards', type=str)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    p, total, _ = merge_shards(args.paths)
+    logging.info('Permutations: %d', total)
+    print('p: {}'.format(p))
+
+
+if __name__ == '__main__':
+    main()
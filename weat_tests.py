@@ -0,0 +1,435 @@
+"""
+Declarations of the WEAT and WEFAT tests: which word lists make up their targets and attributes.
+
+A test is data instead of a method. Each of its word sets is a sequence of sources, inline word lists of WORDS or
+word list files read by one of the LOADERS, that are concatenated and optionally shuffled. The declarations are
+compiled once at import into WEAT_TESTS (the tests of weat.py) and XWEAT_TESTS (the original tests of xweat.py),
+ordered dicts from test ids to tests, which the command lines and the suite runs look the tests up in and
+enumerate.
+"""
+import random
+from collections import namedtuple
+
+GENDERS = ('both', 'male', 'female')
+# how the files of the sources are read, see weat.XWEAT.loaders; 'words' are the inline lists of WORDS
+LOADERS = ('words', 'names', 'gender_names', 'male_names', 'female_names', 'word_list')
+GERMANIC_NAMES = ('german_names', 'swiss_names', 'austrian_names')
+WEST_EUROPEAN_NAMES = ('french_names', 'italian_names', 'portuguese_names', 'spanish_names')
+EAST_EUROPEAN_NAMES = ('serbish_names', 'romanian_names', 'polish_names', 'macedonian_names', 'kosovo_names',
+                       'bosnian_names', 'croatian_names', 'hungarian_names', 'slovak_names')
+MIDDLE_EASTERN_NAMES = ('afghani_names', 'syrian_names', 'turkish_names')
+
+WORDS = {
+    'flowers': (
+        'aster', 'clover', 'hyacinth', 'marigold', 'poppy', 'azalea', 'crocus', 'iris', 'orchid', 'rose',
+        'blue-bell', 'daffodil', 'lilac', 'pansy', 'tulip', 'buttercup', 'daisy', 'lily', 'peony', 'violet',
+        'carnation', 'gladiola', 'magnolia', 'petunia', 'zinnia'
+    ),
+    'insects': (
+        'ant', 'caterpillar', 'flea', 'locust', 'spider', 'bedbug', 'centipede', 'fly', 'maggot', 'tarantula',
+        'bee', 'cockroach', 'gnat', 'mosquito', 'termite', 'beetle', 'cricket', 'hornet', 'moth', 'wasp',
+        'blackfly', 'dragonfly', 'horsefly', 'roach', 'weevil'
+    ),
+    'instruments': (
+        'bagpipe', 'cello', 'guitar', 'lute', 'trombone', 'banjo', 'clarinet', 'harmonica', 'mandolin',
+        'trumpet', 'bassoon', 'drum', 'harp', 'oboe', 'tuba', 'bell', 'fiddle', 'harpsichord', 'piano',
+        'viola', 'bongo', 'flute', 'horn', 'saxophone', 'violin'
+    ),
+    'weapons': (
+        'arrow', 'club', 'gun', 'missile', 'spear', 'axe', 'dagger', 'harpoon', 'pistol', 'sword', 'blade',
+        'dynamite', 'hatchet', 'rifle', 'tank', 'bomb', 'firearm', 'knife', 'shotgun', 'teargas', 'cannon',
+        'grenade', 'mace', 'slingshot', 'whip'
+    ),
+    'pleasant': (
+        'caress', 'freedom', 'health', 'love', 'peace', 'cheer', 'friend', 'heaven', 'loyal', 'pleasure',
+        'diamond', 'gentle', 'honest', 'lucky', 'rainbow', 'diploma', 'gift', 'honor', 'miracle', 'sunrise',
+        'family', 'happy', 'laughter', 'paradise', 'vacation'
+    ),
+    'unpleasant': (
+        'abuse', 'crash', 'filth', 'murder', 'sickness', 'accident', 'death', 'grief', 'poison', 'stink',
+        'assault', 'disaster', 'hatred', 'pollute', 'tragedy', 'divorce', 'jail', 'poverty', 'ugly', 'cancer',
+        'kill', 'rotten', 'vomit', 'agony', 'prison'
+    ),
+    # same as unpleasant but agony and prison are replaced with bomb and evil
+    'unpleasant_bomb_evil': (
+        'abuse', 'crash', 'filth', 'murder', 'sickness', 'accident', 'death', 'grief', 'poison', 'stink',
+        'assault', 'disaster', 'hatred', 'pollute', 'tragedy', 'divorce', 'jail', 'poverty', 'ugly', 'cancer',
+        'kill', 'rotten', 'vomit', 'bomb', 'evil'
+    ),
+    # excluded in the original paper: Chip, Ian, Fred, Jed, Todd, Brandon, Wilbur, Sara, Amber, Crystal, Meredith,
+    # Shannon, Donna, Bobbie-Sue, Peggy, Sue-Ellen, Wendy
+    'european_american_names': (
+        'Adam', 'Harry', 'Josh', 'Roger', 'Alan', 'Frank', 'Justin', 'Ryan', 'Andrew', 'Jack', 'Matthew', 'Stephen',
+        'Brad', 'Greg', 'Paul', 'Hank', 'Jonathan', 'Peter', 'Amanda', 'Courtney', 'Heather', 'Melanie', 'Katie',
+        'Betsy', 'Kristin', 'Nancy', 'Stephanie', 'Ellen', 'Lauren', 'Colleen', 'Emily', 'Megan', 'Rachel',
+        'Chip', 'Ian', 'Fred', 'Jed', 'Todd', 'Brandon', 'Wilbur', 'Sara', 'Amber', 'Crystal', 'Meredith',
+        'Shannon', 'Donna', 'Bobbie-Sue', 'Peggy', 'Sue-Ellen', 'Wendy'
+    ),
+    # excluded: Lerone, Percell, Rasaan, Rashaun, Everol, Terryl, Aiesha, Lashelle, Temeka, Tameisha, Teretha,
+    # Latonya, Shanise, Sharise, Tashika, Lashandra, Shavonn, Tawanda
+    'african_american_names': (
+        'Alonzo', 'Jamel', 'Theo', 'Alphonse', 'Jerome', 'Leroy', 'Torrance', 'Darnell', 'Lamar', 'Lionel',
+        'Tyree', 'Deion', 'Lamont', 'Malik', 'Terrence', 'Tyrone', 'Lavon', 'Marcellus', 'Wardell', 'Nichelle',
+        'Shereen', 'Ebony', 'Latisha', 'Shaniqua', 'Jasmine', 'Tanisha', 'Tia', 'Lakisha', 'Latoya', 'Yolanda',
+        'Malika', 'Yvette', 'Lerone', 'Percell', 'Rasaan', 'Rashaun', 'Everol', 'Terryl', 'Aiesha', 'Lashelle',
+        'Temeka', 'Tameisha', 'Teretha', 'Latonya', 'Shanise', 'Sharise', 'Tashika', 'Lashandra', 'Shavonn',
+        'Tawanda'
+    ),
+    # excluded as in the original paper: Jay, Kristen, (here only excluded in the glove experiments)
+    'european_american_names_2': (
+        'Brad', 'Brendan', 'Geoffrey', 'Greg', 'Brett', 'Matthew', 'Neil', 'Todd', 'Allison', 'Anne',
+        'Carrie', 'Emily', 'Jill', 'Laurie', 'Meredith', 'Sarah', 'Jay', 'Kristen'
+    ),
+    # excluded in GloVe experiments: Tremayne, Latonya
+    'african_american_names_2': (
+        'Darnell', 'Hakim', 'Jermaine', 'Kareem', 'Jamal', 'Leroy', 'Rasheed', 'Tyrone', 'Aisha', 'Ebony',
+        'Keisha', 'Kenya', 'Lakisha', 'Latoya', 'Tamika', 'Tanisha', 'Tremayne', 'Latonya'
+    ),
+    'pleasant_2': ('joy', 'love', 'peace', 'wonderful', 'pleasure', 'friend', 'laughter', 'happy'),
+    'unpleasant_2': ('agony', 'terrible', 'horrible', 'nasty', 'evil', 'war', 'awful', 'failure'),
+    'male_names': ('John', 'Paul', 'Mike', 'Kevin', 'Steve', 'Greg', 'Jeff', 'Bill'),
+    'female_names': ('Amy', 'Joan', 'Lisa', 'Sarah', 'Diana', 'Kate', 'Ann', 'Donna'),
+    'career': ('executive', 'management', 'professional', 'corporation', 'salary', 'office', 'business', 'career'),
+    'family': ('home', 'parents', 'children', 'family', 'cousins', 'marriage', 'wedding', 'relatives'),
+    'math': ('math', 'algebra', 'geometry', 'calculus', 'equations', 'computation', 'numbers', 'addition'),
+    'arts': ('poetry', 'art', 'dance', 'literature', 'novel', 'symphony', 'drama', 'sculpture'),
+    'male_terms': ('male', 'man', 'boy', 'brother', 'he', 'him', 'his', 'son'),
+    'female_terms': ('female', 'woman', 'girl', 'sister', 'she', 'her', 'hers', 'daughter'),
+    'science': ('science', 'technology', 'physics', 'chemistry', 'Einstein', 'NASA', 'experiment', 'astronomy'),
+    'arts_2': ('poetry', 'art', 'Shakespeare', 'dance', 'literature', 'novel', 'symphony', 'drama'),
+    'male_relatives': ('brother', 'father', 'uncle', 'grandfather', 'son', 'he', 'his', 'him'),
+    'female_relatives': ('sister', 'mother', 'aunt', 'grandmother', 'daughter', 'she', 'hers', 'her'),
+    'mental_disease': ('sad', 'hopeless', 'gloomy', 'tearful', 'miserable', 'depressed'),
+    'physical_disease': ('sick', 'illness', 'influenza', 'disease', 'virus', 'cancer'),
+    # in w2v experiments, the've replaced short-term with short
+    'temporary': ('impermanent', 'unstable', 'variable', 'fleeting', 'short-term', 'brief', 'occasional'),
+    'permanent': ('stable', 'always', 'constant', 'persistent', 'chronic', 'prolonged', 'forever'),
+    'young_names': ('Tiffany', 'Michelle', 'Cindy', 'Kristy', 'Brad', 'Eric', 'Joey', 'Billy'),
+    'old_names': ('Ethel', 'Bernice', 'Gertrude', 'Agnes', 'Cecil', 'Wilbert', 'Mortimer', 'Edgar'),
+    # occupations derived from th bureau of labor statistics
+    'occupations': (
+        'technician', 'accountant', 'supervisor', 'engineer', 'worker', 'educator', 'clerk', 'counselor',
+        'inspector', 'mechanic', 'manager', 'therapist', 'administrator', 'salesperson', 'receptionist',
+        'librarian', 'advisor', 'pharmacist', 'janitor', 'psychologist', 'physician', 'carpenter', 'nurse',
+        'investigator', 'bartender', 'specialist', 'electrician', 'officer', 'pathologist', 'teacher', 'lawyer',
+        'planner', 'practitioner', 'plumber', 'instructor', 'surgeon', 'veterinarian', 'paramedic', 'examiner',
+        'chemist', 'machinist', 'appraiser', 'nutritionist', 'architect', 'hairdresser', 'baker', 'programmer',
+        'paralegal', 'hygienist', 'scientist'
+    ),
+    'androgynous_names': (
+        'Kelly', 'Tracy', 'Jamie', 'Jackie', 'Jesse', 'Courtney', 'Lynn', 'Taylor', 'Leslie', 'Shannon',
+        'Stacey', 'Jessie', 'Shawn', 'Stacy', 'Casey', 'Bobby', 'Terry', 'Lee', 'Ashley', 'Eddie', 'Chris', 'Jody',
+        'Pat', 'Carey', 'Willie', 'Morgan', 'Robbie', 'Joan', 'Alexis', 'Kris', 'Frankie', 'Bobbie', 'Dale',
+        'Robin', 'Billie', 'Adrian', 'Kim', 'Jaime', 'Jean', 'Francis', 'Marion', 'Dana', 'Rene', 'Johnnie',
+        'Jordan', 'Carmen', 'Ollie', 'Dominique', 'Jimmie', 'Shelby'
+    ),
+}
+
+# loader is one of LOADERS, key a key of WORDS or of the word list files (their names without .txt)
+Source = namedtuple('Source', ['loader', 'key'])
+WordSet = namedtuple('WordSet', ['sources', 'shuffle'])
+
+
+class WeatTest(namedtuple('WeatTest', ['name', 'targets', 'attributes', 'category', 'genders', 'lang',
+                                       'description'])):
+    """A WEAT test with two word sets of targets, or a WEFAT test with one, and two word sets of attributes.
+
+    genders are the gender settings the test is run with (see weat.XWEAT) and lang the language of its word lists.
+    """
+
+    @property
+    def is_wefat(self):
+        return len(self.targets) == 1
+
+    @property
+    def word_sets(self):
+        return self.targets + self.attributes
+
+    @property
+    def files(self):
+        """Keys of the word list files the test reads."""
+        return sorted({source.key for word_set in self.word_sets for source in word_set.sources
+                       if source.loader != 'words'})
+
+
+def words(key, shuffle=False):
+    return WordSet((Source('words', key),), shuffle)
+
+
+def names(*keys, loader='names', shuffle=False):
+    return WordSet(tuple(Source(loader, key) for key in keys), shuffle)
+
+
+def gender_names(*keys, shuffle=False):
+    """Names of the files read according to the gender setting of the test run, see weat.XWEAT.loading_func."""
+    return names(*keys, loader='gender_names', shuffle=shuffle)
+
+
+def word_list(key):
+    return WordSet((Source('word_list', key),), False)
+
+
+def weat(name, targets_1, targets_2, attributes_1, attributes_2, category=None, genders=('both',), lang='en',
+         description=''):
+    return WeatTest(name, (targets_1, targets_2), (attributes_1, attributes_2), category, tuple(genders), lang,
+                    description)
+
+
+def wefat(name, targets, attributes_1, attributes_2, category='wefat', lang='en', description=''):
+    return WeatTest(name, (targets,), (attributes_1, attributes_2), category, ('both',), lang, description)
+
+
+def compile_tests(tests, loaders=LOADERS):
+    """Ordered dict from the names of tests to the tests, checking that names are unique and sources are known.
+
+    Args:
+        tests: iterable of WeatTest
+        loaders: loaders the sources may use
+    """
+    registry = {}
+    for test in tests:
+        if test.name in registry:
+            raise ValueError(f'Test {test.name} is declared twice')
+        for word_set in test.word_sets:
+            for source in word_set.sources:
+                if source.loader not in loaders:
+                    raise ValueError(f'Unknown loader {source.loader} in test {test.name}')
+                if source.loader == 'words' and source.key not in WORDS:
+                    raise ValueError(f'Unknown word list {source.key} in test {test.name}')
+        unknown = set(test.genders) - set(GENDERS)
+        if unknown:
+            raise ValueError(f'Unknown genders {sorted(unknown)} in test {test.name}')
+        registry[test.name] = test
+    return registry
+
+
+def in_category(registry, category):
+    """Tests of the registry in category, in the order they are declared."""
+    return [test for test in registry.values() if test.category == category]
+
+
+def shuffled(words, seed=None):
+    """Shuffled copy of words, as a tuple, words itself is left as it is.
+
+    Args:
+        words: sequence of words
+        seed: seed (int or str) of the random.Random the order is drawn from, the global random state if None
+    """
+    words = list(words)
+    (random if seed is None else random.Random(seed)).shuffle(words)
+    return tuple(words)
+
+
+def resolve(test, load, seed=None):
+    """Word lists of test.
+
+    Sources are loaded in the order they are declared, a source that is repeated within a word set only once, and
+    each word set is shuffled after its sources are concatenated. Without a seed the shuffles draw from the global
+    random state, so they depend on everything shuffled before. With a seed every source and word set is shuffled
+    with its own seed derived from seed, the test and its position, so the order does not depend on what else is
+    resolved.
+
+    Args:
+        test: WeatTest
+        load: function from a Source and the seed to shuffle it with (None or str) to its words
+        seed: int or str
+    Returns:
+        tuple of lists, (targets_1, targets_2, attributes_1, attributes_2) or (targets, attributes_1, attributes_2)
+        for WEFAT tests
+    """
+    def derived(*position):
+        return None if seed is None else ':'.join(map(str, (seed, test.name) + position))
+
+    word_lists = []
+    for i, word_set in enumerate(test.word_sets):
+        loaded = []
+        sources = {}
+        for source in word_set.sources:
+            if source not in sources:
+                sources[source] = load(source, derived(i, source.loader, source.key))
+            loaded.extend(sources[source])
+        if word_set.shuffle:
+            loaded = list(shuffled(loaded, derived(i)))
+        word_lists.append(loaded)
+    return tuple(word_lists)
+
+
+def load_words(source, seed=None):
+    """Words of an inline source, the tuple in WORDS, the loader of tests that do not read word list files."""
+    if source.loader != 'words':
+        raise ValueError(f'Source {source.key} is not an inline word list')
+    return WORDS[source.key]
+
+
+def _migrant_tests(category, attributes_1, attributes_2, description, comparisons):
+    """The anti-migrant tests of category, numbered in the order of the (targets_1, targets_2, description) triples
+    of comparisons."""
+    return [weat(f'weat_{category}_{number}', targets_1, targets_2, word_list(attributes_1), word_list(attributes_2),
+                 category, GENDERS, 'de', f'{comparison} and {description}')
+            for number, (targets_1, targets_2, comparison) in enumerate(comparisons, 1)]
+
+
+def _gender_career_family_tests():
+    def test(number, targets_1, targets_2, description):
+        return weat(f'weat_gender_career_family_{number}', targets_1, targets_2, word_list('career'),
+                    word_list('family'), 'gender_career_family', lang='de',
+                    description=f'{description} and career vs family')
+
+    return [
+        test(1, names('german_names', loader='male_names'), names('german_names', loader='female_names'),
+             'male vs female german names'),
+        test(2, names('swiss_names', loader='male_names'), names('swiss_names', loader='female_names'),
+             'male vs female swiss names'),
+        test(3, names('austrian_names', loader='male_names'), names('austrian_names', loader='female_names'),
+             'male vs female austrian names'),
+        # the female german names are read according to the gender setting
+        test(4, names(*GERMANIC_NAMES, loader='male_names', shuffle=True),
+             WordSet((Source('gender_names', 'german_names'), Source('female_names', 'swiss_names'),
+                      Source('female_names', 'austrian_names')), True),
+             'male vs female germanic names'),
+        # the male croatian names are counted twice
+        test(5, names(*(EAST_EUROPEAN_NAMES[:7] + ('croatian_names',) + EAST_EUROPEAN_NAMES[7:]),
+                      loader='male_names', shuffle=True),
+             names(*EAST_EUROPEAN_NAMES, loader='female_names', shuffle=True),
+             'male vs female east european names'),
+        # both targets are the male names
+        test(6, names(*WEST_EUROPEAN_NAMES, loader='male_names', shuffle=True),
+             names(*WEST_EUROPEAN_NAMES, loader='male_names', shuffle=True),
+             'male vs female west european names'),
+        test(7, names(*MIDDLE_EASTERN_NAMES, loader='male_names', shuffle=True),
+             names(*MIDDLE_EASTERN_NAMES, loader='female_names', shuffle=True),
+             'male vs female middle eastern names'),
+    ]
+
+
+def _weat_tests():
+    english_weats = [
+        weat('weat_1', words('flowers'), words('insects'), words('pleasant'), words('unpleasant'), 'original_weats',
+             description='flowers vs insects and pleasant vs unpleasant'),
+        weat('weat_2', words('instruments'), words('weapons'), words('pleasant'), words('unpleasant'),
+             'original_weats', description='musical instruments vs weapons and pleasant vs unpleasant'),
+        # the european american names of the original are replaced with germanic names, the african american names
+        # with the african names found in german corpora
+        weat('weat_3', names(*GERMANIC_NAMES), names('african_names_in_german_corpora'), words('pleasant'),
+             words('unpleasant_bomb_evil'), 'original_weats',
+             description='germanic vs african names and pleasant vs unpleasant'),
+        weat('weat_4', names(*GERMANIC_NAMES), names('african_names_in_german_corpora'), words('pleasant'),
+             words('unpleasant_bomb_evil'), 'original_weats',
+             description='germanic vs african names and pleasant vs unpleasant'),
+        weat('weat_5', names(*GERMANIC_NAMES, shuffle=True), words('african_american_names_2'), words('pleasant_2'),
+             words('unpleasant_2'), 'original_weats',
+             description='germanic vs african american names and pleasant vs unpleasant'),
+        weat('weat_6', words('male_names'), words('female_names'), words('career'), words('family'),
+             'original_weats', description='male vs female names and career vs family'),
+        weat('weat_7', words('math'), words('arts'), words('male_terms'), words('female_terms'), 'original_weats',
+             description='math vs arts and male vs female terms'),
+        weat('weat_8', words('science'), words('arts_2'), words('male_relatives'), words('female_relatives'),
+             'original_weats', description='science vs arts and male vs female terms'),
+        weat('weat_9', words('mental_disease'), words('physical_disease'), words('temporary'), words('permanent'),
+             'original_weats', description='mental vs physical disease and temporary vs permanent'),
+        weat('weat_10', words('young_names'), words('old_names'), words('pleasant_2'), words('unpleasant_2'),
+             'original_weats', description='young vs old names and pleasant vs unpleasant'),
+        # missing from the original IAT: arab-muslim
+    ]
+    # tests for anti-semitism
+    jewish = [
+        weat(f'weat_jewish_{attributes_1}_{attributes_2}_1', names('german_lastnames'),
+             names('jewish_lastnames_in_all_voc'), word_list(attributes_1), word_list(file_2), 'anti-semitism',
+             lang='de', description=f'german vs jewish last names and {attributes_1} vs {attributes_2}')
+        for attributes_1, attributes_2, file_2 in [('pleasant', 'unpleasant', 'unpleasant'),
+                                                   ('career', 'crime', 'crime_german'),
+                                                   ('virtuous', 'greed', 'greed')]
+    ]
+    # germanic reference names vs english reference names
+    germanic_english = [
+        weat(f'weat_germanic_english_{attributes_1}_{attributes_2}', gender_names(*GERMANIC_NAMES, shuffle=True),
+             words('european_american_names', shuffle=True), word_list(attributes_1), word_list(file_2),
+             'germanic_english', lang='de',
+             description=f'germanic vs english names and {attributes_1} vs {attributes_2}')
+        for attributes_1, attributes_2, file_2 in [('pleasant', 'unpleasant', 'unpleasant'),
+                                                   ('career', 'crime', 'crime_german')]
+    ]
+    # religious bias tests
+    religion = [
+        weat(f'weat_{targets_1}_{targets_2}_pleasant_unpleasant', names(targets_1), names(targets_2),
+             word_list('pleasant'), word_list('unpleasant'), 'religion', lang='de',
+             description=f'{targets_1} vs {targets_2} and pleasant vs unpleasant')
+        for targets_1, targets_2 in [('christianity', 'islam'), ('christianity', 'judaism'), ('islam', 'judaism')]
+    ]
+    wefats = [
+        wefat('wefat_1', words('occupations'), words('male_terms'), words('female_terms'),
+              description='occupations and male vs female terms'),
+        wefat('wefat_2', words('androgynous_names'), words('male_terms'), words('female_terms'),
+              description='androgynous names and male vs female terms'),
+    ]
+    germanic = gender_names(*GERMANIC_NAMES, shuffle=True)
+    migrant_pleasant_unpleasant = _migrant_tests('migrant_pleasant_unpleasant', 'pleasant', 'unpleasant',
+                                                 'pleasant vs unpleasant', [
+        (germanic, gender_names('arabic_names'), 'german names vs arabic names'),
+        (germanic, gender_names('french_names'), 'german names vs french names'),
+        (names('german_lastnames'), names('hebrew_names'), 'german names vs hebrew names'),
+        (germanic, gender_names('kosovo_names'), 'german names vs kosovo names'),
+        (germanic, gender_names('macedonian_names'), 'german names vs macedonian names'),
+        (germanic, gender_names('polish_names'), 'german names vs polish names'),
+        (germanic, gender_names('portuguese_names'), 'german names vs portuguese names'),
+        (germanic, gender_names('romanian_names'), 'german names vs romanian names'),
+        (germanic, gender_names('serbish_names'), 'german names vs serbish names'),
+        (germanic, gender_names('spanish_names'), 'german names vs spanish names'),
+        (gender_names('german_names'), gender_names('swiss_names'), 'german names vs swiss names'),
+        (gender_names('swiss_names'), gender_names('austrian_names'), 'swiss names vs austrian names'),
+        (gender_names('austrian_names'), gender_names('german_names'), 'austrian names vs german names'),
+        (germanic, gender_names('turkish_names'), 'german names vs turkish names'),
+        (germanic, gender_names(*WEST_EUROPEAN_NAMES, shuffle=True), 'german names vs west european names'),
+        (germanic, gender_names(*EAST_EUROPEAN_NAMES, shuffle=True), 'german names vs east european names'),
+        # arabic names are left out
+        (germanic, gender_names(*MIDDLE_EASTERN_NAMES, shuffle=True), 'german names vs middle eastern names'),
+    ])
+    migrant_career_crime = _migrant_tests('migrant_career_crime', 'career', 'crime_german', 'career vs crime', [
+        (germanic, gender_names('turkish_names'), 'german names vs turkish names'),
+        (germanic, gender_names('serbish_names'), 'german names vs serbish names'),
+        (germanic, gender_names('romanian_names'), 'german names vs romanian names'),
+        (germanic, gender_names('polish_names'), 'german names vs polish names'),
+        (germanic, gender_names('macedonian_names'), 'german names vs macedonian names'),
+        (germanic, gender_names('kosovo_names'), 'german names vs kosovo names'),
+        (germanic, gender_names('arabic_names'), 'german names vs arabic names'),
+        (germanic, gender_names('french_names'), 'german names vs french names'),
+        (germanic, gender_names('spanish_names'), 'german names vs spanish names'),
+        (germanic, gender_names('portuguese_names'), 'german names vs portuguese names'),
+        (germanic, gender_names(*EAST_EUROPEAN_NAMES, shuffle=True), 'german names vs east european names'),
+        # arabic names are left out
+        (germanic, gender_names(*MIDDLE_EASTERN_NAMES, shuffle=True), 'german names vs middle eastern names'),
+        (names('german_lastnames'), names('hebrew_names'), 'german names vs hebrew names'),
+        (gender_names('german_names'), gender_names('swiss_names'), 'german names vs swiss names'),
+        (gender_names('swiss_names'), gender_names('austrian_names'), 'swiss names vs austrian names'),
+        (gender_names('austrian_names'), gender_names('german_names'), 'austrian names vs german names'),
+        (germanic, gender_names(*WEST_EUROPEAN_NAMES, shuffle=True), 'german names vs west european names'),
+    ])
+    return (english_weats + migrant_pleasant_unpleasant + migrant_career_crime + _gender_career_family_tests()
+            + jewish + germanic_english + religion + wefats)
+
+
+def _xweat_tests():
+    """The original tests of xweat.py, besides the tests shared with weat.py."""
+    return [
+        weat('weat_1', words('flowers'), words('insects'), words('pleasant'), words('unpleasant'), 'original_weats',
+             description='flowers vs insects and pleasant vs unpleasant'),
+        weat('weat_2', words('instruments'), words('weapons'), words('pleasant'), words('unpleasant'),
+             'original_weats', description='musical instruments vs weapons and pleasant vs unpleasant'),
+        # here they deleted the infrequent african american names, and the same number randomly choosen from the
+        # european american names
+        weat('weat_3', words('european_american_names'), words('african_american_names'), words('pleasant'),
+             words('unpleasant_bomb_evil'), 'original_weats',
+             description='european american vs african american names and pleasant vs unpleasant'),
+        weat('weat_4', words('european_american_names_2'), words('african_american_names_2'), words('pleasant'),
+             words('unpleasant_bomb_evil'), 'original_weats',
+             description='european american vs african american names and pleasant vs unpleasant'),
+        weat('weat_5', words('european_american_names_2'), words('african_american_names_2'), words('pleasant_2'),
+             words('unpleasant_2'), 'original_weats',
+             description='european american vs african american names and pleasant vs unpleasant'),
+    ]
+
+
+WEAT_TESTS = compile_tests(_weat_tests())
+XWEAT_TESTS = compile_tests(_xweat_tests() + [WEAT_TESTS[name] for name in ('weat_6', 'weat_7', 'weat_8', 'weat_9',
+                                                                           'weat_10', 'wefat_1', 'wefat_2')],
+                            loaders=('words',))
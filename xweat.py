@@ -1,17 +1,15 @@
 import numpy as np
-import random
-from itertools import filterfalse
-from itertools import combinations
 import codecs
-import utils
+import weat_stats
+import similarities
+import embeddings
+import weat_tests
 import os
 import pickle
 import logging
 import argparse
 import time
 from collections import OrderedDict
-import math
-from sklearn.metrics.pairwise import euclidean_distances
 
 
 
@@ -23,15 +21,35 @@ class XWEAT(object):
   Credits: Basic implementation based on https://gist.github.com/SandyRogers/e5c2e938502a75dcae25216e4fae2da5
   """
 
-  def __init__(self):
+  def __init__(self, dtype=np.float64):
+    self.dtype = dtype
     self.embd_dict = None
     self.vocab = None
     self.targets_embedding_matrix = None
     self.attributes_embedding_matrix = None
+    self.permutations_used = None
+    self.null_distribution = None
 
-  def set_embd_dicts(self, targets_embd_dict, attributes_embd_dict):
+  def set_embd_dicts(self, targets_embd_dict, attributes_embd_dict, targets_path=None, attributes_path=None,
+                     targets_vocab_path=None, attributes_vocab_path=None):
+    """Set the embeddings, the paths of the files they were loaded from (vectors and vocabularies) are used to
+    cache csls_full penalties, which are outdated when any of these files changes.
+
+    The embeddings are embeddings.EmbeddingStore objects, dicts from words to vectors are copied into one.
+    """
+    if not isinstance(targets_embd_dict, embeddings.EmbeddingStore):
+      same = targets_embd_dict is attributes_embd_dict
+      targets_embd_dict = embeddings.EmbeddingStore.from_dict(targets_embd_dict, self.dtype)
+      if same:
+        attributes_embd_dict = targets_embd_dict
+    if not isinstance(attributes_embd_dict, embeddings.EmbeddingStore):
+      attributes_embd_dict = embeddings.EmbeddingStore.from_dict(attributes_embd_dict, self.dtype)
     self.targets_embd_dict = targets_embd_dict
     self.attributes_embd_dict = attributes_embd_dict
+    self.targets_path = targets_path
+    self.attributes_path = attributes_path
+    self.targets_vocab_path = targets_vocab_path
+    self.attributes_vocab_path = attributes_vocab_path
 
 
   def _build_vocab_dicts(self, targets_vocab, attributes_vocab):
@@ -74,23 +92,40 @@ class XWEAT(object):
       raise NotImplementedError()
     return output
 
-  def _build_embedding_matrix(self):
-    self.targets_embedding_matrix = []
-    for term, index in self.targets_vocab.items():
-      if term in self.targets_embd_dict:
-        self.targets_embedding_matrix.append(self.targets_embd_dict[term])
-      else:
-        raise AssertionError("This should not happen.")
+  def _build_embedding_matrix(self, similarity_type=None):
+    if similarity_type == "csls_full":
+      self._build_csls_penalties()
+    self.targets_embedding_matrix = self.targets_embd_dict.vectors(self.targets_vocab, self.dtype)
     self.targets_embd_dict = None
-    self.attributes_embedding_matrix = []
-    for term, index in self.attributes_vocab.items():
-      if term in self.attributes_embd_dict:
-        self.attributes_embedding_matrix.append(self.attributes_embd_dict[term])
-      else:
-        raise AssertionError("This should not happen.")
+    self.attributes_embedding_matrix = self.attributes_embd_dict.vectors(self.attributes_vocab, self.dtype)
     self.attributes_embd_dict = None
 
 
+  def _build_csls_penalties(self, k=similarities.CSLS_K):
+    """CSLS penalties of the targets over the whole attributes vocabulary and vice versa."""
+    monolingual = self.targets_embd_dict is self.attributes_embd_dict
+    self.targets_penalties = similarities.cached_csls_penalties(
+      list(self.targets_vocab), self.targets_embd_dict, self.attributes_embd_dict, k, exclude_self=monolingual,
+      **self._csls_cache(self.targets_path, self.attributes_path, k, self.targets_vocab_path,
+                         self.attributes_vocab_path), dtype=self.dtype)
+    self.attributes_penalties = similarities.cached_csls_penalties(
+      list(self.attributes_vocab), self.attributes_embd_dict, self.targets_embd_dict, k, exclude_self=monolingual,
+      **self._csls_cache(self.attributes_path, self.targets_path, k, self.attributes_vocab_path,
+                         self.targets_vocab_path), dtype=self.dtype)
+
+
+  @staticmethod
+  def _csls_cache(path, neighbourhood_path, k, vocab_path=None, neighbourhood_vocab_path=None):
+    if path is None or neighbourhood_path is None:
+      return {"cache_path": None, "source_paths": ()}
+    sources = tuple(p for p in (vocab_path, path) if p is not None)
+    if path == neighbourhood_path:
+      return {"cache_path": "%s.csls%d.json" % (path, k), "source_paths": sources}
+    sources += tuple(p for p in (neighbourhood_vocab_path, neighbourhood_path) if p is not None)
+    return {"cache_path": "%s.csls%d-%s.json" % (path, k, os.path.basename(neighbourhood_path)),
+            "source_paths": sources}
+
+
   def mat_normalize(self,mat, norm_order=2, axis=1):
     return mat / np.transpose([np.linalg.norm(mat, norm_order, axis)])
 
@@ -102,12 +137,10 @@ class XWEAT(object):
     return cos
 
 
-  def euclidean(self, a, b):
+  def euclidean(self, a, b, block_size=similarities.BLOCK_SIZE):
     norm_a = self.mat_normalize(a)
     norm_b = self.mat_normalize(b)
-    distances = euclidean_distances(norm_a, norm_b)
-    eucl = 1/ (1+distances)
-    return eucl
+    return similarities.euclidean(norm_a, norm_b, block_size)
 
 
   def csls(self, a, b, k=10):
@@ -131,203 +164,17 @@ class XWEAT(object):
       self.similarities = self.csls(self.targets_embedding_matrix, self.attributes_embedding_matrix)
     elif similarity_type == "euclidean":
       self.similarities = self.euclidean(self.targets_embedding_matrix, self.attributes_embedding_matrix)
+    elif similarity_type == "csls_full":
+      self.similarities = similarities.csls(self.mat_normalize(self.targets_embedding_matrix),
+                                            self.mat_normalize(self.attributes_embedding_matrix),
+                                            self.targets_penalties, self.attributes_penalties)
     else:
       raise NotImplementedError()
 
 
-  def weat_1(self):
-    """
-    WEAT 1 (universally accepted): Targets 1=Flowers, Targets 2=Insects, Attributes 1=pleasant, Attributes 2=unpleasant
-    :return: targets_1, targets_2, attributes_1, attributes_2
-    """
-    targets_1 = ["aster", "clover", "hyacinth", "marigold", "poppy", "azalea", "crocus", "iris", "orchid", "rose",
-               "blue-bell", "daffodil", "lilac", "pansy", "tulip", "buttercup", "daisy", "lily", "peony", "violet",
-               "carnation", "gladiola", "magnolia", "petunia", "zinnia"]
-    targets_2 = ["ant", "caterpillar", "flea", "locust", "spider", "bedbug", "centipede", "fly", "maggot", "tarantula",
-               "bee", "cockroach", "gnat", "mosquito", "termite", "beetle", "cricket", "hornet", "moth", "wasp",
-               "blackfly",
-               "dragonfly", "horsefly", "roach", "weevil"]
-    attributes_1 = ["caress", "freedom", "health", "love", "peace", "cheer", "friend", "heaven", "loyal", "pleasure",
-                "diamond", "gentle", "honest", "lucky", "rainbow", "diploma", "gift", "honor", "miracle", "sunrise",
-                "family",
-                "happy", "laughter", "paradise", "vacation"]
-    attributes_2 = ["abuse", "crash", "filth", "murder", "sickness", "accident", "death", "grief", "poison", "stink",
-                  "assault", "disaster", "hatred", "pollute", "tragedy", "divorce", "jail", "poverty", "ugly", "cancer",
-                  "kill", "rotten",
-                  "vomit", "agony", "prison"]
-    return targets_1, targets_2, attributes_1, attributes_2
-
-
-  # WEAT 2: Target 1=Musical instruments, Target 2= Weapons, Attributes 1: pleasant, Attributes 2=unpleasant
-  def weat_2(self):
-    targets_1 = ["bagpipe", "cello", "guitar", "lute", "trombone", "banjo", "clarinet", "harmonica", "mandolin",
-                 "trumpet", "bassoon", "drum", "harp", "oboe", "tuba", "bell", "fiddle", "harpsichord", "piano",
-                 "viola", "bongo",
-                 "flute", "horn", "saxophone", "violin"]
-    targets_2 = ["arrow", "club", "gun", "missile", "spear", "axe", "dagger", "harpoon", "pistol", "sword", "blade",
-             "dynamite", "hatchet", "rifle", "tank", "bomb", "firearm", "knife", "shotgun", "teargas", "cannon",
-             "grenade",
-             "mace", "slingshot", "whip"]
-    attributes_1 = ["caress", "freedom", "health", "love", "peace", "cheer", "friend", "heaven", "loyal", "pleasure",
-                "diamond", "gentle", "honest", "lucky", "rainbow", "diploma", "gift", "honor", "miracle", "sunrise",
-                "family", "happy", "laughter", "paradise", "vacation"]
-    attributes_2 = ["abuse", "crash", "filth", "murder", "sickness", "accident", "death", "grief", "poison", "stink",
-                  "assault", "disaster", "hatred", "pollute", "tragedy", "divorce", "jail", "poverty", "ugly", "cancer",
-                  "kill", "rotten",
-                  "vomit", "agony", "prison"]
-
-    return targets_1, targets_2, attributes_1, attributes_2
-
-
-  # Here they deleted the infrequent african american names, and the same number randomly choosen from the european american names
-  def weat_3(self):
-    # excluded in the original paper: Chip, Ian, Fred, Jed, Todd, Brandon, Wilbur, Sara, Amber, Crystal, Meredith, Shannon, Donna,
-    # Bobbie-Sue, Peggy, Sue-Ellen, Wendy
-    targets_1 = ["Adam", "Harry", "Josh", "Roger", "Alan", "Frank", "Justin", "Ryan", "Andrew", "Jack", "Matthew", "Stephen",
-                 "Brad", "Greg", "Paul", "Hank", "Jonathan", "Peter", "Amanda", "Courtney", "Heather", "Melanie",
-                 "Katie", "Betsy", "Kristin", "Nancy", "Stephanie", "Ellen", "Lauren",  "Colleen", "Emily", "Megan", "Rachel",
-                 "Chip", "Ian", "Fred", "Jed", "Todd", "Brandon", "Wilbur", "Sara", "Amber", "Crystal", "Meredith", "Shannon",
-                 "Donna", "Bobbie-Sue", "Peggy", "Sue-Ellen", "Wendy"]
-
-    # excluded: Lerone, Percell, Rasaan, Rashaun, Everol, Terryl, Aiesha, Lashelle, Temeka, Tameisha, Teretha, Latonya, Shanise,
-    # Sharise, Tashika, Lashandra, Shavonn, Tawanda,
-    targets_2 = ["Alonzo", "Jamel",  "Theo", "Alphonse", "Jerome", "Leroy", "Torrance", "Darnell", "Lamar", "Lionel",
-                 "Tyree", "Deion", "Lamont", "Malik", "Terrence", "Tyrone",  "Lavon", "Marcellus", "Wardell", "Nichelle",
-                 "Shereen", "Ebony", "Latisha", "Shaniqua", "Jasmine", "Tanisha", "Tia", "Lakisha", "Latoya",  "Yolanda",
-                 "Malika",  "Yvette", "Lerone", "Percell", "Rasaan", "Rashaun", "Everol", "Terryl", "Aiesha", "Lashelle",
-                 "Temeka", "Tameisha", "Teretha", "Latonya", "Shanise", "Sharise", "Tashika", "Lashandra", "Shavonn", "Tawanda"]
-
-    attributes_1 = ["caress", "freedom", "health", "love", "peace", "cheer", "friend", "heaven", "loyal", "pleasure",
-                "diamond", "gentle", "honest", "lucky", "rainbow", "diploma", "gift", "honor", "miracle", "sunrise",
-                "family", "happy", "laughter", "paradise", "vacation"]
-
-    # same as before but agony and prison are replaced with bomb and evil
-    attributes_2 = ["abuse", "crash", "filth", "murder", "sickness", "accident", "death", "grief", "poison", "stink",
-                  "assault", "disaster", "hatred", "pollute", "tragedy", "divorce", "jail", "poverty", "ugly", "cancer",
-                  "kill", "rotten",
-                  "vomit", "bomb", "evil"]
-
-    return targets_1, targets_2, attributes_1, attributes_2
-
-
-  # again: african american names vs. european american names and pleasant vs unpleasant but with different names
-  def weat_4(self):
-    # excluded as in the original paper: Jay, Kristen, (here only excluded in the glove experiments)
-    targets_1 = ["Brad", "Brendan", "Geoffrey", "Greg", "Brett",  "Matthew", "Neil", "Todd", "Allison", "Anne",
-                 "Carrie", "Emily", "Jill", "Laurie",  "Meredith", "Sarah", "Jay", "Kristen"]
-
-    # excluded in GloVe experiments:  Tremayne, Latonya,
-    targets_2 = ["Darnell", "Hakim", "Jermaine", "Kareem", "Jamal", "Leroy", "Rasheed", "Tyrone", "Aisha", "Ebony",
-                 "Keisha", "Kenya",  "Lakisha", "Latoya", "Tamika", "Tanisha", "Tremayne", "Latonya"]
-
-    attributes_1 = ["caress", "freedom", "health", "love", "peace", "cheer", "friend", "heaven", "loyal", "pleasure",
-                    "diamond", "gentle", "honest", "lucky", "rainbow", "diploma", "gift", "honor", "miracle", "sunrise",
-                    "family", "happy", "laughter", "paradise", "vacation"]
-
-    # same as before but agony and prison are replaced with bomb and evil
-    attributes_2 = ["abuse", "crash", "filth", "murder", "sickness", "accident", "death", "grief", "poison", "stink",
-                    "assault", "disaster", "hatred", "pollute", "tragedy", "divorce", "jail", "poverty", "ugly",
-                    "cancer",
-                    "kill", "rotten",
-                    "vomit", "bomb", "evil"]
-
-    return targets_1, targets_2, attributes_1, attributes_2
-
-
-  # again african american vs european american names, but with different attributes
-  def weat_5(self):
-    # excluded as in the original paper: Jay, Kristen, (here only excluded in the glove experiments)
-    targets_1 = ["Brad", "Brendan", "Geoffrey", "Greg", "Brett",  "Matthew", "Neil", "Todd", "Allison", "Anne",
-                 "Carrie", "Emily", "Jill", "Laurie",  "Meredith", "Sarah", "Jay", "Kristen"]
-
-    # excluded in GloVe experiments:  Tremayne, Latonya,
-    targets_2 = ["Darnell", "Hakim", "Jermaine", "Kareem", "Jamal", "Leroy", "Rasheed", "Tyrone", "Aisha", "Ebony",
-                 "Keisha", "Kenya",  "Lakisha", "Latoya", "Tamika", "Tanisha", "Tremayne", "Latonya"]
-
-    attributes_1 = ["joy", "love", "peace", "wonderful", "pleasure", "friend", "laughter", "happy"]
-
-    attributes_2 = ["agony", "terrible", "horrible", "nasty", "evil", "war", "awful", "failure"]
-
-    return targets_1, targets_2, attributes_1, attributes_2
-
-
-  # sex- career
-  def weat_6(self):
-    targets_1 = ["John", "Paul", "Mike", "Kevin", "Steve", "Greg", "Jeff", "Bill"]
-    targets_2 = ["Amy", "Joan", "Lisa", "Sarah", "Diana", "Kate", "Ann", "Donna"]
-    attributes_1 = ["executive", "management", "professional", "corporation", "salary", "office", "business", "career"]
-    attributes_2 = ["home", "parents", "children", "family", "cousins", "marriage", "wedding", "relatives"]
-
-    return targets_1, targets_2, attributes_1, attributes_2
-
-
-  # sex - math
-  def weat_7(self):
-    targets_1 = ["math", "algebra", "geometry", "calculus", "equations", "computation", "numbers", "addition"]
-    targets_2 = ["poetry", "art", "dance", "literature", "novel", "symphony", "drama", "sculpture"]
-    attributes_1 = ["male", "man", "boy", "brother", "he", "him", "his", "son"]
-    attributes_2 = ["female", "woman", "girl", "sister", "she", "her", "hers", "daughter"]
-    return targets_1, targets_2, attributes_1, attributes_2
-
-
-  # sex - science
-  def weat_8(self):
-    targets_1 = ["science", "technology", "physics", "chemistry", "Einstein", "NASA", "experiment", "astronomy"]
-    targets_2 = ["poetry", "art", "Shakespeare", "dance", "literature", "novel", "symphony", "drama"]
-    attributes_1 = ["brother", "father", "uncle", "grandfather", "son", "he", "his", "him"]
-    attributes_2 = ["sister", "mother", "aunt", "grandmother", "daughter", "she", "hers", "her"]
-    return targets_1, targets_2, attributes_1, attributes_2
-
-
-  # desease - uncontrollability
-  def weat_9(self):
-    targets_1 = ["sad", "hopeless", "gloomy", "tearful", "miserable", "depressed"]
-    targets_2 = ["sick", "illness", "influenza", "disease", "virus", "cancer"]
-    # in w2v experiments, the've replaced short-term with short
-    attributes_1 = ["impermanent", "unstable", "variable", "fleeting", "short-term", "brief", "occasional"]
-    attributes_2 = ["stable", "always", "constant", "persistent", "chronic", "prolonged", "forever"]
-
-    return targets_1, targets_2, attributes_1, attributes_2
-
-
-  # old - pleasant
-  def weat_10(self):
-    targets_1 = ["Tiffany", "Michelle", "Cindy", "Kristy", "Brad", "Eric", "Joey", "Billy"]
-    targets_2 = ["Ethel", "Bernice", "Gertrude", "Agnes", "Cecil", "Wilbert", "Mortimer", "Edgar"]
-    attributes_1 = ["joy", "love", "peace", "wonderful", "pleasure", "friend", "laughter", "happy"]
-    attributes_2 = ["agony", "terrible", "horrible", "nasty", "evil", "war", "awful", "failure"]
-
-    return targets_1, targets_2, attributes_1, attributes_2
-  # missing from the original IAT: arab-muslim
-
-
-  # occupations
-  def wefat_1(self):
-    # occupations derived from th bureau of labor statistics
-    targets = ["technician", "accountant", "supervisor", "engineer", "worker", "educator", "clerk", "counselor", "inspector",
-              "mechanic", "manager", "therapist", "administrator", "salesperson", "receptionist", "librarian", "advisor", "pharmacist",
-              "janitor", "psychologist", "physician", "carpenter", "nurse", "investigator", "bartender", "specialist", "electrician",
-              "officer", "pathologist", "teacher", "lawyer", "planner", "practitioner", "plumber", "instructor",
-              "surgeon", "veterinarian", "paramedic",
-              "examiner", "chemist", "machinist", "appraiser", "nutritionist", "architect", "hairdresser", "baker",
-              "programmer", "paralegal", "hygienist", "scientist"]
-
-    attributes_1 = ["male", "man", "boy", "brother", "he", "him", "his", "son"]
-    attributes_2 = ["female", "woman", "girl", "sister", "she", "her", "hers", "daughter"]
-    return targets, attributes_1, attributes_2
-
-
-  # androgynous names
-  def wefat_2(self):
-    targets = ["Kelly", "Tracy", "Jamie", "Jackie", "Jesse", "Courtney", "Lynn", "Taylor", "Leslie", "Shannon",
-              "Stacey", "Jessie", "Shawn", "Stacy", "Casey", "Bobby", "Terry", "Lee", "Ashley", "Eddie", "Chris", "Jody", "Pat",
-              "Carey", "Willie", "Morgan", "Robbie", "Joan", "Alexis", "Kris", "Frankie", "Bobbie", "Dale", "Robin", "Billie",
-              "Adrian", "Kim", "Jaime", "Jean", "Francis", "Marion", "Dana", "Rene", "Johnnie", "Jordan", "Carmen", "Ollie",
-              "Dominique", "Jimmie", "Shelby"]
-
-    attributes_1 = ["male", "man", "boy", "brother", "he", "him", "his", "son"]
-    attributes_2 = ["female", "woman", "girl", "sister", "she", "her", "hers", "daughter"]
-    return targets, attributes_1, attributes_2
+  def test_words(self, test_id):
+    """Word lists of the test test_id of weat_tests.XWEAT_TESTS, see weat_tests.resolve."""
+    return weat_tests.resolve(weat_tests.XWEAT_TESTS[test_id], weat_tests.load_words)
 
 
   def similarity_precomputed_sims(self, w1, w2, type="cosine"):
@@ -335,55 +182,47 @@ class XWEAT(object):
 
 
   def word_association_with_attribute_precomputed_sims(self, w, A, B):
-    return np.mean([self.similarity_precomputed_sims(w, a) for a in A]) - np.mean([self.similarity_precomputed_sims(w, b) for b in B])
+    return weat_stats.word_associations(self.similarities, [w], A, B)[0]
+
 
+  def word_associations_precomputed_sims(self, T, A, B):
+    return weat_stats.word_associations(self.similarities, T, A, B)
 
-  def differential_association_precomputed_sims(self, T1, T2, A1, A2):
-    return np.sum([self.word_association_with_attribute_precomputed_sims(t1, A1, A2) for t1 in T1]) \
-           - np.sum([self.word_association_with_attribute_precomputed_sims(t2, A1, A2) for t2 in T2])
 
+  def differential_association_precomputed_sims(self, T1, T2, A1, A2, associations=None):
+    if associations is None:
+      associations = self.word_associations_precomputed_sims(T1 + T2, A1, A2)
+    return weat_stats.observed_statistic(associations, len(T1))
 
-  def weat_effect_size_precomputed_sims(self, T1, T2, A1, A2):
-    return (
-             np.mean([self.word_association_with_attribute_precomputed_sims(t1, A1, A2) for t1 in T1]) -
-             np.mean([self.word_association_with_attribute_precomputed_sims(t2, A1, A2) for t2 in T2])
-           ) / np.std([self.word_association_with_attribute_precomputed_sims(w, A1, A2) for w in T1 + T2])
 
+  def weat_effect_size_precomputed_sims(self, T1, T2, A1, A2, associations=None):
+    if associations is None:
+      associations = self.word_associations_precomputed_sims(T1 + T2, A1, A2)
+    return weat_stats.effect_size(associations, len(T1))
 
-  def _random_permutation(self, iterable, r=None):
-    pool = tuple(iterable)
-    r = len(pool) if r is None else r
-    return tuple(random.sample(pool, r))
 
-  def weat_p_value_precomputed_sims(self, T1, T2, A1, A2, sample):
+  def weat_p_value_precomputed_sims(self, T1, T2, A1, A2, sample, method="permutations", workers=1, seed=None,
+                                    significance_levels=weat_stats.SIGNIFICANCE_LEVELS, dedup=False, shard=None,
+                                    associations=None):
     logging.info("Calculating p value ... ")
     size_of_permutation = min(len(T1), len(T2))
-    T1_T2 = T1 + T2
-    observed_test_stats_over_permutations = []
-    total_possible_permutations = math.factorial(len(T1_T2)) / math.factorial(size_of_permutation) / math.factorial((len(T1_T2)-size_of_permutation))
-    logging.info("Number of possible permutations: %d", total_possible_permutations)
-    if not sample or sample >= total_possible_permutations:
-      permutations = combinations(T1_T2, size_of_permutation)
-    else:
-      logging.info("Computing randomly first %d permutations", sample)
-      permutations = set()
-      while len(permutations) < sample:
-        permutations.add(tuple(sorted(self._random_permutation(T1_T2, size_of_permutation))))
-
-    for Xi in permutations:
-      Yi = filterfalse(lambda w: w in Xi, T1_T2)
-      observed_test_stats_over_permutations.append(self.differential_association_precomputed_sims(Xi, Yi, A1, A2))
-      if len(observed_test_stats_over_permutations) % 100000 == 0:
-        logging.info("Iteration %s finished", str(len(observed_test_stats_over_permutations)))
-    unperturbed = self.differential_association_precomputed_sims(T1, T2, A1, A2)
-    is_over = np.array([o > unperturbed for o in observed_test_stats_over_permutations])
-    return is_over.sum() / is_over.size
-
-
-  def weat_stats_precomputed_sims(self, T1, T2, A1, A2, sample_p=None):
-    test_statistic = self.differential_association_precomputed_sims(T1, T2, A1, A2)
-    effect_size = self.weat_effect_size_precomputed_sims(T1, T2, A1, A2)
-    p = self.weat_p_value_precomputed_sims(T1, T2, A1, A2, sample=sample_p)
+    if associations is None:
+      associations = self.word_associations_precomputed_sims(T1 + T2, A1, A2)
+    p, self.permutations_used, self.null_distribution = weat_stats.p_value(
+      associations, size_of_permutation, sample, method=method, workers=workers, seed=seed,
+      significance_levels=significance_levels, dedup=dedup, shard=shard)
+    return p
+
+
+  def weat_stats_precomputed_sims(self, T1, T2, A1, A2, sample_p=None, p_value_method="permutations", workers=1,
+                                  seed=None, significance_levels=weat_stats.SIGNIFICANCE_LEVELS, dedup=False,
+                                  shard=None):
+    associations = self.word_associations_precomputed_sims(T1 + T2, A1, A2)
+    test_statistic = self.differential_association_precomputed_sims(T1, T2, A1, A2, associations)
+    effect_size = self.weat_effect_size_precomputed_sims(T1, T2, A1, A2, associations)
+    p = self.weat_p_value_precomputed_sims(T1, T2, A1, A2, sample=sample_p, method=p_value_method, workers=workers,
+                                           seed=seed, significance_levels=significance_levels, dedup=dedup,
+                                           shard=shard, associations=associations)
     return test_statistic, effect_size, p
 
   def _create_vocab(self):
@@ -392,12 +231,9 @@ class XWEAT(object):
     :return: all
     """
     all = []
-    for i in range(1, 10):
-      t1, t2, a1, a2 = getattr(self, "weat_" + str(i))()
-      all = all + t1 + t2 + a1 + a2
-    for i in range(1, 2):
-      t1, a1, a2 = getattr(self, "wefat_" + str(i))()
-      all = all + t1 + a1 + a2
+    for test_id in ["weat_" + str(i) for i in range(1, 10)] + ["wefat_1"]:
+      for word_list in self.test_words(test_id):
+        all = all + word_list
     all = set(all)
     return all
 
@@ -413,7 +249,9 @@ class XWEAT(object):
       f.close()
 
 
-  def run_test_precomputed_sims(self, target_1, target_2, attributes_1, attributes_2, sample_p=None, similarity_type="cosine"):
+  def run_test_precomputed_sims(self, target_1, target_2, attributes_1, attributes_2, sample_p=None, similarity_type="cosine",
+                                p_value_method="permutations", workers=1, seed=None,
+                                significance_levels=weat_stats.SIGNIFICANCE_LEVELS, dedup=False, shard=None):
     """Run the WEAT test for differential association between two
     sets of target words and two sets of attributes.
 
@@ -422,7 +260,9 @@ class XWEAT(object):
         e is the effect size, and p is the one-sided p-value measuring the
         (un)likeliness of the null hypothesis (which is that there is no
         difference in association between the two target word sets and
-        the attributes).
+        the attributes). With shard=(index, shards), p only covers
+        this shard of all permutations and the shards are combined
+        with weat_stats.merge_shards.
 
         If e is large and p small, then differences in the model between
         the attribute word sets match differences between the targets.
@@ -449,9 +289,38 @@ class XWEAT(object):
       A1.pop(-1)
     assert len(T1)==len(T2)
     assert len(A1) == len(A2)
-    self._build_embedding_matrix()
+    self._build_embedding_matrix(similarity_type)
+    self._init_similarities(similarity_type)
+    return self.weat_stats_precomputed_sims(T1, T2, A1, A2, sample_p, p_value_method, workers, seed, significance_levels,
+                                            dedup, shard)
+
+  def run_wefat_precomputed_sims(self, targets, attributes_1, attributes_2, sample_p=None, similarity_type="cosine",
+                                 seed=None):
+    """Run the WEFAT test for the association of every target word
+    with two sets of attributes.
+
+    RETURNS:
+        A list of (word, s, p) rows, one per target word in the vocab,
+        where s is the normalized association s(w, A, B) and p is the
+        one-sided p-value of s over the permutations of the attributes.
+    """
+    self._build_vocab_dicts(targets_vocab=targets, attributes_vocab=attributes_1 + attributes_2)
+    words = [t for t in targets if t in self.targets_vocab]
+    T = self.convert_by_vocab(words, type="targets")
+    A1 = self.convert_by_vocab(attributes_1, type="attributes")
+    A2 = self.convert_by_vocab(attributes_2, type="attributes")
+    while len(A1) < len(A2):
+      logging.info("Popped A2 %d", A2[-1])
+      A2.pop(-1)
+    while len(A2) < len(A1):
+      logging.info("Popped A1 %d", A1[-1])
+      A1.pop(-1)
+    assert len(A1) == len(A2)
+    self._build_embedding_matrix(similarity_type)
     self._init_similarities(similarity_type)
-    return self.weat_stats_precomputed_sims(T1, T2, A1, A2, sample_p)
+    associations = weat_stats.wefat_associations(self.similarities, T, A1, A2)
+    p_values, self.permutations_used = weat_stats.wefat_p_values(self.similarities, T, A1, A2, sample_p, seed)
+    return list(zip(words, associations.tolist(), p_values.tolist()))
 
   def _parse_translations(self, path="./data/vocab_en_de.csv", new_path="./data/vocab_dict_en_de.p", is_russian=False):
     """
@@ -485,30 +354,27 @@ class XWEAT(object):
 def load_vocab_goran(path):
   return pickle.load(open(path, "rb"))
 
-def load_vectors_goran(path):
-  return np.load(path)
-
-def load_embedding_dict(vocab_path="", vector_path="", glove=False):
+def load_embedding_dict(vocab_path="", vector_path="", glove=False, dtype=None, cache=True, workers=1):
   """
   >>> _load_embedding_dict()
-  :param vocab_path:
-  :param vector_path:
-  :return: embd_dict
+  :param vocab_path: pickled vocab, read with vector_path through their bundle (see embeddings.load_vocab_vectors)
+  :param vector_path: vectors in .npy format
+  :param dtype: numpy dtype of the vectors, as stored if None (the bundle of vocab_path stays as stored)
+  :param cache: whether to cache glove in binary format next to it (see embeddings.load_vec_cached)
+  :param workers: number of processes that parse glove (see embeddings.parse_vec_parallel)
+  :return: embd_dict, an embeddings.EmbeddingStore
   """
   if glove:
     if os.name == "nt":
-      embd_dict = utils.load_embeddings("C:/Users/anlausch/workspace/embedding_files/glove.6B/glove.6B.300d.txt",
-                                        word2vec=False)
+      glove_path = "C:/Users/anlausch/workspace/embedding_files/glove.6B/glove.6B.300d.txt"
     else:
-      embd_dict = utils.load_embeddings("/work/anlausch/glove.6B.300d.txt", word2vec=False)
-    return embd_dict
-  embd_dict = {}
-  vocab = load_vocab_goran(vocab_path)
-  vectors = load_vectors_goran(vector_path)
-  for term, index in vocab.items():
-    embd_dict[term] = vectors[index]
-  assert len(embd_dict) == len(vocab)
-  return embd_dict
+      glove_path = "/work/anlausch/glove.6B.300d.txt"
+    if cache:
+      return embeddings.load_embedding_dict_cached(glove_path, dtype, workers)
+    return embeddings.EmbeddingStore.from_words(
+      *embeddings.parse_vec_parallel(glove_path, np.float64 if dtype is None else dtype, workers))
+  # the memory-mapped bundle stays as stored, the rows of the test words are cast when they are gathered
+  return embeddings.load_vocab_vectors(vocab_path, vector_path)
 
 def translate(translation_dict, terms):
   translation = []
@@ -536,12 +402,17 @@ def main():
     return s == 'True' or s == 'true'
   parser = argparse.ArgumentParser(description="Running XWEAT")
   parser.add_argument("--test_number", type=int, help="Number of the weat test to run", required=False)
+  parser.add_argument("--wefat_number", type=int, choices=[1, 2], default=None,
+                      help="Number of the wefat test to run instead, writes a table of the association of every "
+                           "target word", required=False)
   parser.add_argument("--permutation_number", type=int, default=None,
-                      help="Number of permutations (otherwise all will be run)", required=False)
+                      help="Number of permutations (otherwise all will be run, as they are if there are few enough)",
+                      required=False)
   parser.add_argument("--output_file", type=str, default=None, help="File to store the results)", required=False)
   parser.add_argument("--lower", type=boolean_string, default=False, help="Whether to lower the vocab", required=True)
-  parser.add_argument("--similarity_type", type=str, default="cosine", help="Which similarity function to use",
-                      required=False)
+  parser.add_argument("--similarity_type", type=str, default="cosine",
+                      help="Which similarity function to use: 'cosine', 'euclidean', 'csls' or 'csls_full' (csls over "
+                           "the whole embedding vocabularies)", required=False)
   parser.add_argument("--use_glove", type=boolean_string, default=False, help="Use glove")
 
   parser.add_argument("--attributes_embedding_vocab", type=str, help="Vocab of the embeddings")
@@ -552,36 +423,46 @@ def main():
 
   parser.add_argument("--attributes_lang", type=str, default="en", help="Language of the attribute words")
   parser.add_argument("--targets_lang", type=str, default="en", help="Language of the target words")
+  parser.add_argument("--p_value_method", type=str, default="permutations", choices=weat_stats.P_VALUE_METHODS,
+                      help="How to compute the p-value: 'permutations' (sampled or enumerated) or 'subset_sum' "
+                           "(exact null distribution) or 'sequential' (stop sampling early)")
+  parser.add_argument("--workers", type=int, default=1,
+                      help="Number of processes to sample the permutations in, with seeded random streams, and to "
+                           "parse glove with")
+  parser.add_argument("--seed", type=int, default=None, help="Seed of the random streams used to sample permutations")
+  parser.add_argument("--dedup_permutations", type=boolean_string, default=False,
+                      help="Whether to sample permutations without repetitions")
+  parser.add_argument("--significance_levels", type=float, nargs="+", default=weat_stats.SIGNIFICANCE_LEVELS,
+                      help="Levels at which the sequential p-value sampling decides whether to stop")
+  parser.add_argument("--shard", type=int, default=None,
+                      help="Index of the shard of all permutations to enumerate (merge with weat_stats.py)")
+  parser.add_argument("--shards", type=int, default=None, help="Number of shards the permutations are split into")
+  parser.add_argument("--dtype", type=str, default="float64", choices=["float64", "float32"],
+                      help="Precision of the embeddings, similarities and statistics")
   args = parser.parse_args()
+  if (args.shard is None) != (args.shards is None):
+    parser.error("--shard and --shards must be given together")
+  shard = None
+  if args.shards is not None:
+    if not 0 <= args.shard < args.shards:
+      parser.error("--shard must be at least 0 and smaller than --shards")
+    shard = (args.shard, args.shards)
 
   start = time.time()
   logging.basicConfig(level=logging.INFO)
   logging.info("XWEAT started")
-  weat = XWEAT()
+  dtype = np.dtype(args.dtype)
+  weat = XWEAT(dtype=dtype)
 
   # load specific test vocab
-  if args.test_number == 1:
-    targets_1, targets_2, attributes_1, attributes_2 = weat.weat_1()
-  elif args.test_number == 2:
-    targets_1, targets_2, attributes_1, attributes_2 = weat.weat_2()
-  elif args.test_number == 3:
-    targets_1, targets_2, attributes_1, attributes_2 = weat.weat_3()
-  elif args.test_number == 4:
-    targets_1, targets_2, attributes_1, attributes_2 = weat.weat_4()
-  elif args.test_number == 5:
-    targets_1, targets_2, attributes_1, attributes_2 = weat.weat_5()
-  elif args.test_number == 6:
-    targets_1, targets_2, attributes_1, attributes_2 = weat.weat_6()
-  elif args.test_number == 7:
-    targets_1, targets_2, attributes_1, attributes_2 = weat.weat_7()
-  elif args.test_number == 8:
-    targets_1, targets_2, attributes_1, attributes_2 = weat.weat_8()
-  elif args.test_number == 9:
-    targets_1, targets_2, attributes_1, attributes_2 = weat.weat_9()
-  elif args.test_number == 10:
-    targets_1, targets_2, attributes_1, attributes_2 = weat.weat_10()
-  else:
+  test_id = "wefat_%d" % args.wefat_number if args.wefat_number else "weat_%s" % args.test_number
+  if test_id not in weat_tests.XWEAT_TESTS:
     raise ValueError("Only WEAT 1 to 10 are supported")
+  if args.wefat_number:
+    targets_1, attributes_1, attributes_2 = weat.test_words(test_id)
+    targets_2 = []
+  else:
+    targets_1, targets_2, attributes_1, attributes_2 = weat.test_words(test_id)
 
   if args.targets_lang != "en":
     logging.info("Translating target terms from en to %s", args.targets_lang)
@@ -602,21 +483,39 @@ def main():
     attributes_2 = [a.lower() for a in attributes_2]
 
 
+  targets_path, attributes_path = None, None
   if args.use_glove and args.attributes_lang == "en" and args.targets_lang == "en":
-    targets_embd_dict = load_embedding_dict(glove=True)
-    attributes_embd_dict = load_embedding_dict(glove=True)
+    targets_embd_dict = load_embedding_dict(glove=True, dtype=dtype, workers=args.workers)
+    attributes_embd_dict = targets_embd_dict
   elif args.use_glove:
     raise NotImplementedError("Cross-lingual is only allowed for fasttext")
   else:
-    targets_embd_dict = load_embedding_dict(vocab_path=args.targets_embedding_vocab, vector_path=args.targets_embedding_vectors, glove=False)
-    attributes_embd_dict = load_embedding_dict(vocab_path=args.attributes_embedding_vocab,
-                                            vector_path=args.attributes_embedding_vectors, glove=False)
-  weat.set_embd_dicts(targets_embd_dict=targets_embd_dict, attributes_embd_dict=attributes_embd_dict)
+    targets_path, attributes_path = args.targets_embedding_vectors, args.attributes_embedding_vectors
+    targets_embd_dict = load_embedding_dict(vocab_path=args.targets_embedding_vocab, vector_path=args.targets_embedding_vectors, glove=False,
+                                            dtype=dtype)
+    if (args.attributes_embedding_vocab, attributes_path) == (args.targets_embedding_vocab, targets_path):
+      attributes_embd_dict = targets_embd_dict
+    else:
+      attributes_embd_dict = load_embedding_dict(vocab_path=args.attributes_embedding_vocab,
+                                                 vector_path=args.attributes_embedding_vectors, glove=False, dtype=dtype)
+  weat.set_embd_dicts(targets_embd_dict=targets_embd_dict, attributes_embd_dict=attributes_embd_dict,
+                      targets_path=targets_path, attributes_path=attributes_path,
+                      targets_vocab_path=args.targets_embedding_vocab if targets_path else None,
+                      attributes_vocab_path=args.attributes_embedding_vocab if attributes_path else None)
 
   logging.info("Embeddings loaded")
   logging.info("Running test")
-  result = weat.run_test_precomputed_sims(targets_1, targets_2, attributes_1, attributes_2, args.permutation_number, args.similarity_type)
+  if args.wefat_number:
+    table = weat.run_wefat_precomputed_sims(targets_1, attributes_1, attributes_2, args.permutation_number,
+                                            args.similarity_type, args.seed)
+    logging.info("WEFAT over %d words, permutations: %d", len(table), weat.permutations_used)
+    weat_stats.write_wefat_table(args.output_file, table)
+    return
+  result = weat.run_test_precomputed_sims(targets_1, targets_2, attributes_1, attributes_2, args.permutation_number, args.similarity_type,
+                                          args.p_value_method, args.workers, args.seed, args.significance_levels,
+                                          args.dedup_permutations, shard)
   logging.info(result)
+  logging.info("Permutations: %d", weat.permutations_used)
   with codecs.open(args.output_file, "w", "utf8") as f:
     f.write("Config: ")
     f.write(str(args.test_number) + " and ")
@@ -625,10 +524,14 @@ def main():
     f.write("Result: ")
     f.write(str(result))
     f.write("\n")
+    f.write("Permutations: " + str(weat.permutations_used) + "\n")
     end = time.time()
     duration_in_hours = ((end - start) / 60) / 60
     f.write(str(duration_in_hours))
     f.close()
+  weat_stats.write_null_distribution(args.output_file + ".null.jsonl", weat.null_distribution, "w",
+                                     test_number=args.test_number, lower=args.lower, targets_lang=args.targets_lang,
+                                     attributes_lang=args.attributes_lang, shard=args.shard, shards=args.shards)
 
 if __name__ == "__main__":
   main()
\ No newline at end of file